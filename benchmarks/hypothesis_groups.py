@@ -0,0 +1,133 @@
+"""
+Бенчмарк выделения групп в тестах utils.hypothesis: groupby(...).apply(list)
+против срезов-представлений отсортированного массива NumPy (_groups).
+
+Замеряется время и пиковая память выделения групп, а также полное время
+тестов Манна–Уитни, Стьюдента и ANOVA на синтетической выгрузке поездок.
+
+Запуск из корня проекта:
+    python -m benchmarks.hypothesis_groups
+    python -m benchmarks.hypothesis_groups --rows 5000000
+"""
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+from scipy.stats import f_oneway, mannwhitneyu, ttest_ind
+
+from utils.cleaning import DAY_NAMES, PROMO_LABELS
+from utils.hypothesis import _groups, compute_anova, compute_mannwhitneyu, compute_student
+
+
+def make_rides(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Генерирует выгрузку поездок с промо, днём недели и дистанцией.
+
+    Параметры:
+    ----------
+    n_rows : int
+        Количество поездок.
+    seed : int, default=42
+        Зерно генератора случайных чисел.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Датасет поездок.
+    """
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        "distance": rng.gamma(2.0, 1500.0, n_rows).round(),
+        "promo": pd.Categorical.from_codes(rng.integers(0, 2, n_rows), categories=PROMO_LABELS),
+        "day_of_week": pd.Categorical.from_codes(rng.integers(0, 7, n_rows), categories=DAY_NAMES),
+    })
+
+
+def _list_groups(data: pd.DataFrame, target: str, factor: str):
+    """
+    Прежний способ: значения групп в виде списков Python
+    (группы — в порядке значений, как при строковой колонке фактора).
+    """
+    groups = data.groupby(factor, observed=True)[target].apply(list)
+    return groups.sort_index(key=lambda labels: labels.astype(object))
+
+
+def _measure(func, *args):
+    """
+    Возвращает результат, время (сек.) и пиковую память (МБ) вызова.
+
+    Время и память замеряются отдельными вызовами: tracemalloc
+    заметно замедляет код, создающий много объектов Python.
+    """
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    func(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return result, elapsed, peak / 1024 ** 2
+
+
+def _timeit(func, *args) -> float:
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def run(n_rows: int) -> pd.DataFrame:
+    """
+    Сравнивает прежнее и новое выделение групп.
+
+    Параметры:
+    ----------
+    n_rows : int
+        Количество поездок.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Время и пиковая память для каждого способа и теста.
+    """
+    data = make_rides(n_rows)
+    rows = []
+
+    for test, factor, scipy_test, compute in [
+        ("mannwhitneyu", "promo", mannwhitneyu, compute_mannwhitneyu),
+        ("student", "promo", ttest_ind, compute_student),
+        ("anova", "day_of_week", f_oneway, compute_anova),
+    ]:
+        list_groups, list_time, list_peak = _measure(_list_groups, data, "distance", factor)
+        list_test_time = _timeit(scipy_test, *list_groups)
+
+        (_, view_groups), view_time, view_peak = _measure(_groups, data, "distance", factor)
+        assert all(np.array_equal(a, b) for a, b in zip(list_groups, view_groups))
+        view_test_time = _timeit(scipy_test, *view_groups)
+
+        compute_time = _timeit(compute, data, "distance", factor)
+
+        rows.append({
+            "test": test,
+            "list_groups_sec": list_time,
+            "view_groups_sec": view_time,
+            "list_peak_mb": list_peak,
+            "view_peak_mb": view_peak,
+            "list_test_sec": list_test_time,
+            "view_test_sec": view_test_time,
+            "speedup_total": (list_time + list_test_time) / (view_time + view_test_time),
+            "compute_sec": compute_time,
+        })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    args = parser.parse_args()
+
+    print(run(args.rows).T.to_string(header=False))
@@ -0,0 +1,112 @@
+"""
+Микро-бенчмарк нормализации улиц и районов: построчный apply(normalize_street /
+normalize_district) против BatchNormalizer.normalize_many и normalize_streets.
+
+Запуск из корня проекта:
+    python -m benchmarks.normalization
+    python -m benchmarks.normalization --rows 1000000 --uniques 500
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import (
+    _NORMALIZATION_CACHE, BatchNormalizer,
+    normalize_district, normalize_districts, normalize_street, normalize_streets
+)
+
+STREET_TEMPLATES = ["ул. {}", "улица {}", "{}", "ул {}  ", " {} — проспект"]
+WORDS = ["Ленина", "Карла Маркса", "Мира", "Садовая", "Гагарина", "Пушкина", "Лесная", "Новая"]
+
+
+def make_values(n_rows: int, n_uniques: int, seed: int = 42) -> pd.Series:
+    """
+    Генерирует колонку «грязных» названий с заданным числом уникальных значений.
+
+    Параметры:
+    ----------
+    n_rows : int
+        Длина колонки.
+    n_uniques : int
+        Количество уникальных исходных значений.
+    seed : int, default=42
+        Зерно генератора случайных чисел.
+
+    Возвращает:
+    ----------
+    pd.Series
+        Колонка строк.
+    """
+    rng = np.random.default_rng(seed)
+    uniques = [
+        STREET_TEMPLATES[idx % len(STREET_TEMPLATES)].format(f"{WORDS[idx % len(WORDS)]} {idx}")
+        for idx in range(n_uniques)
+    ]
+    return pd.Series(np.asarray(uniques, dtype=object)[rng.integers(0, n_uniques, size=n_rows)])
+
+
+def _timeit(func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, time.perf_counter() - started
+
+
+def run(n_rows: int, n_uniques: int) -> pd.DataFrame:
+    """
+    Замеряет время нормализации тремя способами с холодным кэшем.
+
+    Параметры:
+    ----------
+    n_rows : int
+        Длина колонки.
+    n_uniques : int
+        Количество уникальных исходных значений.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Время (сек.) и пропускная способность каждого способа.
+    """
+    values = make_values(n_rows, n_uniques)
+    rows = []
+
+    for kind, func, bulk_func in [
+        ("street", normalize_street, normalize_streets),
+        ("district", normalize_district, normalize_districts),
+    ]:
+        expected, per_value_time = _timeit(values.apply, func)
+
+        _NORMALIZATION_CACHE[kind].clear()
+        normalizer = BatchNormalizer(kind)
+        batch, batch_time = _timeit(normalizer.normalize_many, values)
+        assert batch.equals(expected)
+
+        _NORMALIZATION_CACHE[kind].clear()
+        categorical, categorical_time = _timeit(bulk_func, values)
+        assert (categorical.astype(object) == expected.to_numpy()).all()
+
+        for method, elapsed in [
+            (f"apply({func.__name__})", per_value_time),
+            ("BatchNormalizer.normalize_many", batch_time),
+            (bulk_func.__name__, categorical_time),
+        ]:
+            rows.append({
+                "kind": kind,
+                "method": method,
+                "sec": elapsed,
+                "values_per_sec": n_rows / elapsed,
+                "speedup": per_value_time / elapsed,
+            })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--uniques", type=int, default=500)
+    args = parser.parse_args()
+
+    print(run(args.rows, args.uniques).to_string(index=False))
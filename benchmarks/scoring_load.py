@@ -0,0 +1,190 @@
+"""
+Нагрузочный тест сервиса оценки спроса (utils.serving): задержка p50/p99
+и пропускная способность (запросов в секунду).
+
+Запуск из корня проекта против запущенного сервиса:
+    python -m utils.serving --port 8000
+    python -m benchmarks.scoring_load --url http://127.0.0.1:8000 --requests 5000 --concurrency 32
+
+Без запущенного сервиса (--demo): модель обучается на синтетических
+почасовых данных, и сервис поднимается локально в отдельном процессе:
+    python -m benchmarks.scoring_load --demo
+"""
+import argparse
+import asyncio
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+import httpx
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LinearRegression
+
+from utils.cleaning import DAY_NAMES, PROMO_LABELS
+from utils.modeling import FeatureEncoder, add_lag_features
+from utils.serving import DemandScorer
+
+CATEGORICAL_COLS = ["promo", "day_of_week"]
+
+
+def make_demo_scorer(n_hours: int = 24 * 120, seed: int = 42) -> DemandScorer:
+    """
+    Обучает линейную модель на синтетическом почасовом спросе.
+
+    Параметры:
+    ----------
+    n_hours : int, default=2880
+        Длина синтетической истории в часах.
+    seed : int, default=42
+        Зерно генератора случайных чисел.
+
+    Возвращает:
+    ----------
+    DemandScorer
+        Сервис оценки с историей спроса.
+    """
+    rng = np.random.default_rng(seed)
+    hours = pd.date_range("2024-05-01", periods=n_hours, freq="h")
+    daily = 20 + 15 * np.sin((hours.hour.to_numpy() - 6) / 24 * 2 * np.pi)
+
+    hourly = pd.DataFrame({
+        "hour_timestamp": hours,
+        "demand": rng.poisson(np.clip(daily, 1, None)),
+        "day_of_week": np.asarray(DAY_NAMES, dtype=object)[hours.dayofweek],
+        "temperature": rng.normal(18, 5, n_hours),
+        "mean_precipitation_total": rng.exponential(0.3, n_hours),
+        "mean_cloud_cover_total": rng.uniform(0, 100, n_hours),
+        "promo": np.asarray(PROMO_LABELS, dtype=object)[rng.integers(0, 2, n_hours)],
+        "hour_of_day": hours.hour,
+    })
+    data = add_lag_features(hourly)
+
+    X = data.drop(columns=["demand", "hour_timestamp"])
+    encoder = FeatureEncoder(CATEGORICAL_COLS).fit(X)
+    model = LinearRegression().fit(encoder.transform(X), data["demand"])
+
+    return DemandScorer(model, encoder, history=hourly["demand"], last_hour=hours[-1])
+
+
+def make_record(rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    Генерирует факторы одного часа для запроса прогноза.
+    """
+    return {
+        "day_of_week": DAY_NAMES[int(rng.integers(0, 7))],
+        "temperature": float(rng.normal(18, 5)),
+        "mean_precipitation_total": float(rng.exponential(0.3)),
+        "mean_cloud_cover_total": float(rng.uniform(0, 100)),
+        "promo": PROMO_LABELS[int(rng.integers(0, 2))],
+        "hour_of_day": int(rng.integers(0, 24)),
+    }
+
+
+async def _run_load(url: str, n_requests: int, concurrency: int, batch_size: int) -> List[float]:
+    """
+    Отправляет n_requests запросов с заданной конкурентностью и возвращает задержки (сек.).
+    """
+    rng = np.random.default_rng(0)
+    if batch_size > 1:
+        endpoint = f"{url}/predict/batch"
+        payloads = [{"records": [make_record(rng) for _ in range(batch_size)]} for _ in range(n_requests)]
+    else:
+        endpoint = f"{url}/predict"
+        payloads = [make_record(rng) for _ in range(n_requests)]
+
+    latencies = []
+    queue = iter(payloads)
+
+    async with httpx.AsyncClient(timeout=30) as client:
+        async def worker():
+            for payload in queue:
+                started = time.perf_counter()
+                response = await client.post(endpoint, json=payload)
+                latencies.append(time.perf_counter() - started)
+                response.raise_for_status()
+
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return latencies
+
+
+def run(url: str, n_requests: int, concurrency: int, batch_size: int) -> pd.DataFrame:
+    """
+    Выполняет нагрузочный тест и возвращает сводку задержек и пропускной способности.
+
+    Параметры:
+    ----------
+    url : str
+        Адрес сервиса, например http://127.0.0.1:8000.
+    n_requests : int
+        Количество запросов.
+    concurrency : int
+        Количество одновременных запросов.
+    batch_size : int
+        Записей в одном запросе (1 — /predict, иначе — /predict/batch).
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Одна строка: requests, concurrency, batch_size, p50_ms, p99_ms, rps, predictions_per_sec.
+    """
+    asyncio.run(_run_load(url, min(concurrency * 2, n_requests), concurrency, batch_size))
+
+    started = time.perf_counter()
+    latencies = asyncio.run(_run_load(url, n_requests, concurrency, batch_size))
+    elapsed = time.perf_counter() - started
+
+    latencies_ms = np.asarray(latencies) * 1000
+    return pd.DataFrame([{
+        "requests": n_requests,
+        "concurrency": concurrency,
+        "batch_size": batch_size,
+        "p50_ms": np.percentile(latencies_ms, 50),
+        "p99_ms": np.percentile(latencies_ms, 99),
+        "rps": n_requests / elapsed,
+        "predictions_per_sec": n_requests * batch_size / elapsed,
+    }])
+
+
+def _serve_demo(port: int) -> subprocess.Popen:
+    """
+    Запускает сервис с демонстрационной моделью в отдельном процессе.
+    """
+    bundle = Path(tempfile.mkdtemp()) / "demand_model.joblib"
+    make_demo_scorer().save(bundle)
+
+    server = subprocess.Popen([
+        sys.executable, "-m", "utils.serving", "--bundle", str(bundle), "--port", str(port)
+    ])
+
+    for _ in range(100):
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/health").raise_for_status()
+            return server
+        except httpx.HTTPError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("Демонстрационный сервис не запустился")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--demo", action="store_true")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    server = _serve_demo(args.port) if args.demo else None
+    url = f"http://127.0.0.1:{args.port}" if args.demo else args.url.rstrip("/")
+    try:
+        print(run(url, args.requests, args.concurrency, args.batch_size).to_string(index=False))
+    finally:
+        if server is not None:
+            server.terminate()
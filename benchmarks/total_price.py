@@ -0,0 +1,98 @@
+"""
+Бенчмарк расчёта стоимости поездок: построчный apply(get_total_price)
+против векторизованного get_total_price_vectorized.
+
+Запуск из корня проекта:
+    python -m benchmarks.total_price
+    python -m benchmarks.total_price --sizes 100000 1000000 --rowwise-limit 1000000
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from utils.features import get_total_price, get_total_price_vectorized
+
+
+def make_rides(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """
+    Генерирует синтетический датасет поездок с колонками, нужными для расчёта цены.
+
+    Параметры:
+    ----------
+    n_rows : int
+        Количество поездок.
+    seed : int, default=42
+        Зерно генератора случайных чисел.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Датасет с колонками start_date, day_of_week, duration_minutes, promo.
+    """
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2024-01-01")
+    offsets = rng.integers(0, 365 * 24 * 60, size=n_rows)
+    start_date = start + pd.to_timedelta(offsets, unit="min")
+
+    return pd.DataFrame({
+        "start_date": start_date,
+        "day_of_week": start_date.dayofweek,
+        "duration_minutes": rng.integers(1, 60, size=n_rows).astype(float),
+        "promo": rng.integers(0, 2, size=n_rows),
+    })
+
+
+def _timeit(func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def run(sizes, rowwise_limit: int) -> pd.DataFrame:
+    """
+    Замеряет время обоих способов расчёта и проверяет совпадение результатов.
+
+    Параметры:
+    ----------
+    sizes : Iterable[int]
+        Размеры датасетов для замеров.
+    rowwise_limit : int
+        Максимальный размер датасета, на котором запускается построчный расчёт.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Таблица с временем расчёта (сек.) и ускорением для каждого размера.
+    """
+    rows = []
+    for n_rows in sizes:
+        rides = make_rides(n_rows)
+        vectorized, vectorized_time = _timeit(get_total_price_vectorized, rides)
+
+        rowwise_time = np.nan
+        if n_rows <= rowwise_limit:
+            rowwise, rowwise_time = _timeit(rides.apply, get_total_price, axis=1)
+            assert np.array_equal(rowwise.to_numpy(dtype=float), vectorized.to_numpy())
+
+        rows.append({
+            "rows": n_rows,
+            "rowwise_sec": rowwise_time,
+            "vectorized_sec": vectorized_time,
+            "speedup": rowwise_time / vectorized_time,
+        })
+
+    return pd.DataFrame(rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 10_000_000])
+    parser.add_argument(
+        "--rowwise-limit", type=int, default=10_000_000,
+        help="не запускать построчный расчёт на датасетах больше этого размера",
+    )
+    args = parser.parse_args()
+
+    print(run(args.sizes, args.rowwise_limit).to_string(index=False))
@@ -0,0 +1,46 @@
+"""
+Регрессионные тесты utils.cleaning.
+
+Запуск из корня проекта:
+    python -m pytest -q tests
+"""
+import numpy as np
+import pandas as pd
+
+from utils.cleaning import fill_na_median_by_group, filter_outliers_iqr
+
+
+def test_filter_outliers_iqr_skips_nan_group():
+    """
+    Строки с пропуском в колонке группы не проверяются правилами IQR.
+    """
+    data = pd.DataFrame({
+        "start_district": ["Центр"] * 5 + [None, np.nan],
+        "distance": [100.0, 110.0, 120.0, 130.0, 10_000.0, 50_000.0, 1.0],
+    })
+
+    filtered, report = filter_outliers_iqr(data, ["distance"], by=["start_district"])
+
+    assert filtered.index.tolist() == [0, 1, 2, 3, 5, 6]
+    assert report.set_index("rule").loc["iqr:distance", "flagged"] == 1
+
+
+def test_fill_na_median_by_group_nan_group_key():
+    """
+    Строки с пропуском в колонке группы не заполняются по основной группировке,
+    но доходят до fallback_group_cols и fill_global.
+    """
+    data = pd.DataFrame({
+        "start_location": ["А", "А", "А", None, "Б", None],
+        "end_location": ["Б", "Б", None, "Б", "В", None],
+        "distance": [100.0, 300.0, np.nan, np.nan, 1000.0, np.nan],
+    })
+
+    only_route = fill_na_median_by_group(data.copy(), ["distance"], ["start_location", "end_location"])
+    assert only_route["distance"].isna().tolist() == [False, False, True, True, False, True]
+
+    filled = fill_na_median_by_group(
+        data.copy(), ["distance"], ["start_location", "end_location"],
+        fallback_group_cols=[["start_location"]], fill_global=True
+    )
+    assert filled["distance"].tolist() == [100.0, 300.0, 200.0, 300.0, 1000.0, 300.0]
@@ -0,0 +1,207 @@
+import ast
+import functools
+import hashlib
+import importlib.util
+import inspect
+import os
+import pickle
+import sys
+from pathlib import Path
+from types import ModuleType
+from typing import Any, Callable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .paths import join_path
+
+CACHE_PARTS = ("data", "cache")
+DEFAULT_MAX_CACHE_BYTES = 2 * 1024 ** 3
+
+_CACHE_ENABLED = True
+
+
+def set_cache_enabled(enabled: bool) -> None:
+    """
+    Глобально включает или отключает дисковый кэш этапов пайплайна.
+
+    Параметры:
+    ----------
+    enabled : bool
+        True — использовать кэш, False — всегда вычислять заново.
+    """
+    global _CACHE_ENABLED
+    _CACHE_ENABLED = enabled
+
+
+def _update_fingerprint(hasher: "hashlib._Hash", value: Any) -> None:
+    """
+    Добавляет в хэш отпечаток значения аргумента.
+
+    Для DataFrame и Series учитываются форма, колонки, типы и построчные
+    хэши значений с индексом, для массивов NumPy — байты данных,
+    для остальных значений — repr.
+    """
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        hasher.update(type(value).__name__.encode())
+        hasher.update(repr(value.shape).encode())
+        if isinstance(value, pd.DataFrame):
+            hasher.update(repr(list(value.columns)).encode())
+            hasher.update(repr(value.dtypes.astype(str).tolist()).encode())
+        else:
+            hasher.update(repr((value.name, str(value.dtype))).encode())
+        hasher.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        hasher.update(repr((value.shape, str(value.dtype))).encode())
+        hasher.update(np.ascontiguousarray(value).tobytes())
+    else:
+        hasher.update(repr(value).encode())
+
+
+def _source_modules(func: Callable) -> List[ModuleType]:
+    """
+    Модули, от кода которых зависит результат функции.
+
+    Это модуль, где определена функция, и модули того же пакета, которые он
+    импортирует (по инструкциям import в исходном коде — в том числе модули,
+    откуда берутся только константы, как DAY_NAMES из utils.cleaning).
+    """
+    module = inspect.getmodule(func)
+    if module is None:
+        return []
+    package = module.__name__.split(".")[0]
+
+    names = {module.__name__}
+    for node in ast.walk(ast.parse(inspect.getsource(module))):
+        if isinstance(node, ast.ImportFrom):
+            base = importlib.util.resolve_name("." * node.level + (node.module or ""), module.__package__)
+            names.add(base)
+            names.update(f"{base}.{alias.name}" for alias in node.names)
+        elif isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+
+    return [
+        sys.modules[name] for name in sorted(names)
+        if name.split(".")[0] == package and name in sys.modules and hasattr(sys.modules[name], "__file__")
+    ]
+
+
+def _code_version(func: Callable, version: Optional[str] = None) -> str:
+    """
+    Возвращает хэш кода этапа: при его изменении кэш становится неактуальным.
+
+    Учитывается исходный код всего модуля функции и модулей пакета, из которых
+    он импортирует (_source_modules), поэтому правка вспомогательной функции
+    (например, _create_traffic_df для traffic_by_points) тоже сбрасывает кэш.
+    version — ручная метка для изменений, которых нет в исходном коде пакета.
+    """
+    hasher = hashlib.sha256(repr(version).encode())
+    try:
+        modules = _source_modules(func)
+        for module in modules:
+            hasher.update(module.__name__.encode())
+            hasher.update(inspect.getsource(module).encode())
+        if not modules:
+            hasher.update(inspect.getsource(func).encode())
+    except (OSError, TypeError):
+        hasher.update(func.__code__.co_code)
+    return hasher.hexdigest()
+
+
+def _evict(cache_root: Path, max_bytes: int) -> None:
+    """
+    Удаляет давно не использованные записи кэша, пока общий размер превышает max_bytes.
+
+    Время последнего использования записи — mtime файла (обновляется при каждом попадании).
+    """
+    entries = [(path.stat(), path) for path in cache_root.rglob("*.pkl")]
+    total = sum(stat.st_size for stat, _ in entries)
+
+    for stat, path in sorted(entries, key=lambda entry: entry[0].st_mtime):
+        if total <= max_bytes:
+            break
+        path.unlink(missing_ok=True)
+        total -= stat.st_size
+
+
+def cached_stage(
+        max_bytes: int = DEFAULT_MAX_CACHE_BYTES,
+        cache_root: Optional[Path] = None,
+        version: Optional[str] = None
+) -> Callable:
+    """
+    Декоратор дискового кэша для дорогих этапов пайплайна.
+
+    Ключ записи — хэш от модуля и имени функции, версии исходного кода её
+    модуля и импортируемых им модулей пакета, метки version и отпечатков всех аргументов (для DataFrame — хэш содержимого),
+    поэтому повторный вызов на тех же данных читает готовый результат с диска,
+    а изменение данных, аргументов или кода функции приводит к пересчёту.
+    Размер кэша ограничен max_bytes: при превышении удаляются
+    давно не использованные записи (LRU).
+
+    Параметры:
+    ----------
+    max_bytes : int, default=2 ГБ
+        Максимальный суммарный размер кэша на диске.
+    cache_root : Path, optional
+        Директория кэша. По умолчанию — data/cache (через join_path).
+    version : str, optional
+        Ручная версия этапа: её изменение сбрасывает кэш, если результат
+        зависит от кода вне пакета (например, версии библиотеки).
+
+    Возвращает:
+    ----------
+    Callable
+        Декоратор функции.
+
+    Пример:
+    -------
+    >>> @cached_stage()
+    ... def build_hourly_dataset(data, timestamp_col="hour_timestamp"):
+    ...     ...
+    """
+    def decorator(func: Callable) -> Callable:
+        signature = inspect.signature(func)
+        code_version = None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _CACHE_ENABLED:
+                return func(*args, **kwargs)
+
+            # Версия кода считается при первом вызове, когда модуль уже загружен целиком
+            nonlocal code_version
+            if code_version is None:
+                code_version = _code_version(func, version)
+
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+
+            hasher = hashlib.sha256()
+            hasher.update(f"{func.__module__}.{func.__qualname__}:{code_version}".encode())
+            for name, value in bound.arguments.items():
+                hasher.update(name.encode())
+                _update_fingerprint(hasher, value)
+
+            root = Path(cache_root) if cache_root is not None else join_path(*CACHE_PARTS)
+            path = root / func.__name__ / f"{hasher.hexdigest()}.pkl"
+
+            if path.exists():
+                os.utime(path)
+                with open(path, "rb") as file:
+                    return pickle.load(file)
+
+            result = func(*args, **kwargs)
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix(".tmp")
+            with open(tmp_path, "wb") as file:
+                pickle.dump(result, file, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(path)
+
+            _evict(root, max_bytes)
+            return result
+
+        return wrapper
+
+    return decorator
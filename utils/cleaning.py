@@ -1,8 +1,52 @@
+import json
 import re
-from typing import List
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
+from .overview import find_nan_runs
+
+DAY_NAMES = [
+    "понедельник",
+    "вторник",
+    "среда",
+    "четверг",
+    "пятница",
+    "суббота",
+    "воскресенье",
+]
+PROMO_LABELS = ["Нет", "Да"]
+DAY_TYPE_LABELS = ["будний", "выходной"]
+
+# Источник значения ячейки после impute_time_gaps (код = позиция в списке)
+IMPUTATION_SOURCES = ["observed", "interpolated", "seasonal", "fallback_seasonal", "global", "missing"]
+
+# Кэш нормализованных значений: {вид нормализации: {исходное значение: результат}}
+_NORMALIZATION_CACHE: Dict[str, Dict[str, str]] = {"street": {}, "district": {}}
+
+_STREET_PREFIX_RE = re.compile(r"^(ул\.?|улица)\s*")
+_DASHES_RE = re.compile(r"[‐‒–—]")
+_INNER_SPACES_RE = re.compile(r"(?<=\w)\s+(?=\w)")
+_SPACED_DASH_RE = re.compile(r"\s*-\s*")
+_MULTI_SPACES_RE = re.compile(r"\s+")
+
+# Последовательности замен (шаблон, замена) после приведения к нижнему регистру и strip
+_NORMALIZATION_STEPS = {
+    "street": [
+        (_STREET_PREFIX_RE, ""),
+        (_DASHES_RE, "-"),
+        (_INNER_SPACES_RE, "-"),
+        (_SPACED_DASH_RE, "-"),
+        (_MULTI_SPACES_RE, " "),
+    ],
+    "district": [
+        (_INNER_SPACES_RE, "-"),
+    ],
+}
+
 
 def normalize_street(street_name: str) -> str:
     """
@@ -27,11 +71,8 @@ def normalize_street(street_name: str) -> str:
     - Удаление лишних пробелов
     """
     street_name = street_name.lower().strip()
-    street_name = re.sub(r"^(ул\.?|улица)\s*", "", street_name)
-    street_name = re.sub(r"[‐‒–—]", "-", street_name)
-    street_name = re.sub(r"(?<=\w)\s+(?=\w)", "-", street_name)
-    street_name = re.sub(r"\s*-\s*", "-", street_name)
-    street_name = re.sub(r"\s+", " ", street_name)
+    for pattern, repl in _NORMALIZATION_STEPS["street"]:
+        street_name = pattern.sub(repl, street_name)
     return street_name.strip()
 
 
@@ -54,10 +95,221 @@ def normalize_district(district_name: str) -> str:
     - Замена пробелов между словами на дефисы
     """
     district_name = district_name.lower().strip()
-    district_name = re.sub(r"(?<=\w)\s+(?=\w)", "-", district_name)
+    for pattern, repl in _NORMALIZATION_STEPS["district"]:
+        district_name = pattern.sub(repl, district_name)
     return district_name
 
 
+def _normalize_batch(values: List[str], kind: str) -> List[str]:
+    """
+    Нормализует список строк векторными операциями pandas .str.
+
+    Выполняет те же шаги, что normalize_street / normalize_district,
+    с предкомпилированными шаблонами из _NORMALIZATION_STEPS.
+
+    Параметры:
+    ----------
+    values : List[str]
+        Исходные значения без пропусков.
+    kind : str
+        Вид нормализации ('street' или 'district').
+
+    Возвращает:
+    ----------
+    List[str]
+        Нормализованные значения в исходном порядке.
+    """
+    normalized = pd.Series(values, dtype=object).str.lower().str.strip()
+    for pattern, repl in _NORMALIZATION_STEPS[kind]:
+        normalized = normalized.str.replace(pattern, repl, regex=True)
+    if kind == "street":
+        normalized = normalized.str.strip()
+    return normalized.tolist()
+
+
+class BatchNormalizer:
+    """
+    Пакетный нормализатор названий улиц или районов со счётчиками производительности.
+
+    Использует предкомпилированные шаблоны и общий кэш _NORMALIZATION_CACHE:
+    регулярные выражения применяются (векторно, через pandas .str) только
+    к уникальным значениям, которых ещё нет в кэше.
+
+    Параметры:
+    ----------
+    kind : str, default="street"
+        Вид нормализации: 'street' или 'district'.
+
+    Пример:
+    -------
+    >>> normalizer = BatchNormalizer("street")
+    >>> rides_data["start_location"] = normalizer.normalize_many(rides_data["start_location"])
+    >>> normalizer.stats
+    {'values': 100000, 'values_per_sec': 2.1e6, 'cache_hit_rate': 0.5}
+    """
+
+    def __init__(self, kind: str = "street"):
+        if kind not in _NORMALIZATION_STEPS:
+            raise ValueError(f"Неизвестный вид нормализации: {kind}")
+
+        self.kind = kind
+        self.cache = _NORMALIZATION_CACHE[kind]
+        self.n_values = 0
+        self.n_lookups = 0
+        self.n_cache_hits = 0
+        self.elapsed = 0.0
+
+    def normalize_many(self, values: Iterable[str]) -> pd.Series:
+        """
+        Нормализует набор значений.
+
+        Параметры:
+        ----------
+        values : Iterable[str]
+            Исходные значения (pd.Series, список и т.п.), пропуски сохраняются.
+
+        Возвращает:
+        ----------
+        pd.Series
+            Нормализованные значения; для pd.Series сохраняется исходный индекс.
+        """
+        started = time.perf_counter()
+
+        if not isinstance(values, pd.Series):
+            values = pd.Series(list(values), dtype=object)
+
+        uniques = values.dropna().unique()
+        new_values = [value for value in uniques if value not in self.cache]
+        if new_values:
+            self.cache.update(zip(new_values, _normalize_batch(new_values, self.kind)))
+
+        result = values.map(self.cache)
+
+        self.n_values += len(values)
+        self.n_lookups += len(uniques)
+        self.n_cache_hits += len(uniques) - len(new_values)
+        self.elapsed += time.perf_counter() - started
+
+        return result
+
+    @property
+    def stats(self) -> Dict[str, float]:
+        """
+        Счётчики производительности за всё время работы нормализатора.
+
+        Возвращает:
+        ----------
+        Dict[str, float]
+            - values: количество обработанных значений
+            - values_per_sec: пропускная способность (значений в секунду)
+            - cache_hit_rate: доля уникальных значений, найденных в кэше
+        """
+        return {
+            "values": self.n_values,
+            "values_per_sec": self.n_values / self.elapsed if self.elapsed else 0.0,
+            "cache_hit_rate": self.n_cache_hits / self.n_lookups if self.n_lookups else 0.0,
+        }
+
+
+def _normalize_unique(
+        values: pd.Series,
+        kind: str,
+        cache_path: Optional[Path] = None
+) -> pd.Categorical:
+    """
+    Нормализует колонку, обрабатывая только её уникальные значения.
+
+    Колонка факторизуется, уникальные значения, которых нет в кэше
+    _NORMALIZATION_CACHE[kind], нормализуются пакетно (при заданном cache_path
+    кэш дополнительно читается из JSON-файла и сохраняется обратно), после чего
+    коды отображаются на нормализованные категории.
+
+    Параметры:
+    ----------
+    values : pd.Series
+        Исходная колонка со строками.
+    kind : str
+        Вид нормализации — ключ кэша ('street' или 'district').
+    cache_path : Path, optional
+        Путь к JSON-файлу для хранения кэша между запусками.
+
+    Возвращает:
+    ----------
+    pd.Categorical
+        Нормализованные значения; пропуски сохраняются как NaN.
+    """
+    cache = _NORMALIZATION_CACHE[kind]
+    if cache_path is not None and Path(cache_path).exists():
+        with open(cache_path, encoding="utf-8") as file:
+            cache.update(json.load(file))
+
+    codes, uniques = pd.factorize(values)
+    if not len(uniques):
+        return pd.Categorical.from_codes(codes, categories=pd.Index([], dtype=object))
+
+    new_values = [value for value in uniques if value not in cache]
+    if new_values:
+        cache.update(zip(new_values, _normalize_batch(new_values, kind)))
+
+    normalized = [cache[value] for value in uniques]
+    category_codes, categories = pd.factorize(pd.Series(normalized, dtype=object), sort=True)
+
+    result_codes = category_codes[codes]
+    result_codes[codes == -1] = -1
+
+    if cache_path is not None and new_values:
+        with open(cache_path, "w", encoding="utf-8") as file:
+            json.dump(cache, file, ensure_ascii=False)
+
+    return pd.Categorical.from_codes(result_codes, categories=categories)
+
+
+def normalize_streets(values: pd.Series, cache_path: Optional[Path] = None) -> pd.Categorical:
+    """
+    Нормализует колонку с названиями улиц по правилам normalize_street.
+
+    Регулярные выражения выполняются один раз на уникальное значение,
+    а результат хранится как pd.Categorical, что заметно уменьшает
+    объём памяти колонок start_location и end_location.
+
+    Параметры:
+    ----------
+    values : pd.Series
+        Колонка с исходными названиями улиц.
+    cache_path : Path, optional
+        Путь к JSON-файлу для хранения кэша нормализации между запусками.
+
+    Возвращает:
+    ----------
+    pd.Categorical
+        Нормализованные названия улиц.
+
+    Пример:
+    -------
+    >>> rides_data["start_location"] = normalize_streets(rides_data["start_location"])
+    """
+    return _normalize_unique(values, "street", cache_path)
+
+
+def normalize_districts(values: pd.Series, cache_path: Optional[Path] = None) -> pd.Categorical:
+    """
+    Нормализует колонку с названиями районов по правилам normalize_district.
+
+    Параметры:
+    ----------
+    values : pd.Series
+        Колонка с исходными названиями районов.
+    cache_path : Path, optional
+        Путь к JSON-файлу для хранения кэша нормализации между запусками.
+
+    Возвращает:
+    ----------
+    pd.Categorical
+        Нормализованные названия районов.
+    """
+    return _normalize_unique(values, "district", cache_path)
+
+
 def normalize_day_of_week(val: int) -> str:
     """
     Преобразует числовое значение дня недели в его название.
@@ -79,16 +331,176 @@ def normalize_day_of_week(val: int) -> str:
     >>> normalize_day_of_week(5)
     'суббота'
     """
-    days = [
-        "понедельник",
-        "вторник",
-        "среда",
-        "четверг",
-        "пятница",
-        "суббота",
-        "воскресенье",
-    ]
-    return days[val]
+    return DAY_NAMES[val]
+
+
+def _to_ordered_categorical(values: pd.Series, labels: List[str]) -> pd.Categorical:
+    """
+    Приводит колонку к упорядоченной категории с заданным набором меток.
+
+    Числовые значения считаются кодами меток (0 — первая метка),
+    строковые и категориальные значения сопоставляются с метками по названию.
+    """
+    if pd.api.types.is_numeric_dtype(values) and not isinstance(values.dtype, pd.CategoricalDtype):
+        codes = values.fillna(-1).to_numpy(dtype=np.int8)
+        return pd.Categorical.from_codes(codes, categories=labels, ordered=True)
+    return pd.Categorical(values, categories=labels, ordered=True)
+
+
+def optimize_dtypes(
+        data: pd.DataFrame,
+        category_cols: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Переводит повторяющиеся признаки поездок в компактные категориальные типы.
+
+    Заменяет построчные apply(normalize_day_of_week) и lambda-преобразования:
+    все колонки конвертируются векторно, а сравнения и группировки по ним
+    выполняются по целочисленным кодам вместо Python-строк.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датасет с поездками. Используемые колонки (если присутствуют):
+        - day_of_week : int (0 — понедельник) или название дня
+        - promo : int (1 — промо использовано) или "Да"/"Нет"
+    category_cols : List[str], optional
+        Дополнительные колонки для приведения к типу category.
+        По умолчанию — start_district, end_district, start_location, end_location.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Тот же DataFrame (изменяется на месте) с колонками:
+        - day_of_week : упорядоченная категория DAY_NAMES
+        - day_of_week_type : упорядоченная категория DAY_TYPE_LABELS ("будний"/"выходной")
+        - promo : упорядоченная категория PROMO_LABELS ("Нет" < "Да")
+        - category_cols : category
+
+    Пример:
+    -------
+    >>> rides_data = optimize_dtypes(rides_data)
+    >>> rides_data["day_of_week"].cat.categories[0]
+    'понедельник'
+    """
+    if category_cols is None:
+        category_cols = ["start_district", "end_district", "start_location", "end_location"]
+
+    if "day_of_week" in data.columns:
+        data["day_of_week"] = _to_ordered_categorical(data["day_of_week"], DAY_NAMES)
+
+        day_codes = data["day_of_week"].cat.codes.to_numpy()
+        day_type_codes = np.where(day_codes < 0, -1, day_codes >= 5).astype(np.int8)
+        data["day_of_week_type"] = pd.Categorical.from_codes(
+            day_type_codes, categories=DAY_TYPE_LABELS, ordered=True
+        )
+
+    if "promo" in data.columns:
+        promo = data["promo"]
+        if pd.api.types.is_numeric_dtype(promo) and not isinstance(promo.dtype, pd.CategoricalDtype):
+            promo = promo.where(promo.isna(), (promo == 1).astype(np.int8))
+        data["promo"] = _to_ordered_categorical(promo, PROMO_LABELS)
+
+    for col in category_cols:
+        if col in data.columns and not isinstance(data[col].dtype, pd.CategoricalDtype):
+            data[col] = data[col].astype("category")
+
+    return data
+
+
+def filter_outliers_iqr(
+        data: pd.DataFrame,
+        cols: List[str],
+        k: float = 1.5,
+        by: Optional[List[str]] = None,
+        limits: Optional[Dict[str, Tuple[Optional[float], Optional[float]]]] = None,
+        return_mask: bool = False
+) -> Tuple[Union[pd.DataFrame, pd.Series], pd.DataFrame]:
+    """
+    Фильтрует выбросы по методу IQR сразу по нескольким колонкам, при необходимости — внутри групп.
+
+    Квартили всех колонок считаются одним вызовом quantile([0.25, 0.75])
+    (по всему датасету или по каждой группе by), границы раздаются строкам
+    по кодам групп, и все правила объединяются в одну маску — датасет
+    фильтруется один раз, без промежуточных копий.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Исходный DataFrame.
+    cols : List[str]
+        Колонки, по которым ищем выбросы.
+    k : float, default=1.5
+        Коэффициент для IQR: допустимый интервал [Q1 - k*IQR, Q3 + k*IQR].
+    by : List[str], optional
+        Колонки групп (например, ['start_district'] или ['hour']): квартили
+        считаются внутри каждой группы. Строки с пропуском в колонках групп
+        по правилам IQR не проверяются.
+    limits : Dict[str, Tuple[float | None, float | None]], optional
+        Дополнительные абсолютные границы {колонка: (нижняя, верхняя)},
+        None — без границы. Например: {"distance": (200, None)}.
+    return_mask : bool, default=False
+        Вернуть маску сохраняемых строк вместо отфильтрованного датасета.
+
+    Возвращает:
+    ----------
+    Tuple[pd.DataFrame | pd.Series, pd.DataFrame]
+        Отфильтрованный датасет (или маска) и отчёт по правилам:
+        rule, flagged (строк нарушают правило), removed_only (строк удалено
+        только этим правилом) и итоговая строка total.
+
+    Пример:
+    -------
+    >>> rides_data, report = filter_outliers_iqr(rides_data, ["distance"], k=3, limits={"distance": (200, None)})
+    """
+    rules: Dict[str, np.ndarray] = {}
+
+    if by:
+        grouped = data.groupby(by, observed=True, sort=True)
+        # Строки с пропуском в колонках групп получают код -1 (ngroup отдаёт для них NaN)
+        codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+        quartiles = grouped[cols].quantile([0.25, 0.75])
+        q1 = quartiles.xs(0.25, level=-1).to_numpy(dtype=np.float64)
+        q3 = quartiles.xs(0.75, level=-1).to_numpy(dtype=np.float64)
+        has_group = codes >= 0
+        codes = np.maximum(codes, 0)
+    else:
+        quartiles = data[cols].quantile([0.25, 0.75])
+        q1 = quartiles.loc[[0.25]].to_numpy(dtype=np.float64)
+        q3 = quartiles.loc[[0.75]].to_numpy(dtype=np.float64)
+        codes = np.zeros(len(data), dtype=np.int64)
+        has_group = np.ones(len(data), dtype=bool)
+
+    iqr = q3 - q1
+    lower, upper = q1 - k * iqr, q3 + k * iqr
+
+    for idx, col in enumerate(cols):
+        values = data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        inside = (values >= lower[codes, idx]) & (values <= upper[codes, idx])
+        rules[f"iqr:{col}"] = ~inside & has_group
+
+    for col, (low, high) in (limits or {}).items():
+        values = data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        inside = ~np.isnan(values)
+        if low is not None:
+            inside &= values >= low
+        if high is not None:
+            inside &= values <= high
+        rules[f"limits:{col}"] = ~inside
+
+    flagged = np.vstack(list(rules.values())) if rules else np.zeros((0, len(data)), dtype=bool)
+    n_flags = flagged.sum(axis=0)
+    keep = n_flags == 0
+
+    report = pd.DataFrame({
+        "rule": list(rules) + ["total"],
+        "flagged": [int(rule.sum()) for rule in rules.values()] + [int((~keep).sum())],
+        "removed_only": [int((rule & (n_flags == 1)).sum()) for rule in rules.values()] + [int((~keep).sum())],
+    })
+
+    if return_mask:
+        return pd.Series(keep, index=data.index), report
+    return data[keep], report
 
 
 def drop_outlers(
@@ -117,22 +529,44 @@ def drop_outlers(
     ----------
     - Вычисляем Q1, Q3 и IQR
     - Удаляем строки, где значение колонки выходит за пределы [Q1 - k*IQR, Q3 + k*IQR]
+    - Для нескольких колонок и групп см. filter_outliers_iqr
     """
-    Q1 = data[factor].quantile(0.25)
-    Q3 = data[factor].quantile(0.75)
-    IQR = Q3 - Q1
+    filtered_data, _ = filter_outliers_iqr(data, [factor], k)
+    return filtered_data
 
-    lower = Q1 - k * IQR
-    upper = Q3 + k * IQR
 
-    filtered_data = data[(data[factor] >= lower) & (data[factor] <= upper)]
-    return filtered_data
+def _fill_group_median(
+        data: pd.DataFrame,
+        source: pd.DataFrame,
+        cols: List[str],
+        group_cols: List[str]
+) -> None:
+    """
+    Заполняет пропуски в cols медианой группы по group_cols на месте.
+
+    Медианы всех колонок считаются по исходным значениям source одним
+    вызовом groupby().median(), а затем раздаются строкам с пропусками
+    по кодам групп (ngroup). Строки с пропуском в group_cols получают
+    код -1 и остаются для следующих уровней заполнения.
+    """
+    grouped = source[cols].groupby([data[col] for col in group_cols], observed=True, sort=True)
+    codes = grouped.ngroup().fillna(-1).to_numpy(dtype=np.int64)
+    medians = grouped.median().to_numpy(dtype=np.float64)
+
+    for idx, col in enumerate(cols):
+        values = data[col].to_numpy(dtype=np.float64, na_value=np.nan, copy=True)
+        missing = np.isnan(values) & (codes >= 0)
+        if missing.any():
+            values[missing] = medians[codes[missing], idx]
+            data[col] = values
 
 
 def fill_na_median_by_group(
         data: pd.DataFrame,
         cols: List[str],
-        group_cols: List[str]
+        group_cols: List[str],
+        fallback_group_cols: Optional[List[List[str]]] = None,
+        fill_global: bool = False
 ) -> pd.DataFrame:
     """
     Заполняет пропущенные значения в указанных колонках медианой по заданным группам.
@@ -145,20 +579,50 @@ def fill_na_median_by_group(
         Список колонок, в которых нужно заполнить пропуски.
     group_cols : list[str]
         Список колонок для группировки перед вычислением медианы.
+    fallback_group_cols : list[list[str]], optional
+        Более крупные группировки для пропусков, оставшихся после основной
+        (группа полностью пустая), в порядке применения.
+        Например: [["start_location"]] для группировки по маршруту.
+    fill_global : bool, default=False
+        Заполнить оставшиеся пропуски медианой всей колонки.
 
     Возвращает
     -------
     pd.DataFrame
-        Новый DataFrame с заполненными пропусками в указанных колонках.
+        DataFrame с заполненными пропусками в указанных колонках (изменяется на месте).
 
     Логика
     ------
-    - Группируем данные по колонкам `group_cols`.
-    - Для каждой группы заполняем пропуски в колонках `cols` медианой группы.
-    - Если группа полностью пустая по данной колонке, остаются NaN.
+    - Медианы всех колонок по группам считаются одним groupby().median()
+      по исходным (не заполненным) значениям.
+    - Медианы раздаются строкам с пропусками по кодам групп.
+    - Если группа полностью пустая по данной колонке, пропуски заполняются
+      по fallback_group_cols и медианой колонки (fill_global), иначе остаются NaN.
+
+    Пример
+    ------
+    >>> fill_na_median_by_group(
+    ...     rides_data, ["distance"], ["start_location", "end_location"],
+    ...     fallback_group_cols=[["start_location"]], fill_global=True
+    ... )
     """
-    for col in cols:
-        data[col] = data.groupby(group_cols)[col].transform(lambda s: s.fillna(s.median()))
+    cols = [col for col in cols if data[col].isna().any()]
+    if not cols:
+        return data
+
+    # Медианы всех уровней считаются по исходным, а не уже заполненным значениям
+    source = data[cols].copy() if fallback_group_cols or fill_global else data
+
+    for groups in [group_cols, *(fallback_group_cols or [])]:
+        _fill_group_median(data, source, cols, groups)
+        cols = [col for col in cols if data[col].isna().any()]
+        if not cols:
+            return data
+
+    if fill_global:
+        for col in cols:
+            data[col] = data[col].fillna(source[col].median())
+
     return data
 
 
@@ -194,3 +658,154 @@ def interpolate_time(
     data[cols] = data[cols].interpolate(method="time")
     data = data.reset_index()
     return data
+
+
+def _impute_block(
+        values: np.ndarray,
+        timestamps: np.ndarray,
+        level_keys: List[np.ndarray],
+        max_gap: int
+) -> np.ndarray:
+    """
+    Заполняет пропуски в матрице (время × колонка) одного ряда на месте.
+
+    Возвращает матрицу кодов источников IMPUTATION_SOURCES той же формы.
+    """
+    provenance = np.zeros(values.shape, dtype=np.int8)
+    observed = ~np.isnan(values)
+    n_rows = len(values)
+
+    for idx in range(values.shape[1]):
+        column = values[:, idx]
+        is_na = ~observed[:, idx]
+        if not is_na.any():
+            continue
+
+        starts, lengths = find_nan_runs(is_na)
+        ends = starts + lengths
+        short = (lengths <= max_gap) & (starts > 0) & (ends < n_rows)
+
+        if short.any():
+            run_lengths = lengths[short]
+            offsets = np.arange(run_lengths.sum()) - np.repeat(np.cumsum(run_lengths) - run_lengths, run_lengths)
+            rows = np.repeat(starts[short], run_lengths) + offsets
+            valid = observed[:, idx]
+            column[rows] = np.interp(timestamps[rows], timestamps[valid], column[valid])
+            provenance[rows, idx] = IMPUTATION_SOURCES.index("interpolated")
+
+        remaining = np.flatnonzero(np.isnan(column))
+        provenance[remaining, idx] = IMPUTATION_SOURCES.index("missing")
+
+        for level, keys in enumerate(level_keys):
+            if not len(remaining):
+                break
+            valid = observed[:, idx]
+            n_keys = int(keys.max()) + 1 if len(keys) else 0
+            medians = pd.Series(column[valid]).groupby(keys[valid]).median().reindex(np.arange(n_keys)).to_numpy()
+            fill = medians[keys[remaining]]
+            has_fill = ~np.isnan(fill)
+            column[remaining[has_fill]] = fill[has_fill]
+            source = "seasonal" if level == 0 else "fallback_seasonal"
+            provenance[remaining[has_fill], idx] = IMPUTATION_SOURCES.index(source)
+            remaining = remaining[~has_fill]
+
+        if len(remaining) and observed[:, idx].any():
+            column[remaining] = np.median(column[observed[:, idx]])
+            provenance[remaining, idx] = IMPUTATION_SOURCES.index("global")
+
+    return provenance
+
+
+def impute_time_gaps(
+        data: pd.DataFrame,
+        cols: List[str],
+        datetime_col: str = "datetime",
+        max_interpolate_gap: int = 3,
+        seasonal_levels: Sequence[Sequence[str]] = (("month", "hour"), ("hour",)),
+        group_col: Optional[str] = None
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Заполняет пропуски временных рядов (например, погоды) за один проход с учётом длины пропуска.
+
+    Для каждой колонки серии пропусков находятся по маске (find_nan_runs):
+    • короткие серии (не длиннее max_interpolate_gap) между двумя наблюдениями
+      интерполируются линейно по времени, как interpolate(method="time")
+    • длинные серии и серии на краях ряда заполняются медианой сезонного
+      профиля — по первому уровню seasonal_levels (месяц × час), при
+      отсутствии наблюдений в ячейке профиля — по следующим уровням (час),
+      затем медианой всей колонки
+
+    Медианы считаются только по исходным наблюдениям. Вычисления идут
+    по массивам NumPy колонка за колонкой; с group_col (например, город)
+    каждый ряд обрабатывается отдельно.
+
+    Параметры
+    ----------
+    data : pd.DataFrame
+        Исходный DataFrame с колонкой времени.
+    cols : List[str]
+        Колонки, в которых нужно заполнить пропуски.
+    datetime_col : str, default 'datetime'
+        Колонка с временными метками.
+    max_interpolate_gap : int, default=3
+        Максимальная длина серии пропусков (в строках) для интерполяции.
+    seasonal_levels : Sequence[Sequence[str]], default=(("month", "hour"), ("hour",))
+        Уровни сезонного профиля: атрибуты datetime ('month', 'hour',
+        'dayofweek', 'dayofyear' и т.д.) от самого подробного к грубому.
+    group_col : str, optional
+        Колонка отдельных рядов (город, станция).
+
+    Возвращает
+    -------
+    Tuple[pd.DataFrame, pd.DataFrame]
+        Новый DataFrame с заполненными колонками и маска происхождения
+        значений той же формы (коды IMPUTATION_SOURCES, int8).
+
+    Пример
+    ------
+    >>> weather_data, provenance = impute_time_gaps(
+    ...     weather_data, ["temperature", "precipitation_total", "wind_speed"], max_interpolate_gap=6
+    ... )
+    >>> pd.Categorical.from_codes(provenance["temperature"], IMPUTATION_SOURCES).value_counts()
+    """
+    data = data.copy()
+    timestamps = pd.DatetimeIndex(data[datetime_col])
+    timestamps_ns = timestamps.asi8
+
+    level_keys = []
+    for level in seasonal_levels:
+        keys = np.zeros(len(data), dtype=np.int64)
+        for attr in level:
+            part = np.asarray(getattr(timestamps, attr), dtype=np.int64)
+            keys = keys * (int(part.max()) + 1 if len(part) else 1) + part
+        level_keys.append(keys)
+
+    if group_col is not None:
+        group_codes, _ = pd.factorize(data[group_col])
+    else:
+        group_codes = np.zeros(len(data), dtype=np.int64)
+
+    # Одна сортировка по (ряд, время): дальше каждый ряд — непрерывный срез-представление
+    order = np.lexsort((timestamps_ns, group_codes))
+    sorted_times = timestamps_ns[order]
+    sorted_keys = [keys[order] for keys in level_keys]
+    values = data[cols].to_numpy(dtype=np.float64, na_value=np.nan)[order]
+    provenance = np.zeros(values.shape, dtype=np.int8)
+
+    bounds = np.concatenate([[0], np.flatnonzero(np.diff(group_codes[order])) + 1, [len(order)]])
+    for first, last in zip(bounds[:-1], bounds[1:]):
+        if first == last:
+            continue
+        rows = slice(first, last)
+        provenance[rows] = _impute_block(
+            values[rows], sorted_times[rows], [keys[rows] for keys in sorted_keys], max_interpolate_gap
+        )
+
+    result = np.empty_like(values)
+    result[order] = values
+    restored = np.empty_like(provenance)
+    restored[order] = provenance
+
+    data[cols] = result
+    return data, pd.DataFrame(restored, columns=cols, index=data.index)
+
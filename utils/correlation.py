@@ -1,11 +1,57 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+
 import pandas as pd
 import numpy as np
 
 
+def _factorize_groups(groups: pd.Series) -> Tuple[np.ndarray, int]:
+    """
+    Переводит категориальный признак в плотные коды групп 0..k-1 (пропуски -> -1).
+    """
+    if isinstance(groups.dtype, pd.CategoricalDtype):
+        codes = groups.cat.codes.to_numpy().astype(np.int64)
+        used = np.bincount(codes[codes >= 0], minlength=len(groups.cat.categories)) > 0
+        remap = np.cumsum(used) - 1
+        return np.where(codes >= 0, remap[np.maximum(codes, 0)], -1), int(used.sum())
+
+    codes, uniques = pd.factorize(groups)
+    return codes.astype(np.int64), len(uniques)
+
+
+def _eta_from_codes(codes: np.ndarray, n_groups: int, values: np.ndarray, decimals: Optional[int] = 3) -> float:
+    """
+    Считает η по готовым кодам групп за O(n) через np.bincount.
+
+    Повторяет поведение исходной реализации: пропуск в группах или группа
+    без числовых значений дают NaN, пропуски в значениях не учитываются.
+    """
+    if (codes < 0).any():
+        return np.nan
+
+    is_valid = ~np.isnan(values)
+    filled = np.where(is_valid, values, 0.0)
+
+    count = np.bincount(codes, weights=is_valid, minlength=n_groups)
+    if (count == 0).any():
+        return np.nan
+    group_mean = np.bincount(codes, weights=filled, minlength=n_groups) / count
+
+    y_mean = filled.sum() / is_valid.sum()
+    ss_between = (count * (group_mean - y_mean) ** 2).sum()
+    ss_within = (np.where(is_valid, values - group_mean[codes], 0.0) ** 2).sum()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        eta = np.sqrt(ss_between / (ss_between + ss_within))
+    return eta.round(decimals) if decimals is not None else eta
+
+
 def get_eta_correlation(groups: pd.Series, values: pd.Series) -> float:
     """
     Вычисляет коэффициент η-корреляции между категориальным и числовым признаком.
 
+    Группы переводятся в плотные коды, а количества и суммы по группам
+    считаются через np.bincount за один проход (O(n) вместо O(n × k)).
+
     Параметры
     ----------
     groups : pd.Series
@@ -19,13 +65,295 @@ def get_eta_correlation(groups: pd.Series, values: pd.Series) -> float:
         Коэффициент η-корреляции (0-1), показывает долю вариации числового признака,
         объясненную категориальным.
     """
-    y_mean = values.mean()
-    ss_between = 0
-    ss_within = 0
+    codes, n_groups = _factorize_groups(groups)
+    return _eta_from_codes(codes, n_groups, values.to_numpy(dtype=np.float64, na_value=np.nan))
+
+
+def get_eta_matrix(
+        data: pd.DataFrame,
+        factors: List[str],
+        metrics: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Вычисляет η-корреляцию для всех пар (фактор, метрика) одним вызовом.
+
+    Каждый фактор факторизуется один раз, каждая метрика один раз переводится
+    в массив NumPy; результаты совпадают с get_eta_correlation.
+
+    Параметры
+    ----------
+    data : pd.DataFrame
+        Датасет с данными.
+    factors : List[str]
+        Категориальные признаки.
+    metrics : List[str], optional
+        Числовые признаки. По умолчанию — все числовые колонки, кроме factors.
+
+    Возвращает
+    -------
+    pd.DataFrame
+        Матрица η: строки — факторы, столбцы — метрики.
+
+    Пример
+    -------
+    >>> get_eta_matrix(rides_weather_data, ["day_of_week", "promo"], ["distance", "total_price"])
+    """
+    if metrics is None:
+        metrics = [
+            col for col in data.select_dtypes(include="number").columns if col not in factors
+        ]
+
+    values = {metric: data[metric].to_numpy(dtype=np.float64, na_value=np.nan) for metric in metrics}
+    matrix = pd.DataFrame(index=pd.Index(factors, name="factor"), columns=metrics, dtype=np.float64)
+
+    for factor in factors:
+        codes, n_groups = _factorize_groups(data[factor])
+        for metric in metrics:
+            matrix.loc[factor, metric] = _eta_from_codes(codes, n_groups, values[metric])
+
+    return matrix
+
+
+ASSOCIATION_METHODS = ("pearson", "spearman", "eta", "cramers_v")
+
+
+def _compact_codes(codes: np.ndarray) -> Tuple[np.ndarray, int]:
+    """
+    Перенумеровывает неотрицательные коды групп подряд, убирая пустые группы.
+    """
+    used = np.bincount(codes, minlength=1) > 0
+    remap = np.cumsum(used) - 1
+    return remap[codes], int(used.sum())
+
+
+def _average_ranks(values: np.ndarray) -> np.ndarray:
+    """
+    Ранги значений со средним рангом для повторов (как scipy.stats.rankdata).
+
+    Повторы усредняются после сортировки, поэтому устойчивая сортировка
+    не нужна и используется более быстрая np.argsort по умолчанию.
+    """
+    order = np.argsort(values)
+    sorted_values = values[order]
+    starts = np.flatnonzero(np.r_[True, sorted_values[1:] != sorted_values[:-1]])
+    counts = np.diff(np.r_[starts, len(values)])
+
+    ranks = np.empty(len(values))
+    ranks[order] = np.repeat(starts + (counts + 1) / 2, counts)
+    return ranks
+
+
+def _pearson(x: np.ndarray, y: np.ndarray) -> float:
+    """
+    Коэффициент Пирсона по двум массивам без пропусков.
+    """
+    x = x - x.mean()
+    y = y - y.mean()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return float((x * y).sum() / np.sqrt((x * x).sum() * (y * y).sum()))
+
+
+def _cramers_v(codes_x: np.ndarray, n_x: int, codes_y: np.ndarray, n_y: int) -> float:
+    """
+    V Крамера по кодам двух категориальных признаков (без поправки на смещение).
+    """
+    n = len(codes_x)
+    table = np.bincount(codes_x * n_y + codes_y, minlength=n_x * n_y).reshape(n_x, n_y).astype(np.float64)
+    expected = np.outer(table.sum(axis=1), table.sum(axis=0))
+    chi2 = n * ((table ** 2 / expected).sum() - 1)
+    min_dim = min(n_x, n_y) - 1
+    if n == 0 or min_dim == 0:
+        return np.nan
+    return float(np.sqrt(max(chi2, 0.0) / (n * min_dim)))
+
+
+class _ColumnCache:
+    """
+    Кэш представлений колонок для попарных мер связи.
+
+    Для числовых колонок хранит массив float64, маску пропусков и ранги
+    (считаются один раз на колонку), для категориальных — плотные коды групп.
+    """
+
+    def __init__(self, data: pd.DataFrame):
+        self.data = data
+        self._values: Dict[str, np.ndarray] = {}
+        self._ranks: Dict[str, np.ndarray] = {}
+        self._codes: Dict[str, Tuple[np.ndarray, int]] = {}
+        self._has_nan: Dict[str, bool] = {}
+        self._mean: Dict[str, float] = {}
+        self._ss_total: Dict[str, float] = {}
+        self._group_counts: Dict[str, np.ndarray] = {}
+
+    def values(self, col: str) -> np.ndarray:
+        if col not in self._values:
+            self._values[col] = self.data[col].to_numpy(dtype=np.float64, na_value=np.nan)
+        return self._values[col]
+
+    def has_nan(self, col: str) -> bool:
+        if col not in self._has_nan:
+            self._has_nan[col] = bool(np.isnan(self.values(col)).any())
+        return self._has_nan[col]
+
+    def mean(self, col: str) -> float:
+        if col not in self._mean:
+            self._mean[col] = float(self.values(col).mean())
+        return self._mean[col]
+
+    def ranks(self, col: str) -> np.ndarray:
+        if col not in self._ranks:
+            self._ranks[col] = _average_ranks(self.values(col))
+        return self._ranks[col]
+
+    def codes(self, col: str) -> Tuple[np.ndarray, int]:
+        if col not in self._codes:
+            self._codes[col] = _factorize_groups(self.data[col])
+        return self._codes[col]
+
+    def ss_total(self, col: str) -> float:
+        if col not in self._ss_total:
+            self._ss_total[col] = float(((self.values(col) - self.mean(col)) ** 2).sum())
+        return self._ss_total[col]
+
+    def group_counts(self, col: str) -> np.ndarray:
+        if col not in self._group_counts:
+            codes, n_groups = self.codes(col)
+            self._group_counts[col] = np.bincount(codes, minlength=n_groups).astype(np.float64)
+        return self._group_counts[col]
+
+
+def _gram_correlation(arrays: List[np.ndarray], chunk_size: int = 1_000_000) -> np.ndarray:
+    """
+    Матрица корреляций Пирсона для колонок без пропусков.
+
+    Матрица ковариаций накапливается порциями строк (C.T @ C), поэтому
+    память ограничена chunk_size × число колонок.
+    """
+    means = np.array([array.mean() for array in arrays])
+    gram = np.zeros((len(arrays), len(arrays)))
+    n_rows = len(arrays[0])
+
+    for start in range(0, n_rows, chunk_size):
+        chunk = np.column_stack([array[start:start + chunk_size] for array in arrays]) - means
+        gram += chunk.T @ chunk
+
+    scale = np.sqrt(np.diag(gram))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return gram / np.outer(scale, scale)
+
+
+def association_matrix(
+        data: pd.DataFrame,
+        columns: Optional[List[str]] = None,
+        categorical_cols: Optional[List[str]] = None,
+        methods: Sequence[str] = ASSOCIATION_METHODS
+) -> pd.DataFrame:
+    """
+    Вычисляет меры связи между всеми парами колонок смешанного датасета.
+
+    Для пары числовых признаков считаются корреляции Пирсона и Спирмена,
+    для категориального и числового — η, для двух категориальных — V Крамера.
+
+    Каждая колонка обрабатывается один раз: числовые переводятся в массивы
+    и ранжируются, категориальные факторизуются, и эти представления
+    переиспользуются во всех парах. Для колонок без пропусков Пирсон и Спирмен
+    считаются сразу для всех пар одной матричной операцией (по рангам для
+    Спирмена). Пары с пропусками считаются по полным строкам пары, ранги
+    для Спирмена в этом случае пересчитываются на общих строках.
+
+    Параметры
+    ----------
+    data : pd.DataFrame
+        Датасет (например, rides_weather_data).
+    columns : List[str], optional
+        Анализируемые колонки. По умолчанию — все числовые, категориальные,
+        строковые и логические колонки.
+    categorical_cols : List[str], optional
+        Числовые колонки, которые нужно считать категориальными (например, promo).
+    methods : Sequence[str], default=("pearson", "spearman", "eta", "cramers_v")
+        Вычисляемые меры связи.
+
+    Возвращает
+    -------
+    pd.DataFrame
+        Длинная таблица с колонками x, y, method, value, n (число полных строк пары).
+
+    Пример
+    -------
+    >>> assoc = association_matrix(rides_weather_data, categorical_cols=["promo"])
+    >>> assoc[assoc["method"] == "spearman"].pivot(index="x", columns="y", values="value")
+    """
+    unknown = set(methods) - set(ASSOCIATION_METHODS)
+    if unknown:
+        raise ValueError(f"Неподдерживаемые меры связи: {sorted(unknown)}")
+
+    if columns is None:
+        columns = list(data.select_dtypes(include=["number", "category", "object", "bool"]).columns)
+    categorical_cols = set(categorical_cols or [])
+
+    def is_categorical(col: str) -> bool:
+        dtype = data[col].dtype
+        return col in categorical_cols or not pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_bool_dtype(dtype)
+
+    numeric = [col for col in columns if not is_categorical(col)]
+    categorical = [col for col in columns if is_categorical(col)]
+    cache = _ColumnCache(data)
+    rows = []
+
+    # Пирсон и Спирмен для колонок без пропусков — одной матрицей
+    dense = [col for col in numeric if not cache.has_nan(col)]
+    dense_results = {}
+    if len(dense) > 1:
+        for method in ("pearson", "spearman"):
+            if method in methods:
+                arrays = [cache.values(col) if method == "pearson" else cache.ranks(col) for col in dense]
+                dense_results[method] = _gram_correlation(arrays)
+
+    dense_idx = {col: idx for idx, col in enumerate(dense)}
+    for i, x in enumerate(numeric):
+        for y in numeric[i + 1:]:
+            if x in dense_idx and y in dense_idx:
+                for method, matrix in dense_results.items():
+                    rows.append((x, y, method, float(matrix[dense_idx[x], dense_idx[y]]), len(data)))
+                continue
+
+            x_values, y_values = cache.values(x), cache.values(y)
+            valid = ~np.isnan(x_values) & ~np.isnan(y_values)
+            if "pearson" in methods:
+                rows.append((x, y, "pearson", _pearson(x_values[valid], y_values[valid]), int(valid.sum())))
+            if "spearman" in methods:
+                spearman = _pearson(_average_ranks(x_values[valid]), _average_ranks(y_values[valid]))
+                rows.append((x, y, "spearman", spearman, int(valid.sum())))
+
+    if "eta" in methods:
+        for x in categorical:
+            codes, _ = cache.codes(x)
+            has_missing_groups = bool((codes < 0).any())
+            for y in numeric:
+                values = cache.values(y)
+                if not has_missing_groups and not cache.has_nan(y):
+                    # Полные данные: число строк в группах и общая сумма квадратов берутся из кэша
+                    count = cache.group_counts(x)
+                    group_mean = np.bincount(codes, weights=values, minlength=len(count)) / count
+                    ss_between = (count * (group_mean - cache.mean(y)) ** 2).sum()
+                    with np.errstate(invalid="ignore", divide="ignore"):
+                        eta = np.sqrt(min(ss_between / cache.ss_total(y), 1.0))
+                    rows.append((x, y, "eta", float(eta), len(values)))
+                    continue
+
+                valid = (codes >= 0) & ~np.isnan(values)
+                group_codes, n_groups = _compact_codes(codes[valid])
+                eta = _eta_from_codes(group_codes, n_groups, values[valid], decimals=None)
+                rows.append((x, y, "eta", float(eta), int(valid.sum())))
 
-    for group in groups.unique():
-        vals = values[groups == group]
-        ss_between += vals.count() * (vals.mean() - y_mean) ** 2
-        ss_within += ((vals - vals.mean()) ** 2).sum()
+    if "cramers_v" in methods:
+        for i, x in enumerate(categorical):
+            x_codes, _ = cache.codes(x)
+            for y in categorical[i + 1:]:
+                y_codes, _ = cache.codes(y)
+                valid = (x_codes >= 0) & (y_codes >= 0)
+                x_valid, n_x = _compact_codes(x_codes[valid])
+                y_valid, n_y = _compact_codes(y_codes[valid])
+                rows.append((x, y, "cramers_v", _cramers_v(x_valid, n_x, y_valid, n_y), int(valid.sum())))
 
-    return np.sqrt(ss_between / (ss_between + ss_within)).round(3)
+    return pd.DataFrame(rows, columns=["x", "y", "method", "value", "n"])
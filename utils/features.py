@@ -1,7 +1,38 @@
-from typing import Tuple
+from typing import Optional, Tuple
 
+import numpy as np
 import pandas as pd
 
+from .cache import cached_stage
+from .tariffs import TariffSchedule
+
+
+def _build_tariff_table() -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Строит почасовые таблицы тарифа размером 7x24 (день недели × час).
+
+    Таблицы берутся из действующей версии TariffSchedule.default() —
+    единственного описания тарифной сетки, поэтому построчный, векторизованный
+    и версионный расчёты стоимости не могут разойтись. Сетка по умолчанию
+    должна меняться только на границах часов.
+
+    Возвращает:
+    ----------
+    Tuple[np.ndarray, np.ndarray]
+        Цена за минуту [day, hour] и признак промо-окна без платы за старт [day, hour].
+    """
+    schedule = TariffSchedule.default()
+    prices = schedule.prices[-1].reshape(7, 24, 60)
+    promo_free_start = schedule.promo_free_start[-1].reshape(7, 24, 60)
+
+    if (prices != prices[:, :, :1]).any() or (promo_free_start != promo_free_start[:, :, :1]).any():
+        raise ValueError("Тарифная сетка по умолчанию должна меняться только на границах часов")
+
+    return prices[:, :, 0].astype(np.int64), promo_free_start[:, :, 0].copy()
+
+
+_TARIFF_TABLE, _PROMO_FREE_START_TABLE = _build_tariff_table()
+
 
 def _get_price_per_minute(hour: int, day: int) -> int:
     """
@@ -22,34 +53,16 @@ def _get_price_per_minute(hour: int, day: int) -> int:
     Логика:
     - Пн-Пт: стандартные тарифы в зависимости от времени суток
     - Сб-Вс: повышенные тарифы
+    - Сетка задаётся в tariffs.DEFAULT_TARIFF_VERSIONS
     """
-    if day <= 4:
-        # Пн-пт
-        if 1 <= hour < 6:
-            return 3
-        elif 6 <= hour < 10:
-            return 4
-        elif 10 <= hour < 16:
-            return 5
-        elif 16 <= hour < 22:
-            return 6
-        else:
-            return 5
-    else:
-        # Сб-Вс
-        if 1 <= hour < 6:
-            return 3
-        elif 6 <= hour < 10:
-            return 4
-        elif 10 <= hour < 16:
-            return 6
-        elif 16 <= hour < 22:
-            return 7
-        else:
-            return 6
-
-
-def get_total_price(row: pd.Series, start_price: int = 30) -> float:
+    return int(_TARIFF_TABLE[day, hour])
+
+
+def get_total_price(
+        row: pd.Series,
+        start_price: int = 30,
+        schedule: Optional[TariffSchedule] = None
+) -> float:
     """
     Вычисляет общую стоимость поездки на самокате с учетом базовой платы и тарифа за минуту.
 
@@ -62,6 +75,9 @@ def get_total_price(row: pd.Series, start_price: int = 30) -> float:
         - duration_minutes : int или float — длительность поездки в минутах
     start_price : int, default=30
         Фиксированная плата за старт поездки.
+    schedule : TariffSchedule, optional
+        Тарифное расписание. Если задано, цена за минуту, плата за старт
+        и промо-окна берутся из действующей версии расписания, а start_price игнорируется.
 
     Возвращает:
     ----------
@@ -77,11 +93,16 @@ def get_total_price(row: pd.Series, start_price: int = 30) -> float:
     hour = row["start_date"].hour
 
     duration_minutes = row["duration_minutes"]
-    price_per_min = _get_price_per_minute(hour, day_of_week)
-
     is_promo = row["promo"]
 
-    if day_of_week == 0 and 6 <= hour < 10 and is_promo:
+    if schedule is not None:
+        return float(schedule.total_price(
+            [row["start_date"]], [day_of_week], [duration_minutes], [is_promo]
+        )[0])
+
+    price_per_min = _get_price_per_minute(hour, day_of_week)
+
+    if _PROMO_FREE_START_TABLE[day_of_week, hour] and is_promo:
         total_price = price_per_min * duration_minutes
     else:
         total_price = start_price + duration_minutes * price_per_min
@@ -89,6 +110,61 @@ def get_total_price(row: pd.Series, start_price: int = 30) -> float:
     return total_price
 
 
+def get_total_price_vectorized(
+        data: pd.DataFrame,
+        start_price: int = 30,
+        schedule: Optional[TariffSchedule] = None
+) -> pd.Series:
+    """
+    Векторизованно вычисляет общую стоимость всех поездок датасета.
+
+    Даёт тот же результат, что и построчный rides_data.apply(get_total_price, axis=1),
+    но цена за минуту берётся из предвычисленной таблицы 7x24 одной операцией
+    индексирования NumPy, без вызова Python-функции на каждую поездку.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датасет с поездками. Должен содержать колонки:
+        - start_date : pd.Timestamp — дата и время начала поездки
+        - day_of_week : int — день недели (0 — понедельник)
+        - duration_minutes : int или float — длительность поездки в минутах
+        - promo — признак использования промо
+    start_price : int, default=30
+        Фиксированная плата за старт поездки.
+    schedule : TariffSchedule, optional
+        Тарифное расписание с версиями тарифа. Если задано, стоимость считается
+        по действующей на дату поездки версии, а start_price игнорируется.
+
+    Возвращает:
+    ----------
+    pd.Series
+        Общая стоимость каждой поездки с индексом исходного датасета.
+
+    Логика:
+    ----------
+    - В понедельник с 6 до 10 утра при использовании промо берется только тариф за минуту, плата за старт не добавляется.
+    - В остальные дни/часы стоимость = start_price + duration_minutes * price_per_minute
+    """
+    if schedule is not None:
+        total_price = schedule.total_price(
+            data["start_date"], data["day_of_week"], data["duration_minutes"], data["promo"]
+        )
+        return pd.Series(total_price, index=data.index, name="total_price")
+
+    day_of_week = data["day_of_week"].to_numpy(dtype=np.int64)
+    hour = data["start_date"].dt.hour.to_numpy(dtype=np.int64)
+    duration_minutes = data["duration_minutes"].to_numpy(dtype=np.float64)
+    is_promo = data["promo"].to_numpy().astype(bool)
+
+    price_per_min = _TARIFF_TABLE[day_of_week, hour]
+
+    promo_window = _PROMO_FREE_START_TABLE[day_of_week, hour] & is_promo
+    total_price = np.where(promo_window, 0, start_price) + duration_minutes * price_per_min
+
+    return pd.Series(total_price, index=data.index, name="total_price")
+
+
 def filter_time(
         data: pd.DataFrame,
         day_of_week: str,
@@ -102,7 +178,7 @@ def filter_time(
     ----------
     data : pd.DataFrame
         Датасет с поездками. Должен содержать колонки:
-        - 'day_of_week' : str — день недели
+        - 'day_of_week' : str или category — день недели
         - 'start_date' : pd.Timestamp — дата и время начала поездки
     day_of_week : str
         День недели, по которому фильтруем поездки (например, "понедельник").
@@ -140,7 +216,7 @@ def select_control_day(
     ----------
     data : pd.DataFrame
         Датасет с поездками. Должен содержать колонки:
-        - 'day_of_week' : str — день недели
+        - 'day_of_week' : str или category — день недели
         - 'start_date' : pd.Timestamp — дата и время начала поездки
         - 'id' : уникальный идентификатор поездки
         - 'day_timestamp' : pd.Timestamp — уникальный день
@@ -207,7 +283,7 @@ def _create_traffic_df(
     # Группируем по точке и ресемплируем по периоду
     traffic_df = (
         traffic_data
-        .groupby(point_column)
+        .groupby(point_column, observed=True)
         .resample(period, include_groups=False)
         .size()
         .unstack(level=0)
@@ -280,6 +356,7 @@ def create_arrivals_df(
     )
 
 
+@cached_stage()
 def traffic_by_points(
         data: pd.DataFrame,
         period: str,
@@ -335,6 +412,7 @@ def traffic_by_points(
     return total_traffic, net_long
 
 
+@cached_stage()
 def calculate_optimal_scooters(net_long: pd.DataFrame) -> pd.DataFrame:
     """
     Рассчитывает оптимальное количество самокатов для каждой точки за сутки.
@@ -380,10 +458,10 @@ def calculate_optimal_scooters(net_long: pd.DataFrame) -> pd.DataFrame:
 
     # 2. Кумулятивная сумма внутри каждой группы (точка + сутки с 6:00)
     net_long = net_long.sort_values(['point', 'day_6am', 'time'])
-    net_long['cumulative'] = net_long.groupby(['point', 'day_6am'])['net_balance'].cumsum()
+    net_long['cumulative'] = net_long.groupby(['point', 'day_6am'], observed=True)['net_balance'].cumsum()
 
     # 3. Минимальный кумулятивный баланс за сутки = дефицит
-    daily_min = net_long.groupby(['point', 'day_6am'])['cumulative'].min().reset_index()
+    daily_min = net_long.groupby(['point', 'day_6am'], observed=True)['cumulative'].min().reset_index()
     daily_min['optimal_count'] = daily_min['cumulative'].apply(lambda x: abs(x) if x < 0 else 0)
 
     return daily_min
@@ -429,8 +507,8 @@ def create_od_matrix(
 
     if period:
         od_data["period"] = data["start_date"].dt.to_period(period)
-        return od_data.groupby(["period", start_point, end_point]).size().reset_index(name="count")
-    return od_data.groupby([start_point, end_point]).size().reset_index(name="count")
+        return od_data.groupby(["period", start_point, end_point], observed=True).size().reset_index(name="count")
+    return od_data.groupby([start_point, end_point], observed=True).size().reset_index(name="count")
 
 
 def _classify_point(row: pd.Series):
@@ -475,6 +553,7 @@ def _classify_point(row: pd.Series):
         return "unknown"
 
 
+@cached_stage()
 def analyze_od_flows(
         data: pd.DataFrame,
         start_point: str = "start_location",
@@ -521,12 +600,12 @@ def analyze_od_flows(
     od_matrix = create_od_matrix(data, start_point, end_point) if custom_matrix is None else custom_matrix
     od_matrix = create_od_matrix(data, start_point, end_point) if custom_matrix is None else custom_matrix
 
-    outflow = od_matrix.groupby(start_point)["count"].sum().reset_index()
+    outflow = od_matrix.groupby(start_point, observed=True)["count"].sum().reset_index()
     outflow.columns = ["point", "outflow"]
-    inflow = od_matrix.groupby(end_point)["count"].sum().reset_index()
+    inflow = od_matrix.groupby(end_point, observed=True)["count"].sum().reset_index()
     inflow.columns = ["point", "inflow"]
 
-    point_summary = pd.merge(outflow, inflow, on="point", how="outer").fillna(0)
+    point_summary = pd.merge(outflow, inflow, on="point", how="outer").fillna({"outflow": 0, "inflow": 0})
 
     point_summary["net_flow"] = point_summary["inflow"] - point_summary["outflow"]
 
@@ -1,14 +1,335 @@
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
 
 from scipy.stats import ttest_ind, mannwhitneyu, pearsonr, spearmanr, f_oneway
 
 
-def mannwhitneyu_test(
+@dataclass
+class TestResult:
+    """
+    Результат статистического теста.
+
+    Атрибуты:
+    ----------
+    test : str
+        Тест: 'mannwhitneyu', 'student', 'anova', 'spearman' или 'pearson'.
+    target : str
+        Количественный признак (для корреляций — второй признак).
+    factor : str
+        Категориальный фактор (для корреляций — первый признак).
+    statistic : float
+        Статистика теста (для корреляций — коэффициент корреляции).
+    p_value : float
+        p-value теста.
+    effect_size : float
+        Размер эффекта: ранговая бисериальная корреляция (Манн–Уитни),
+        d Коэна (Стьюдент), η² (ANOVA), коэффициент корреляции (корреляции).
+    effect_size_name : str
+        Название меры размера эффекта.
+    n : Dict[str, int]
+        Размер каждой группы (для корреляций — {"n": число наблюдений}).
+    alpha : float
+        Уровень значимости.
+    alternative : str
+        Альтернативная гипотеза.
+    p_adjusted : float, optional
+        p-value с поправкой на множественные сравнения (заполняется run_test_batch).
+    subset : Dict[str, Any]
+        Значения колонок разбиения, на подвыборке которых выполнен тест.
+    """
+    test: str
+    target: str
+    factor: str
+    statistic: float
+    p_value: float
+    effect_size: float
+    effect_size_name: str
+    n: Dict[str, int]
+    alpha: float = 0.05
+    alternative: str = "two-sided"
+    p_adjusted: Optional[float] = None
+    subset: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def significant(self) -> bool:
+        """
+        Отвергается ли нулевая гипотеза (по p_adjusted, если поправка применена).
+        """
+        p_value = self.p_adjusted if self.p_adjusted is not None else self.p_value
+        return bool(p_value < self.alpha)
+
+
+def _groups(
+    data: pd.DataFrame,
+    target: str,
+    factor: str,
+    order: Optional[Sequence[str]] = None
+) -> Tuple[List[str], List[np.ndarray]]:
+    """
+    Возвращает метки групп фактора и значения target в каждой группе.
+
+    Строки один раз упорядочиваются по кодам фактора (устойчивая сортировка,
+    для небольшого числа групп — поразрядная), после чего группы — это
+    непрерывные срезы-представления одного массива float64 без копирования
+    в списки Python.
+
+    Порядок групп задаёт направление односторонних альтернатив
+    ('less'/'greater' сравнивают первую группу со второй), поэтому он
+    не зависит от типа колонки: по умолчанию группы идут в порядке сортировки
+    значений (для строк — лексикографическом, как groupby по строковой
+    колонке), даже если фактор — упорядоченная категория (например,
+    promo: "Нет" < "Да"). Явный порядок передаётся через order.
+    """
+    factor_values = data[factor]
+    if isinstance(factor_values.dtype, pd.CategoricalDtype):
+        codes, labels = factor_values.cat.codes.to_numpy(), factor_values.cat.categories
+        # Порядок значений категорий, а не объявленный порядок упорядоченной категории
+        label_rank = np.argsort(labels.argsort())
+    else:
+        codes, labels = pd.factorize(factor_values, sort=True)
+        label_rank = np.arange(len(labels))
+
+    values = data[target].to_numpy(dtype=np.float64, na_value=np.nan)
+    is_valid = codes >= 0
+    if not is_valid.all():
+        codes, values = codes[is_valid], values[is_valid]
+
+    code_dtype = np.int16 if len(labels) <= np.iinfo(np.int16).max else np.int64
+    order_idx = np.argsort(codes.astype(code_dtype), kind="stable")
+    sorted_values = values[order_idx]
+
+    counts = np.bincount(codes, minlength=len(labels))
+    groups = np.split(sorted_values, np.cumsum(counts)[:-1])
+    observed_idx = np.flatnonzero(counts)
+    observed_idx = observed_idx[np.argsort(label_rank[observed_idx], kind="stable")]
+    observed = {str(labels[idx]): idx for idx in observed_idx}
+
+    if order is None:
+        names = list(observed)
+    else:
+        names = [str(name) for name in order]
+        missing = [name for name in names if name not in observed]
+        if missing:
+            raise ValueError(f"В колонке {factor} нет групп: {missing}")
+
+    return names, [groups[observed[name]] for name in names]
+
+
+def compute_mannwhitneyu(
+    data: pd.DataFrame,
+    target: str,
+    factor: str,
+    alternative: str = "two-sided",
+    alpha: float = 0.05,
+    order: Optional[Sequence[str]] = None
+) -> TestResult:
+    """
+    Выполняет тест Манна–Уитни и возвращает результат без вывода.
+
+    Размер эффекта — ранговая бисериальная корреляция 2U / (n1 * n2) - 1
+    (положительная, если значения первой группы чаще больше).
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датасет с данными.
+    target : str
+        Название количественного признака.
+    factor : str
+        Название категориального признака с двумя группами.
+    alternative : str, default='two-sided'
+        Альтернатива: 'two-sided', 'less', 'greater'.
+    alpha : float, default=0.05
+        Уровень значимости теста.
+    order : Sequence[str], optional
+        Порядок двух групп (первая сравнивается со второй).
+        По умолчанию — лексикографический порядок меток.
+
+    Возвращает:
+    ----------
+    TestResult
+        Результат теста.
+    """
+    labels, groups = _groups(data, target, factor, order)
+    stat, p = mannwhitneyu(*groups, alternative=alternative)
+    n1, n2 = len(groups[0]), len(groups[1])
+
+    return TestResult(
+        test="mannwhitneyu", target=target, factor=factor,
+        statistic=float(stat), p_value=float(p),
+        effect_size=float(2 * stat / (n1 * n2) - 1), effect_size_name="rank_biserial",
+        n=dict(zip(labels, (n1, n2))), alpha=alpha, alternative=alternative,
+    )
+
+
+def compute_student(
     data: pd.DataFrame,
     target: str,
     factor: str,
     alternative: str = "two-sided",
+    alpha: float = 0.05,
+    order: Optional[Sequence[str]] = None
+) -> TestResult:
+    """
+    Выполняет тест Стьюдента и возвращает результат без вывода.
+
+    Размер эффекта — d Коэна с объединённым стандартным отклонением.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датасет с данными.
+    target : str
+        Название количественного признака.
+    factor : str
+        Название категориального признака с двумя группами.
+    alternative : str, default='two-sided'
+        Альтернатива: 'two-sided', 'less', 'greater'.
+    alpha : float, default=0.05
+        Уровень значимости теста.
+    order : Sequence[str], optional
+        Порядок двух групп (первая сравнивается со второй).
+        По умолчанию — лексикографический порядок меток.
+
+    Возвращает:
+    ----------
+    TestResult
+        Результат теста.
+    """
+    labels, groups = _groups(data, target, factor, order)
+    stat, p = ttest_ind(*groups, alternative=alternative)
+
+    first, second = groups[:2]
+    n1, n2 = len(first), len(second)
+    pooled_var = ((n1 - 1) * first.var(ddof=1) + (n2 - 1) * second.var(ddof=1)) / (n1 + n2 - 2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cohen_d = (first.mean() - second.mean()) / np.sqrt(pooled_var)
+
+    return TestResult(
+        test="student", target=target, factor=factor,
+        statistic=float(stat), p_value=float(p),
+        effect_size=float(cohen_d), effect_size_name="cohen_d",
+        n=dict(zip(labels, (n1, n2))), alpha=alpha, alternative=alternative,
+    )
+
+
+def compute_anova(
+    data: pd.DataFrame,
+    target: str,
+    factor: str,
     alpha: float = 0.05
+) -> TestResult:
+    """
+    Выполняет однофакторный ANOVA и возвращает результат без вывода.
+
+    Размер эффекта — η² (доля межгрупповой суммы квадратов).
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датасет с данными.
+    target : str
+        Количественный признак.
+    factor : str
+        Категориальный фактор (несколько групп).
+    alpha : float, default=0.05
+        Уровень значимости.
+
+    Возвращает:
+    ----------
+    TestResult
+        Результат теста.
+    """
+    labels, groups = _groups(data, target, factor)
+    stat, p = f_oneway(*groups)
+
+    grand_mean = sum(values.sum() for values in groups) / sum(len(values) for values in groups)
+    ss_between = sum(len(values) * (values.mean() - grand_mean) ** 2 for values in groups)
+    ss_total = sum(((values - grand_mean) ** 2).sum() for values in groups)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        eta_squared = ss_between / ss_total
+
+    return TestResult(
+        test="anova", target=target, factor=factor,
+        statistic=float(stat), p_value=float(p),
+        effect_size=float(eta_squared), effect_size_name="eta_squared",
+        n={label: len(values) for label, values in zip(labels, groups)}, alpha=alpha,
+    )
+
+
+def compute_spearman(data: pd.DataFrame, x: str, y: str, alpha: float = 0.05) -> TestResult:
+    """
+    Выполняет корреляцию Спирмена и возвращает результат без вывода.
+    """
+    corr, p = spearmanr(data[x], data[y])
+    return TestResult(
+        test="spearman", target=y, factor=x,
+        statistic=float(corr), p_value=float(p),
+        effect_size=float(corr), effect_size_name="spearman_rho",
+        n={"n": len(data)}, alpha=alpha,
+    )
+
+
+def compute_pearson(data: pd.DataFrame, x: str, y: str, alpha: float = 0.05) -> TestResult:
+    """
+    Выполняет корреляцию Пирсона и возвращает результат без вывода.
+    """
+    corr, p = pearsonr(data[x], data[y])
+    return TestResult(
+        test="pearson", target=y, factor=x,
+        statistic=float(corr), p_value=float(p),
+        effect_size=float(corr), effect_size_name="pearson_r",
+        n={"n": len(data)}, alpha=alpha,
+    )
+
+
+def format_result(result: TestResult) -> str:
+    """
+    Формирует текстовый вывод результата теста.
+
+    Параметры:
+    ----------
+    result : TestResult
+        Результат теста.
+
+    Возвращает:
+    ----------
+    str
+        Строка с p-value и выводом о значимости.
+    """
+    p, significant = result.p_value, result.p_value < result.alpha
+
+    if result.test in ("mannwhitneyu", "student"):
+        name = "Тест Манна–Уитни" if result.test == "mannwhitneyu" else "Тест Стьюдента"
+        verdict = "Есть статистически значимая разница." if significant else "Нет статистически значимой разницы."
+        return f"{name} {result.factor}: p-value={p:.4f} → {verdict}"
+
+    if result.test == "anova":
+        verdict = (
+            "Есть статистически значимая разница между группами." if significant
+            else "Нет статистически значимой разницы между группами."
+        )
+        return f"ANOVA {result.factor}: F-statistic={result.statistic:.4f}, p-value={p:.4f} → {verdict}"
+
+    name = "Корреляция Спирмена" if result.test == "spearman" else "Корреляция Пирсона"
+    verdict = "Статистически значимая связь есть." if significant else "Статистически значимая связь отсутствует."
+    return (
+        f"{name} ({result.factor}, {result.target}): correlation={result.statistic:.4f}, "
+        f"p-value={p:.4f} → {verdict}"
+    )
+
+
+def mannwhitneyu_test(
+    data: pd.DataFrame,
+    target: str,
+    factor: str,
+    alternative: str = "two-sided",
+    alpha: float = 0.05,
+    order: Optional[Sequence[str]] = None
 ) -> None:
     """
     Выполняет тест Манна–Уитни для сравнения двух групп по количественному признаку.
@@ -25,15 +346,10 @@ def mannwhitneyu_test(
         Альтернатива: 'two-sided', 'less', 'greater'.
     alpha : float, default=0.05
         Уровень значимости теста.
+    order : Sequence[str], optional
+        Порядок двух групп (см. compute_mannwhitneyu).
     """
-    groups = data.groupby(factor)[target].apply(list)
-    stat, p = mannwhitneyu(*groups, alternative=alternative)
-    if p >= alpha:
-        msg = f"Тест Манна–Уитни {factor}: p-value={p:.4f} → Нет статистически значимой разницы."
-    else:
-        msg = f"Тест Манна–Уитни {factor}: p-value={p:.4f} → Есть статистически значимая разница."
-
-    print(msg)
+    print(format_result(compute_mannwhitneyu(data, target, factor, alternative, alpha, order)))
 
 
 def student_test(
@@ -41,7 +357,8 @@ def student_test(
     target: str,
     factor: str,
     alternative: str,
-    alpha: int = 0.05
+    alpha: int = 0.05,
+    order: Optional[Sequence[str]] = None
 ) -> None:
     """
     Выполняет тест Стьюдента для сравнения двух групп по количественному признаку.
@@ -56,15 +373,10 @@ def student_test(
         Название категориального признака с двумя группами.
     alternative : str
         Альтернатива: 'two-sided', 'less', 'greater'.
+    order : Sequence[str], optional
+        Порядок двух групп (см. compute_student).
     """
-    groups = data.groupby(factor)[target].apply(list)
-    stat, p = ttest_ind(*groups, alternative=alternative)
-    if p >= alpha:
-        msg = f"Тест Стьюдента {factor}: p-value={p:.4f} → Нет статистически значимой разницы."
-    else:
-        msg = f"Тест Стьюдента {factor}: p-value={p:.4f} → Есть статистически значимая разница."
-
-    print(msg)
+    print(format_result(compute_student(data, target, factor, alternative, alpha, order)))
 
 
 def spearman_correlation(
@@ -85,13 +397,7 @@ def spearman_correlation(
     y : str
         Второй количественный признак.
     """
-    corr, p = spearmanr(data[x], data[y])
-    if p >= alpha:
-        msg = f"Корреляция Спирмена ({x}, {y}): correlation={corr:.4f}, p-value={p:.4f} → Статистически значимая связь отсутствует."
-    else:
-        msg = f"Корреляция Спирмена ({x}, {y}): correlation={corr:.4f}, p-value={p:.4f} → Статистически значимая связь есть."
-
-    print(msg)
+    print(format_result(compute_spearman(data, x, y, alpha)))
 
 
 def pearson_correlation(
@@ -112,13 +418,7 @@ def pearson_correlation(
     y : str
         Второй количественный признак.
     """
-    corr, p = pearsonr(data[x], data[y])
-    if p >= alpha:
-        msg = f"Корреляция Пирсона ({x}, {y}): correlation={corr:.4f}, p-value={p:.4f} → Статистически значимая связь отсутствует."
-    else:
-        msg = f"Корреляция Пирсона ({x}, {y}): correlation={corr:.4f}, p-value={p:.4f} → Статистически значимая связь есть."
-
-    print(msg)
+    print(format_result(compute_pearson(data, x, y, alpha)))
 
 
 def anova_test(
@@ -141,11 +441,135 @@ def anova_test(
     alpha : float, optional
         Уровень значимости, по умолчанию 0.05.
     """
-    groups = data.groupby(factor)[target].apply(list)
-    stat, p = f_oneway(*groups)
-    if p >= alpha:
-        msg = f"ANOVA {factor}: F-statistic={stat:.4f}, p-value={p:.4f} → Нет статистически значимой разницы между группами."
+    print(format_result(compute_anova(data, target, factor, alpha)))
+
+
+TESTS = {
+    "mannwhitneyu": compute_mannwhitneyu,
+    "student": compute_student,
+    "anova": compute_anova,
+    "spearman": compute_spearman,
+    "pearson": compute_pearson,
+}
+
+
+def adjust_pvalues(p_values: np.ndarray, method: str = "holm") -> np.ndarray:
+    """
+    Применяет поправку на множественные сравнения.
+
+    Параметры:
+    ----------
+    p_values : np.ndarray
+        Исходные p-value (NaN сохраняются и не учитываются).
+    method : str, default='holm'
+        'bonferroni', 'holm' (Холм–Бонферрони) или 'fdr_bh' (Бенджамини–Хохберг).
+
+    Возвращает:
+    ----------
+    np.ndarray
+        Скорректированные p-value.
+    """
+    p_values = np.asarray(p_values, dtype=np.float64)
+    adjusted = np.full_like(p_values, np.nan)
+    valid = ~np.isnan(p_values)
+    p = p_values[valid]
+    m = len(p)
+    if m == 0:
+        return adjusted
+
+    if method == "bonferroni":
+        result = np.minimum(p * m, 1.0)
+    elif method == "holm":
+        order = np.argsort(p)
+        stepped = np.maximum.accumulate(p[order] * (m - np.arange(m)))
+        result = np.empty(m)
+        result[order] = np.minimum(stepped, 1.0)
+    elif method == "fdr_bh":
+        order = np.argsort(p)[::-1]
+        stepped = np.minimum.accumulate(p[order] * m / np.arange(m, 0, -1))
+        result = np.empty(m)
+        result[order] = np.minimum(stepped, 1.0)
     else:
-        msg = f"ANOVA {factor}: F-statistic={stat:.4f}, p-value={p:.4f} → Есть статистически значимая разница между группами."
+        raise ValueError(f"Неподдерживаемая поправка: {method}")
+
+    adjusted[valid] = result
+    return adjusted
+
+
+def _run_test(spec: Dict[str, Any], subset_data: pd.DataFrame, subset: Dict[str, Any]) -> TestResult:
+    """
+    Выполняет один тест из описания spec на подвыборке.
+    """
+    params = {key: value for key, value in spec.items() if key != "test"}
+    result = TESTS[spec["test"]](subset_data, **params)
+    result.subset = subset
+    return result
+
+
+def run_test_batch(
+    data: pd.DataFrame,
+    tests: List[Dict[str, Any]],
+    by: Optional[List[str]] = None,
+    correction: Optional[str] = "holm",
+    n_jobs: int = 1
+) -> pd.DataFrame:
+    """
+    Выполняет набор тестов, при необходимости — в каждой подгруппе разбиения,
+    и применяет поправку на множественные сравнения ко всему набору.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датасет с данными.
+    tests : List[Dict[str, Any]]
+        Описания тестов: ключ 'test' ('mannwhitneyu', 'student', 'anova',
+        'spearman', 'pearson') и параметры соответствующей функции compute_*,
+        например {"test": "mannwhitneyu", "target": "distance", "factor": "promo"}.
+    by : List[str], optional
+        Колонки разбиения (например, ['start_district']): каждый тест
+        выполняется отдельно в каждой подгруппе.
+    correction : str, optional, default='holm'
+        Поправка: 'bonferroni', 'holm', 'fdr_bh' или None.
+    n_jobs : int, default=1
+        Количество процессов joblib (-1 — все ядра).
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        По строке на тест: колонки TestResult, колонки разбиения и significant.
+
+    Пример:
+    -------
+    >>> run_test_batch(
+    ...     rides_weather_data,
+    ...     [{"test": "mannwhitneyu", "target": "distance", "factor": "promo"}],
+    ...     by=["start_district"], correction="fdr_bh",
+    ... )
+    """
+    if by:
+        subsets = [
+            (dict(zip(by, key if isinstance(key, tuple) else (key,))), subset_data)
+            for key, subset_data in data.groupby(by, observed=True)
+        ]
+    else:
+        subsets = [({}, data)]
+
+    tasks = []
+    for subset, subset_data in subsets:
+        for spec in tests:
+            columns = [spec[key] for key in ("target", "factor", "x", "y") if key in spec]
+            tasks.append((spec, subset_data[columns], subset))
+
+    results = Parallel(n_jobs=n_jobs)(
+        delayed(_run_test)(spec, subset_data, subset) for spec, subset_data, subset in tasks
+    )
+
+    if correction is not None:
+        adjusted = adjust_pvalues(np.array([result.p_value for result in results]), correction)
+        for result, p_adjusted in zip(results, adjusted):
+            result.p_adjusted = float(p_adjusted)
 
-    print(msg)
+    report = pd.DataFrame([
+        {**result.subset, **asdict(result), "significant": result.significant} for result in results
+    ])
+    return report.drop(columns=["subset"])
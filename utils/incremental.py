@@ -0,0 +1,258 @@
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+from .modeling import (
+    DEFAULT_HOURLY_AGGS, HOUR_NS, _category_codes_to_ranks, _category_ranks,
+    _fill_empty_hours, _lag_matrix_features, _restore_labels
+)
+
+
+class IncrementalHourlyBuilder:
+    """
+    Инкрементальное построение почасового датасета с лаговыми признаками.
+
+    Вместо пересчёта build_hourly_dataset + add_lag_features по всей истории
+    хранит только состояние:
+    • частичные агрегаты ещё не закрытых часов (количество поездок,
+      суммы и число значений для средних, минимумы и максимумы)
+    • кольцевой буфер спроса за последние max(lags, windows) закрытых часов
+    • последнюю известную погоду — для часов без поездок
+
+    Каждый вызов update добавляет новую порцию поездок и возвращает строки
+    только для часов, закрытых водяным знаком (watermark). Признаки
+    совпадают с полным пересчётом build_hourly_dataset(...) →
+    add_lag_features(..., dropna=False) на той же истории.
+
+    Поездки в уже закрытые часы не учитываются и подсчитываются в late_rows.
+
+    Пример:
+    -------
+    >>> builder = IncrementalHourlyBuilder()
+    >>> for batch in hourly_batches:
+    ...     new_hours = builder.update(batch)
+    >>> builder.flush()
+    >>> hourly = builder.dataset()
+    """
+
+    def __init__(
+            self,
+            timestamp_col: str = "hour_timestamp",
+            extra_aggs: Optional[Dict[str, Tuple[str, str]]] = None,
+            lags: Sequence[int] = (1, 24),
+            windows: Sequence[int] = (24, 24 * 7),
+            stats: Sequence[str] = ("mean",),
+            min_periods: Optional[int] = None
+    ):
+        self.timestamp_col = timestamp_col
+        self.aggs = {**DEFAULT_HOURLY_AGGS, **(extra_aggs or {})}
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.stats = tuple(stats)
+        self.min_periods = min_periods
+
+        self.history_size = max([*self.lags, *self.windows, 1])
+        self.demand_buffer = np.empty(0)
+        self.next_hour: Optional[int] = None
+        self.late_rows = 0
+
+        self._schema: Optional[pd.DataFrame] = None
+        self._partial: Optional[pd.DataFrame] = None
+        self._partial_aggs = self._build_partial_aggs()
+        self._closed: List[pd.DataFrame] = []
+        self._last_weather: Dict[str, float] = {}
+
+    def _build_partial_aggs(self) -> Dict[str, str]:
+        """
+        Колонки частичных агрегатов и функции их объединения между порциями.
+        """
+        partial_aggs = {"__demand": "sum"}
+        for name, (_, how) in self.aggs.items():
+            if how == "mean":
+                partial_aggs[f"{name}__sum"] = "sum"
+                partial_aggs[f"{name}__count"] = "sum"
+            elif how in ("count", "sum"):
+                partial_aggs[name] = "sum"
+            elif how in ("min", "max"):
+                partial_aggs[name] = how
+            else:
+                raise ValueError(f"Неподдерживаемая агрегация: {how}")
+        return partial_aggs
+
+    def _partial_aggregate(self, rides: pd.DataFrame, hours: np.ndarray) -> pd.DataFrame:
+        """
+        Считает частичные агрегаты порции поездок по часам.
+        """
+        columns = {"__demand": rides["id"].notna().to_numpy(dtype=np.float64)}
+
+        for name, (col, how) in self.aggs.items():
+            source = rides[col]
+            schema_dtype = self._schema[col].dtype
+
+            if how in ("min", "max"):
+                if isinstance(schema_dtype, pd.CategoricalDtype):
+                    codes = source.astype(schema_dtype).cat.codes.to_numpy()
+                    columns[name] = _category_codes_to_ranks(codes, schema_dtype)
+                else:
+                    columns[name] = source.to_numpy()
+                continue
+
+            values = source.to_numpy(dtype=np.float64, na_value=np.nan)
+            is_valid = ~np.isnan(values)
+            if how == "mean":
+                columns[f"{name}__sum"] = np.where(is_valid, values, 0.0)
+                columns[f"{name}__count"] = is_valid.astype(np.float64)
+            elif how == "count":
+                columns[name] = is_valid.astype(np.float64)
+            else:
+                columns[name] = np.where(is_valid, values, 0.0)
+
+        return pd.DataFrame(columns, index=hours).groupby(level=0).agg(self._partial_aggs)
+
+    def update(
+            self,
+            rides: pd.DataFrame,
+            watermark: Optional[Union[str, pd.Timestamp]] = None
+    ) -> pd.DataFrame:
+        """
+        Добавляет порцию поездок и закрывает часы до водяного знака.
+
+        Параметры:
+        ----------
+        rides : pd.DataFrame
+            Новые поездки с колонками timestamp_col, id и колонками агрегатов.
+            Поездки без временной метки не учитываются.
+        watermark : str | pd.Timestamp, optional
+            Все часы раньше watermark считаются закрытыми (данных по ним больше
+            не будет). По умолчанию — час самой поздней поездки в порции:
+            он остаётся открытым до следующей порции.
+
+        Возвращает:
+        ----------
+        pd.DataFrame
+            Новые закрытые часы с факторами и лаговыми признаками.
+        """
+        if self._schema is None and len(rides):
+            self._schema = rides.iloc[:0].copy()
+
+        # Поездки без временной метки не относятся ни к одному часу, как и в build_hourly_dataset
+        has_timestamp = rides[self.timestamp_col].notna().to_numpy()
+        if not has_timestamp.all():
+            rides = rides[has_timestamp]
+
+        if len(rides):
+            timestamps = rides[self.timestamp_col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+            hours = timestamps // HOUR_NS * HOUR_NS
+            if self.next_hour is None:
+                self.next_hour = int(hours.min())
+
+            is_late = hours < self.next_hour
+            self.late_rows += int(is_late.sum())
+            rides, hours = rides[~is_late], hours[~is_late]
+
+            if len(rides):
+                partial = self._partial_aggregate(rides, hours)
+                if self._partial is not None:
+                    partial = pd.concat([self._partial, partial]).groupby(level=0).agg(self._partial_aggs)
+                self._partial = partial
+
+            if watermark is None and len(hours):
+                watermark = pd.Timestamp(int(hours.max()))
+
+        if watermark is None or self.next_hour is None:
+            return self._empty_frame()
+
+        until = pd.Timestamp(watermark).value // HOUR_NS * HOUR_NS
+        return self._close(until)
+
+    def flush(self) -> pd.DataFrame:
+        """
+        Закрывает все часы, по которым есть поездки.
+        """
+        if self._partial is None or self._partial.empty:
+            return self._empty_frame()
+        return self._close(int(self._partial.index.max()) + HOUR_NS)
+
+    def _close(self, until: int) -> pd.DataFrame:
+        """
+        Финализирует агрегаты часов [next_hour, until) и считает для них лаговые признаки.
+        """
+        n_hours = (until - self.next_hour) // HOUR_NS
+        if n_hours <= 0:
+            return self._empty_frame()
+
+        hours = pd.DatetimeIndex(self.next_hour + np.arange(n_hours, dtype=np.int64) * HOUR_NS)
+        partial = self._partial if self._partial is not None else pd.DataFrame(columns=list(self._partial_aggs))
+        closing = partial[partial.index < until].reindex(hours.asi8)
+
+        hourly = {
+            self.timestamp_col: hours,
+            "demand": closing["__demand"].fillna(0).to_numpy(),
+        }
+        for name, (col, how) in self.aggs.items():
+            if how == "mean":
+                total = closing[f"{name}__sum"].to_numpy(dtype=np.float64, na_value=np.nan)
+                count = closing[f"{name}__count"].fillna(0).to_numpy(dtype=np.float64)
+                with np.errstate(invalid="ignore", divide="ignore"):
+                    hourly[name] = np.where(count > 0, total / count, np.nan)
+            elif how in ("count", "sum"):
+                hourly[name] = closing[name].fillna(0).to_numpy(dtype=np.float64)
+            else:
+                hourly[name] = self._finalize_extreme(closing[name], self._schema[col])
+
+        hourly = pd.DataFrame(hourly)
+        hourly["demand"] = hourly["demand"].astype(np.int64)
+        self._last_weather = _fill_empty_hours(hourly, self._schema, self.aggs, hours, self._last_weather)
+        hourly["hour_of_day"] = hourly[self.timestamp_col].dt.hour
+
+        series = np.concatenate([self.demand_buffer, hourly["demand"].to_numpy(dtype=np.float64)])
+        features = _lag_matrix_features(
+            series[np.newaxis, :], self.lags, self.windows, self.stats, (), self.min_periods
+        )
+        for name, values in features.items():
+            hourly[name] = values[0, -n_hours:]
+
+        self.demand_buffer = series[-self.history_size:]
+        if self._partial is not None:
+            self._partial = self._partial[self._partial.index >= until]
+        self.next_hour = until
+        self._closed.append(hourly)
+
+        return hourly
+
+    def _finalize_extreme(self, values: pd.Series, source: pd.Series):
+        """
+        Возвращает минимумам/максимумам часа исходный тип колонки.
+        """
+        if isinstance(source.dtype, pd.CategoricalDtype):
+            return _restore_labels(
+                values.to_numpy(dtype=np.float64, na_value=np.nan), source, _category_ranks(source.dtype)[1]
+            )
+        if pd.api.types.is_numeric_dtype(source):
+            return _restore_labels(values.to_numpy(dtype=np.float64, na_value=np.nan), source, None)
+        return values.to_numpy(dtype=object)
+
+    def _empty_frame(self) -> pd.DataFrame:
+        if self._closed:
+            return self._closed[-1].iloc[:0]
+        return pd.DataFrame()
+
+    def dataset(self, dropna: bool = False) -> pd.DataFrame:
+        """
+        Возвращает все закрытые часы одним датасетом.
+
+        Параметры:
+        ----------
+        dropna : bool, default=False
+            Удалить строки с пропусками, как add_lag_features(dropna=True).
+
+        Возвращает:
+        ----------
+        pd.DataFrame
+            Почасовой датасет с лаговыми признаками.
+        """
+        if not self._closed:
+            return pd.DataFrame()
+        hourly = pd.concat(self._closed, ignore_index=True)
+        return hourly.dropna() if dropna else hourly
@@ -0,0 +1,146 @@
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .cleaning import normalize_districts, normalize_streets
+from .paths import join_path
+from .storage import RAW_INPUTS, RIDES_DATASET_PARTS, write_partitioned
+
+DEFAULT_CHUNKSIZE = 500_000
+
+
+def _normalize_column_name(col: str) -> str:
+    """
+    Приводит название колонки выгрузки к виду snake_case: "Start Date" -> "start_date".
+    """
+    return col.strip().lower().replace(" ", "_")
+
+
+def _detect_sep(path: Path) -> str:
+    """
+    Определяет разделитель CSV по строке заголовка (',' или ';').
+    """
+    with open(path, encoding="utf-8") as file:
+        header = file.readline()
+    return ";" if header.count(";") > header.count(",") else ","
+
+
+def _clean_rides_chunk(chunk: pd.DataFrame, max_distance: float) -> pd.DataFrame:
+    """
+    Очищает одну порцию сырых поездок.
+
+    Шаги:
+    - переименование колонок в snake_case
+    - приведение distance и promo к числам (некорректные значения -> NaN)
+    - нормализация улиц и районов через кэш уникальных значений
+    - удаление поездок с distance >= max_distance (пропуски сохраняются
+      для последующего заполнения медианой по маршруту)
+    """
+    chunk = chunk.rename(columns=_normalize_column_name)
+
+    for col in ["distance", "promo"]:
+        if col in chunk.columns:
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce")
+
+    for col in ["start_location", "end_location"]:
+        if col in chunk.columns:
+            chunk[col] = normalize_streets(chunk[col])
+
+    for col in ["start_district", "end_district"]:
+        if col in chunk.columns:
+            chunk[col] = normalize_districts(chunk[col])
+
+    return chunk[~(chunk["distance"] >= max_distance)]
+
+
+def ingest_rides_csv(
+        src: Optional[Path] = None,
+        dst_dir: Optional[Path] = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        max_distance: float = 10_000,
+        key_cols: Optional[List[str]] = None
+) -> Dict[str, int]:
+    """
+    Потоково загружает сырую выгрузку поездок и сохраняет её порциями в Parquet.
+
+    Файл читается частями по chunksize строк; каждая часть очищается
+    (переименование колонок, приведение типов, нормализация улиц и районов,
+    фильтр по distance), из неё удаляются дубликаты по key_cols — как внутри
+    части, так и относительно уже записанных частей, — и результат сразу
+    дописывается в датасет, разбитый по дням (write_partitioned), файлами part-NNNNN.parquet.
+
+    Пиковая память ограничена размером одной части. Между частями хранится
+    только отсортированный массив 64-битных хэшей ключей дедупликации
+    (8 байт на поездку).
+
+    Параметры:
+    ----------
+    src : Path, optional
+        Путь к сырому CSV. По умолчанию — data/rides.csv.
+    dst_dir : Path, optional
+        Корень датасета Parquet. По умолчанию — data/cleaned/rides_dataset.
+        Ранее записанные части в нём удаляются.
+    chunksize : int, default=500_000
+        Количество строк в одной части.
+    max_distance : float, default=10_000
+        Поездки с distance >= max_distance (в метрах) отбрасываются.
+    key_cols : List[str], optional
+        Ключ дедупликации. По умолчанию — ['id', 'start_date'].
+
+    Возвращает:
+    ----------
+    Dict[str, int]
+        Статистика загрузки: rows_read, filtered, duplicates, rows_written, parts.
+
+    Пример:
+    -------
+    >>> stats = ingest_rides_csv()
+    >>> rides_data = load_partitioned(start="2024-06-01", end="2024-06-08")
+    """
+    raw_input = RAW_INPUTS["rides"]
+    src = Path(src) if src is not None else join_path(*raw_input["parts"])
+    dst_dir = Path(dst_dir) if dst_dir is not None else join_path(*RIDES_DATASET_PARTS)
+    key_cols = key_cols or ["id", "start_date"]
+
+    dst_dir.mkdir(parents=True, exist_ok=True)
+    for old_part in dst_dir.rglob("part-*.parquet"):
+        old_part.unlink()
+
+    reader = pd.read_csv(
+        src,
+        encoding="utf-8",
+        sep=_detect_sep(src),
+        parse_dates=raw_input["date_cols"],
+        chunksize=chunksize,
+    )
+
+    seen_keys = np.empty(0, dtype=np.uint64)
+    stats = {"rows_read": 0, "filtered": 0, "duplicates": 0, "rows_written": 0, "parts": 0}
+
+    for chunk in reader:
+        stats["rows_read"] += len(chunk)
+
+        cleaned = _clean_rides_chunk(chunk, max_distance)
+        stats["filtered"] += len(chunk) - len(cleaned)
+
+        keys = pd.util.hash_pandas_object(cleaned[key_cols], index=False).to_numpy()
+        _, first_idx = np.unique(keys, return_index=True)
+        is_new = np.zeros(len(keys), dtype=bool)
+        is_new[first_idx] = True
+
+        if len(seen_keys):
+            positions = np.searchsorted(seen_keys, keys).clip(max=len(seen_keys) - 1)
+            is_new &= seen_keys[positions] != keys
+
+        cleaned = cleaned[is_new]
+        stats["duplicates"] += int((~is_new).sum())
+
+        if len(cleaned):
+            seen_keys = np.union1d(seen_keys, keys[is_new])
+            write_partitioned(cleaned, dst_dir, part_name=f"part-{stats['parts']:05d}")
+            stats["rows_written"] += len(cleaned)
+            stats["parts"] += 1
+
+    return stats
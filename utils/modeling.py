@@ -1,16 +1,257 @@
+from pathlib import Path
+
+import joblib
+import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from scipy import sparse
+from sklearn.base import clone
+from sklearn.metrics import mean_absolute_error, r2_score
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import OneHotEncoder
-from typing import Tuple, List
+from typing import Dict, Iterator, Tuple, List, Optional, Sequence, Union
+
+from .cache import cached_stage
+from .cleaning import DAY_NAMES, PROMO_LABELS
+
+
+# Агрегации почасового датасета по умолчанию: имя колонки -> (исходная колонка, функция)
+DEFAULT_HOURLY_AGGS: Dict[str, Tuple[str, str]] = {
+    "day_of_week": ("day_of_week", "max"),
+    "temperature": ("temperature", "mean"),
+    "mean_precipitation_total": ("precipitation_total", "mean"),
+    "mean_cloud_cover_total": ("cloud_cover_total", "mean"),
+    "promo": ("promo", "max"),
+}
+
+# Погодные средние почасового датасета: в часы без поездок берётся последнее известное значение
+WEATHER_HOURLY_COLS = ("temperature", "mean_precipitation_total", "mean_cloud_cover_total")
+
+HOUR_NS = 3_600_000_000_000
+
+
+def _category_ranks(dtype: pd.CategoricalDtype) -> Tuple[np.ndarray, pd.Index]:
+    """
+    Ранги категорий по значениям меток и категории в порядке значений.
+
+    min/max категориальной колонки считаются по значениям меток, как для
+    строковой колонки, а не по порядку категорий: для promo ("Нет" < "Да")
+    максимум часа остаётся "Нет", если в этот час была поездка без промо.
+    """
+    order = dtype.categories.argsort()
+    ranks = np.empty(len(order), dtype=np.float64)
+    ranks[order] = np.arange(len(order))
+    return ranks, dtype.categories[order]
+
+
+def _category_codes_to_ranks(codes: np.ndarray, dtype: pd.CategoricalDtype) -> np.ndarray:
+    """
+    Заменяет коды категорий рангами меток (_category_ranks); пропуски становятся NaN.
+    """
+    ranks, _ = _category_ranks(dtype)
+    return np.where(codes >= 0, ranks[codes], np.nan)
 
 
-def build_hourly_dataset(data: pd.DataFrame, timestamp_col: str = "hour_timestamp") -> pd.DataFrame:
+def _to_numeric_codes(values: pd.Series) -> Tuple[np.ndarray, Optional[pd.Index]]:
+    """
+    Переводит колонку в числовой массив для агрегации min/max.
+
+    Категории и строки заменяются кодами отсортированных значений меток
+    (для категорий — _category_ranks), пропуски становятся NaN.
+    Возвращает массив и метки для обратного преобразования (None для чисел).
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        codes = _category_codes_to_ranks(values.cat.codes.to_numpy(), values.dtype)
+        return codes, _category_ranks(values.dtype)[1]
+    if pd.api.types.is_numeric_dtype(values):
+        return values.to_numpy(dtype=np.float64, na_value=np.nan), None
+
+    codes, uniques = pd.factorize(values, sort=True)
+    codes = codes.astype(np.float64)
+    codes[codes < 0] = np.nan
+    return codes, uniques
+
+
+def _group_reduce(
+        codes: np.ndarray,
+        values: np.ndarray,
+        how: str,
+        n_groups: int,
+        starts: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Агрегирует values по плотным кодам групп 0..n_groups-1 без хэш-таблиц.
+
+    Без starts используется прямая адресация (np.bincount, ufunc.at).
+    Для входа, отсортированного по кодам, starts — позиции начала групп,
+    и агрегация выполняется последовательными срезами (ufunc.reduceat).
+    Пропуски (NaN) игнорируются, как в pandas.
+
+    Параметры:
+    ----------
+    codes : np.ndarray
+        Код группы для каждой строки.
+    values : np.ndarray
+        Значения типа float64.
+    how : str
+        'count', 'sum', 'mean', 'min' или 'max'.
+    n_groups : int
+        Количество групп в плотной сетке.
+    starts : np.ndarray, optional
+        Позиции начала групп в отсортированном входе.
+
+    Возвращает:
+    ----------
+    np.ndarray
+        Результат для каждой группы сетки; для пустых групп — NaN (0 для count и sum).
+    """
+    is_valid = ~np.isnan(values)
+
+    if starts is not None:
+        group_codes = codes[starts]
+        count = np.zeros(n_groups)
+        count[group_codes] = np.add.reduceat(is_valid.astype(np.float64), starts)
+    else:
+        count = np.bincount(codes, weights=is_valid, minlength=n_groups)
+
+    if how == "count":
+        return count
+
+    if how in ("sum", "mean"):
+        filled = np.where(is_valid, values, 0.0)
+        if starts is not None:
+            total = np.zeros(n_groups)
+            total[group_codes] = np.add.reduceat(filled, starts)
+        else:
+            total = np.bincount(codes, weights=filled, minlength=n_groups)
+        if how == "sum":
+            return total
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(count > 0, total / count, np.nan)
+
+    if how in ("min", "max"):
+        ufunc = np.fmax if how == "max" else np.fmin
+        result = np.full(n_groups, np.nan)
+        if starts is not None:
+            result[group_codes] = ufunc.reduceat(values, starts)
+        else:
+            ufunc.at(result, codes, values)
+        return result
+
+    raise ValueError(f"Неподдерживаемая агрегация: {how}")
+
+
+def _restore_labels(result: np.ndarray, source: pd.Series, labels: Optional[pd.Index]):
+    """
+    Возвращает результату min/max исходный тип колонки (категорию, строки или целые числа).
+    """
+    if labels is None:
+        is_int = pd.api.types.is_integer_dtype(source) or pd.api.types.is_bool_dtype(source)
+        if is_int and not np.isnan(result).any():
+            return result.astype(source.dtype)
+        return result
+
+    codes = np.where(np.isnan(result), -1, result).astype(np.int64)
+    if isinstance(source.dtype, pd.CategoricalDtype):
+        category_codes = source.dtype.categories.get_indexer(labels)
+        return pd.Categorical.from_codes(np.where(codes < 0, -1, category_codes[codes]), dtype=source.dtype)
+    restored = np.asarray(labels, dtype=object)[codes]
+    restored[codes < 0] = np.nan
+    return restored
+
+
+def _fill_empty_hours(
+        hourly: pd.DataFrame,
+        data: pd.DataFrame,
+        aggs: Dict[str, Tuple[str, str]],
+        hours: pd.DatetimeIndex,
+        last_weather: Optional[Dict[str, float]] = None
+) -> Dict[str, float]:
+    """
+    Заполняет календарные и погодные признаки часов без поездок.
+
+    День недели берётся из календаря, промо считается неиспользованным
+    (первая категория, 0 или "Нет"). Погодные средние (WEATHER_HOURLY_COLS)
+    берутся из последнего предыдущего часа с известной погодой, а для
+    первых часов — из last_weather (погода перед началом hourly).
+    Без этого часы без поездок удалялись бы вместе с пропусками
+    в add_lag_features(dropna=True).
+
+    Возвращает последние известные значения погоды для следующего вызова.
+    """
+    last_weather = dict(last_weather or {})
+    empty = hourly["demand"].to_numpy() == 0
+
+    for name in WEATHER_HOURLY_COLS:
+        if aggs.get(name) != DEFAULT_HOURLY_AGGS[name]:
+            continue
+        values = hourly[name].to_numpy(dtype=np.float64, na_value=np.nan)
+        valid = ~np.isnan(values)
+        previous = np.maximum.accumulate(np.where(valid, np.arange(len(values)), -1))
+
+        fill = empty & ~valid
+        from_history = fill & (previous >= 0)
+        values[from_history] = values[previous[from_history]]
+        if name in last_weather:
+            values[fill & (previous < 0)] = last_weather[name]
+        hourly[name] = values
+
+        if valid.any():
+            last_weather[name] = float(values[np.flatnonzero(valid)[-1]])
+
+    if not empty.any():
+        return last_weather
+
+    if aggs.get("day_of_week") == DEFAULT_HOURLY_AGGS["day_of_week"]:
+        source = data["day_of_week"]
+        dayofweek = hours.dayofweek.to_numpy()[empty]
+        if isinstance(source.dtype, pd.CategoricalDtype) or not pd.api.types.is_numeric_dtype(source):
+            fill = np.asarray(DAY_NAMES, dtype=object)[dayofweek]
+        else:
+            fill = dayofweek
+        hourly.loc[empty, "day_of_week"] = fill
+
+    if aggs.get("promo") == DEFAULT_HOURLY_AGGS["promo"]:
+        source = data["promo"]
+        if isinstance(source.dtype, pd.CategoricalDtype):
+            fill = source.cat.categories[0]
+        elif pd.api.types.is_numeric_dtype(source):
+            fill = 0
+        else:
+            fill = PROMO_LABELS[0]
+        hourly.loc[empty, "promo"] = fill
+
+    for col in ("day_of_week", "promo"):
+        source = data[col] if col in data.columns else None
+        if col in hourly.columns and source is not None and pd.api.types.is_integer_dtype(source):
+            if not hourly[col].isna().any():
+                hourly[col] = hourly[col].astype(source.dtype)
+
+    return last_weather
+
+
+@cached_stage()
+def build_hourly_dataset(
+        data: pd.DataFrame,
+        timestamp_col: str = "hour_timestamp",
+        extra_aggs: Optional[Dict[str, Tuple[str, str]]] = None,
+        district_col: Optional[str] = None,
+        presorted: bool = False
+) -> pd.DataFrame:
     """
     Формирует почасовой датасет спроса на основе данных о поездках.
 
-    Агрегирует данные до почасового уровня:
+    Агрегирует данные до почасового уровня за один проход:
     • считает спрос (количество поездок)
     • агрегирует календарные, погодные, географические и маркетинговые факторы
+    • при необходимости считает дополнительные агрегаты и спрос по районам
+
+    Часы переводятся в плотные коды от первого до последнего часа, поэтому
+    все агрегаты считаются прямой адресацией (np.bincount) без хэш-группировки,
+    а результат содержит каждый час интервала, включая часы без поездок
+    (demand = 0, день недели из календаря, промо не использовано,
+    погода — из последнего предыдущего часа с поездками), поэтому такие
+    часы сохраняются и после add_lag_features(dropna=True).
+    Поездки с пропуском в timestamp_col не учитываются.
 
     Параметры:
     ----------
@@ -18,6 +259,15 @@ def build_hourly_dataset(data: pd.DataFrame, timestamp_col: str = "hour_timestam
         Датасет.
     timestamp_col : str, default="hour_timestamp"
         Название колонки с временной меткой часа.
+    extra_aggs : Dict[str, Tuple[str, str]], optional
+        Дополнительные агрегаты в формате {имя: (колонка, функция)},
+        функция — 'count', 'sum', 'mean', 'min' или 'max'.
+        Например: {"revenue": ("total_price", "sum"), "mean_duration": ("duration_minutes", "mean")}.
+    district_col : str, optional
+        Колонка района: добавляет спрос по каждому району (колонки demand_<район>).
+    presorted : bool, default=False
+        Данные уже отсортированы по timestamp_col: агрегация выполняется
+        последовательными срезами отсортированного массива (ufunc.reduceat).
 
     Возвращает:
     ----------
@@ -25,65 +275,301 @@ def build_hourly_dataset(data: pd.DataFrame, timestamp_col: str = "hour_timestam
         Почасовой датасет, где одна строка соответствует одному часу
         и содержит спрос и факторы.
     """
+    aggs = {**DEFAULT_HOURLY_AGGS, **(extra_aggs or {})}
+
+    # Поездки без временной метки не относятся ни к одному часу (как при groupby по timestamp_col)
+    has_timestamp = data[timestamp_col].notna().to_numpy()
+    if not has_timestamp.all():
+        data = data[has_timestamp]
+
+    timestamps = data[timestamp_col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    first_hour = timestamps.min() // HOUR_NS * HOUR_NS
+    codes = (timestamps - first_hour) // HOUR_NS
+    n_hours = int(codes.max()) + 1
+    hours = pd.DatetimeIndex(first_hour + np.arange(n_hours, dtype=np.int64) * HOUR_NS)
+
+    starts = None
+    if presorted:
+        if (np.diff(codes) < 0).any():
+            raise ValueError(f"Данные не отсортированы по {timestamp_col}")
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+
+    hourly = {
+        timestamp_col: hours,
+        "demand": _group_reduce(codes, np.where(data["id"].notna(), 1.0, np.nan), "count", n_hours, starts),
+    }
+
+    for name, (col, how) in aggs.items():
+        source = data[col]
+        if how in ("min", "max"):
+            values, labels = _to_numeric_codes(source)
+            hourly[name] = _restore_labels(_group_reduce(codes, values, how, n_hours, starts), source, labels)
+        else:
+            values = source.to_numpy(dtype=np.float64, na_value=np.nan)
+            hourly[name] = _group_reduce(codes, values, how, n_hours, starts)
+
+    if district_col is not None:
+        district_codes, districts = pd.factorize(data[district_col], sort=True)
+        valid = district_codes >= 0
+        counts = np.bincount(
+            codes[valid] * len(districts) + district_codes[valid],
+            minlength=n_hours * len(districts),
+        ).reshape(n_hours, len(districts))
+        for idx, district in enumerate(districts):
+            hourly[f"demand_{district}"] = counts[:, idx]
+
+    hourly = pd.DataFrame(hourly)
+    hourly["demand"] = hourly["demand"].astype(np.int64)
+    _fill_empty_hours(hourly, data, aggs, hours)
+    hourly["hour_of_day"] = hourly[timestamp_col].dt.hour
+
+    return hourly
+
+
+LAG_STATS = ("mean", "std", "min", "max")
+
+
+def _window_label(window: int) -> str:
+    """
+    Подпись окна в названии признака: 24 -> "24h", 168 -> "7d".
+    """
+    if window >= 48 and window % 24 == 0:
+        return f"{window // 24}d"
+    return f"{window}h"
+
+
+def _to_hour_matrix(
+        data: pd.DataFrame,
+        target_col: str,
+        timestamp_col: str,
+        group_col: Optional[str],
+        fill_value: float
+) -> Tuple[np.ndarray, np.ndarray, pd.DatetimeIndex, Optional[pd.Index]]:
+    """
+    Раскладывает целевую колонку в плотную матрицу (группа × час).
 
-    # Почасовой спрос
-    demand = (
-        data
-        .groupby(timestamp_col)
-        .agg(demand=("id", "count"))
-        .reset_index()
-    )
-
-    # Агрегация факторов до почасового уровня
-    factors = (
-        data
-        .groupby(timestamp_col)
-        .agg(
-            day_of_week=("day_of_week", "max"),
-            temperature=("temperature", "mean"),
-            mean_precipitation_total=("precipitation_total", "mean"),
-            mean_cloud_cover_total=("cloud_cover_total", "mean"),
-            promo=("promo", "max"),
-        )
-        .reset_index()
-    )
-
-    data = demand.merge(factors, on=timestamp_col, how="left")
-    data["hour_of_day"] = data[timestamp_col].dt.hour
+    Часы переводятся в коды от первого до последнего часа данных, группы —
+    в коды отсортированных уникальных значений. Пропущенные часы заполняются
+    fill_value (для спроса — 0: в этот час не было поездок).
+    Возвращает матрицу, позицию каждой строки data в развёрнутой сетке,
+    календарь часов и метки групп (None без group_col).
+    """
+    if data[timestamp_col].isna().any():
+        raise ValueError(f"В колонке {timestamp_col} есть пропуски")
+    timestamps = data[timestamp_col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+    first_hour = timestamps.min() // HOUR_NS * HOUR_NS
+    hour_codes = (timestamps - first_hour) // HOUR_NS
+    n_hours = int(hour_codes.max()) + 1
+    hours = pd.DatetimeIndex(first_hour + np.arange(n_hours, dtype=np.int64) * HOUR_NS)
+
+    if group_col is not None:
+        group_codes, groups = pd.factorize(data[group_col], sort=True)
+        if (group_codes < 0).any():
+            raise ValueError(f"В колонке {group_col} есть пропуски")
+    else:
+        group_codes, groups = np.zeros(len(data), dtype=np.int64), None
+    n_groups = len(groups) if groups is not None else 1
+
+    flat = group_codes * n_hours + hour_codes
+    if len(np.unique(flat)) != len(flat):
+        raise ValueError(f"Повторяющиеся часы в {timestamp_col}: данные должны быть почасовыми")
+
+    matrix = np.full(n_groups * n_hours, fill_value, dtype=np.float64)
+    matrix[flat] = data[target_col].to_numpy(dtype=np.float64, na_value=np.nan)
+
+    return matrix.reshape(n_groups, n_hours), flat, hours, groups
+
+
+def _lag_matrix_features(
+        matrix: np.ndarray,
+        lags: Sequence[int] = (1, 24),
+        windows: Sequence[int] = (24, 24 * 7),
+        stats: Sequence[str] = ("mean",),
+        ewm_spans: Sequence[int] = (),
+        min_periods: Optional[int] = None
+) -> Dict[str, np.ndarray]:
+    """
+    Считает лаговые и скользящие признаки сразу для всех рядов матрицы (ряд × час).
 
-    return data
+    Скользящие статистики берутся по окну из window предыдущих часов
+    (текущий час не входит, как у lag_1h.rolling(window)).
+    Среднее и стандартное отклонение считаются через накопленные суммы,
+    минимум и максимум — скользящим окном pandas по всем рядам сразу,
+    поэтому каждый признак вычисляется за O(n) независимо от длины окна.
+    Пропуски (NaN) в матрице не учитываются.
 
+    Параметры:
+    ----------
+    matrix : np.ndarray
+        Матрица значений формы (число рядов, число часов) на полной почасовой сетке.
+    lags : Sequence[int], default=(1, 24)
+        Лаги в часах.
+    windows : Sequence[int], default=(24, 168)
+        Длины скользящих окон в часах.
+    stats : Sequence[str], default=("mean",)
+        Статистики окна: 'mean', 'std', 'min', 'max'.
+    ewm_spans : Sequence[int], default=()
+        Периоды экспоненциального скользящего среднего (span) в часах.
+    min_periods : int, optional
+        Минимальное число наблюдений в окне. По умолчанию — длина окна.
 
-def add_lag_features(data: pd.DataFrame) -> pd.DataFrame:
+    Возвращает:
+    ----------
+    Dict[str, np.ndarray]
+        Признаки той же формы, что matrix: lag_1h, mean_last_24h, std_last_7d, ewm_24h и т.д.
     """
-    Добавляет лаговые и средние лаговые признаки спроса.
+    unknown = set(stats) - set(LAG_STATS)
+    if unknown:
+        raise ValueError(f"Неподдерживаемые статистики окна: {sorted(unknown)}")
+
+    n_series, n_hours = matrix.shape
+    features = {}
+
+    for lag in lags:
+        lagged = np.full_like(matrix, np.nan)
+        if lag < n_hours:
+            lagged[:, lag:] = matrix[:, :n_hours - lag]
+        features[f"lag_{lag}h"] = lagged
+
+    previous = np.full_like(matrix, np.nan)
+    previous[:, 1:] = matrix[:, :-1]
+
+    if windows and set(stats) & {"mean", "std"}:
+        valid = ~np.isnan(matrix)
+        # Сдвиг на среднее ряда уменьшает потерю точности при вычислении дисперсии
+        filled = np.where(valid, matrix, 0.0)
+        n_valid = valid.sum(axis=1, keepdims=True)
+        offset = filled.sum(axis=1, keepdims=True) / np.maximum(n_valid, 1)
+        centered = np.where(valid, matrix - offset, 0.0)
+
+        def prefix(values: np.ndarray) -> np.ndarray:
+            return np.concatenate([np.zeros((n_series, 1)), np.cumsum(values, axis=1)], axis=1)
+
+        prefix_count = prefix(valid.astype(np.float64))
+        prefix_sum = prefix(centered)
+        prefix_sq = prefix(centered ** 2)
+        hours_idx = np.arange(n_hours)
+
+    for window in windows:
+        label = _window_label(window)
+        required = max(window if min_periods is None else min_periods, 1)
+
+        if "mean" in stats or "std" in stats:
+            lower = np.maximum(hours_idx - window, 0)
+            count = prefix_count[:, hours_idx] - prefix_count[:, lower]
+            total = prefix_sum[:, hours_idx] - prefix_sum[:, lower]
+            enough = count >= required
+
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mean = total / count
+                if "mean" in stats:
+                    features[f"mean_last_{label}"] = np.where(enough, mean + offset, np.nan)
+                if "std" in stats:
+                    squares = prefix_sq[:, hours_idx] - prefix_sq[:, lower]
+                    variance = np.maximum(squares - total * mean, 0.0) / (count - 1)
+                    features[f"std_last_{label}"] = np.where(enough & (count > 1), np.sqrt(variance), np.nan)
+
+        for stat in ("min", "max"):
+            if stat in stats:
+                rolling = pd.DataFrame(previous.T).rolling(window, min_periods=required)
+                features[f"{stat}_last_{label}"] = getattr(rolling, stat)().to_numpy().T
+
+    for span in ewm_spans:
+        features[f"ewm_{span}h"] = pd.DataFrame(previous.T).ewm(span=span).mean().to_numpy().T
+
+    return features
+
+
+def add_lag_features(
+        data: pd.DataFrame,
+        target_col: str = "demand",
+        timestamp_col: str = "hour_timestamp",
+        lags: Sequence[int] = (1, 24),
+        windows: Sequence[int] = (24, 24 * 7),
+        stats: Sequence[str] = ("mean",),
+        ewm_spans: Sequence[int] = (),
+        group_col: Optional[str] = None,
+        min_periods: Optional[int] = None,
+        fill_value: float = 0,
+        dropna: bool = True
+) -> pd.DataFrame:
+    """
+    Добавляет лаговые и скользящие признаки спроса по времени.
 
-    Создаёт:
+    По умолчанию создаёт:
     • спрос за предыдущий час (lag_1h)
     • спрос за предыдущие сутки (lag_24h)
-    • средний спрос за последние 24 часа
-    • средний спрос за последние 7 дней
+    • средний спрос за последние 24 часа (mean_last_24h)
+    • средний спрос за последние 7 дней (mean_last_7d)
+
+    Лаги считаются по времени, а не по номеру строки: датасет
+    переиндексируется на полный почасовой календарь (пропущенные часы
+    получают target = fill_value, остальные колонки — NaN), поэтому
+    пропуск часа не сдвигает лаги. С group_col ряды строятся для каждой
+    группы (точки, района) и считаются одной матрицей без цикла по группам.
 
     Параметры:
     ----------
     data : pd.DataFrame
-        Почасовой датасет со столбцом спроса 'demand'.
+        Почасовой датасет со столбцом спроса.
+    target_col : str, default="demand"
+        Колонка, по которой строятся признаки.
+    timestamp_col : str, default="hour_timestamp"
+        Колонка с временной меткой часа.
+    lags : Sequence[int], default=(1, 24)
+        Лаги в часах.
+    windows : Sequence[int], default=(24, 168)
+        Длины скользящих окон в часах (окно — предыдущие часы без текущего).
+    stats : Sequence[str], default=("mean",)
+        Статистики окна: 'mean', 'std', 'min', 'max'.
+    ewm_spans : Sequence[int], default=()
+        Периоды экспоненциального скользящего среднего предыдущих часов.
+    group_col : str, optional
+        Колонка группы (например, 'start_location' или 'start_district').
+    min_periods : int, optional
+        Минимальное число наблюдений в окне. По умолчанию — длина окна;
+        меньшее значение сохраняет первые дни ряда при dropna=True.
+    fill_value : float, default=0
+        Значение target для часов, отсутствующих в данных.
+    dropna : bool, default=True
+        Удалить строки с пропусками.
 
     Возвращает:
     ----------
     pd.DataFrame
-        Датасет с лаговыми признаками без строк с пропусками.
+        Датасет на полной почасовой сетке с лаговыми признаками.
+
+    Пример:
+    -------
+    >>> features = add_lag_features(
+    ...     hourly, lags=(1, 2, 24, 168), windows=(6, 24, 168),
+    ...     stats=("mean", "std", "max"), ewm_spans=(12,), min_periods=1
+    ... )
     """
+    matrix, flat, hours, groups = _to_hour_matrix(data, target_col, timestamp_col, group_col, fill_value)
+    n_groups, n_hours = matrix.shape
 
-    data = data.copy()
+    positions = np.full(n_groups * n_hours, -1, dtype=np.int64)
+    positions[flat] = np.arange(len(data))
 
-    data["lag_1h"] = data["demand"].shift(1)
-    data["lag_24h"] = data["demand"].shift(24)
+    if (positions >= 0).all():
+        data = data.iloc[positions].copy()
+    else:
+        source_dtype = data[target_col].dtype
+        data = data.reset_index(drop=True).reindex(positions)
+        data[timestamp_col] = np.tile(hours, n_groups)
+        if groups is not None:
+            data[group_col] = np.repeat(groups, n_hours)
+        data[target_col] = data[target_col].fillna(fill_value)
+        if pd.api.types.is_integer_dtype(source_dtype) and float(fill_value).is_integer():
+            data[target_col] = data[target_col].astype(source_dtype)
+        data = data.reset_index(drop=True)
 
-    data["mean_last_24h"] = data["lag_1h"].rolling(24).mean()
-    data["mean_last_7d"] = data["lag_1h"].rolling(24 * 7).mean()
+    features = _lag_matrix_features(matrix, lags, windows, stats, ewm_spans, min_periods)
+    for name, values in features.items():
+        data[name] = values.ravel()
 
-    return data.dropna()
+    return data.dropna() if dropna else data
 
 
 def train_test_time_split(
@@ -128,6 +614,375 @@ def train_test_time_split(
     return X_train, X_test, y_train, y_test
 
 
+def walk_forward_splits(
+    n_samples: int,
+    n_folds: int = 5,
+    test_size: Optional[int] = None,
+    gap: int = 0,
+    max_train_size: Optional[int] = None,
+    min_train_size: int = 1,
+) -> Iterator[Tuple[slice, slice]]:
+    """
+    Генерирует фолды walk-forward валидации для упорядоченного по времени датасета.
+
+    Тестовые окна идут подряд в конце ряда, каждое следующее — на test_size
+    строк позже. Обучающая выборка — все строки до теста (расширяющееся окно)
+    или последние max_train_size строк (скользящее окно). Фолды задаются
+    срезами, поэтому X[train] и X[test] для массивов NumPy — представления
+    без копирования.
+
+    Параметры:
+    ----------
+    n_samples : int
+        Количество строк датасета.
+    n_folds : int, default=5
+        Количество фолдов.
+    test_size : int, optional
+        Длина тестового окна. По умолчанию — n_samples // (n_folds + 1).
+    gap : int, default=0
+        Количество строк между обучением и тестом (например, горизонт прогноза).
+    max_train_size : int, optional
+        Максимальная длина обучающего окна. По умолчанию окно расширяется.
+    min_train_size : int, default=1
+        Минимальная длина обучающей выборки первого фолда.
+
+    Возвращает:
+    ----------
+    Iterator[Tuple[slice, slice]]
+        Пары срезов (train, test).
+
+    Пример:
+    -------
+    >>> for train, test in walk_forward_splits(len(X), n_folds=50, test_size=24 * 7):
+    ...     model.fit(X[train], y[train])
+    """
+    test_size = test_size or n_samples // (n_folds + 1)
+    first_test = n_samples - n_folds * test_size
+
+    if test_size <= 0 or first_test - gap < min_train_size:
+        raise ValueError(
+            f"Недостаточно данных для {n_folds} фолдов: n_samples={n_samples}, "
+            f"test_size={test_size}, gap={gap}, min_train_size={min_train_size}"
+        )
+
+    for fold in range(n_folds):
+        test_start = first_test + fold * test_size
+        train_end = test_start - gap
+        train_start = 0 if max_train_size is None else max(0, train_end - max_train_size)
+        yield slice(train_start, train_end), slice(test_start, test_start + test_size)
+
+
+def _fit_fold(model, X: np.ndarray, y: np.ndarray, train: slice, test: slice) -> Dict[str, float]:
+    """
+    Обучает копию модели на одном фолде и считает MAE и R^2 на тесте.
+    """
+    fitted = clone(model).fit(X[train], y[train])
+    pred = fitted.predict(X[test])
+    return {
+        "mae": mean_absolute_error(y[test], pred),
+        "r2": r2_score(y[test], pred),
+    }
+
+
+def walk_forward_backtest(
+    model,
+    X: pd.DataFrame,
+    y: pd.Series,
+    n_folds: int = 5,
+    test_size: Optional[int] = None,
+    gap: int = 0,
+    max_train_size: Optional[int] = None,
+    timestamps: Optional[pd.Series] = None,
+    n_jobs: int = -1,
+) -> pd.DataFrame:
+    """
+    Оценивает модель walk-forward бэктестом с параллельным обучением фолдов.
+
+    Признаки и цель один раз переводятся в массивы NumPy, фолды передаются
+    срезами (walk_forward_splits), а обучение выполняется в пуле процессов
+    joblib; большие массивы joblib передаёт процессам через memmap без копирования.
+    Для каждого фолда считаются MAE и R^2, как в print_model_metrics.
+
+    Параметры:
+    ----------
+    model : sklearn estimator
+        Модель с методами fit и predict (обучаются её копии, исходная не меняется).
+    X : pd.DataFrame
+        Числовые признаки (после apply_ohe), упорядоченные по времени.
+    y : pd.Series
+        Целевая переменная.
+    n_folds, test_size, gap, max_train_size :
+        Параметры фолдов, как в walk_forward_splits.
+    timestamps : pd.Series, optional
+        Временные метки строк: добавляют в отчёт границы тестового периода.
+    n_jobs : int, default=-1
+        Количество процессов (-1 — все ядра, 1 — без параллелизма).
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        По строке на фолд: границы обучения и теста, mae, r2.
+
+    Пример:
+    -------
+    >>> report = walk_forward_backtest(LinearRegression(), X_final, y, n_folds=50, test_size=24 * 7)
+    >>> report[["mae", "r2"]].describe()
+    """
+    X_values = np.asarray(X, dtype=np.float64)
+    y_values = np.asarray(y, dtype=np.float64)
+    folds = list(walk_forward_splits(len(X_values), n_folds, test_size, gap, max_train_size))
+
+    metrics = Parallel(n_jobs=n_jobs)(
+        delayed(_fit_fold)(model, X_values, y_values, train, test) for train, test in folds
+    )
+
+    report = pd.DataFrame({
+        "fold": np.arange(len(folds)),
+        "train_start": [train.start for train, _ in folds],
+        "train_end": [train.stop for train, _ in folds],
+        "test_start": [test.start for _, test in folds],
+        "test_end": [test.stop for _, test in folds],
+    })
+    if timestamps is not None:
+        timestamps = pd.Series(timestamps).reset_index(drop=True)
+        report["test_from"] = timestamps.iloc[report["test_start"]].to_numpy()
+        report["test_to"] = timestamps.iloc[report["test_end"] - 1].to_numpy()
+
+    return pd.concat([report, pd.DataFrame(metrics)], axis=1)
+
+
+class FeatureEncoder:
+    """
+    Обученный один раз кодировщик признаков модели спроса.
+
+    Повторяет One-Hot Encoding из apply_ohe (OneHotEncoder с drop="first"
+    и handle_unknown="ignore"): категории запоминаются по обучающей выборке
+    в отсортированном порядке, первая категория отбрасывается, неизвестные
+    категории кодируются нулями. Числовые признаки идут первыми в исходном
+    порядке, затем колонки "<признак>_<категория>".
+
+    Преобразование пишет значения сразу в итоговую матрицу (плотную float64
+    или разреженную CSR) без промежуточных DataFrame; transform_codes
+    возвращает компактные коды категорий int8, transform_one кодирует одну
+    запись (словарь) без pandas. Кодировщик сохраняется на диск через joblib.
+
+    Пример:
+    -------
+    >>> encoder = FeatureEncoder(["promo", "day_of_week"]).fit(X_train)
+    >>> encoder.save(pj("data", "models", "encoder.joblib"))
+    >>> X_matrix = FeatureEncoder.load(pj("data", "models", "encoder.joblib")).transform(X_new)
+    """
+
+    def __init__(self, categorical_cols: List[str], drop_first: bool = True):
+        self.categorical_cols = list(categorical_cols)
+        self.drop_first = drop_first
+
+    def fit(self, X: pd.DataFrame) -> "FeatureEncoder":
+        """
+        Запоминает числовые признаки и категории по обучающей выборке.
+
+        Параметры:
+        ----------
+        X : pd.DataFrame
+            Признаки тренировочной выборки.
+
+        Возвращает:
+        ----------
+        FeatureEncoder
+            Обученный кодировщик (self).
+        """
+        self.numeric_cols_ = [col for col in X.columns if col not in self.categorical_cols]
+        self.categories_: Dict[str, pd.Index] = {}
+        self.offsets_: Dict[str, int] = {}
+
+        offset = len(self.numeric_cols_)
+        feature_names = list(self.numeric_cols_)
+
+        for col in self.categorical_cols:
+            values = pd.unique(np.asarray(X[col], dtype=object))
+            has_nan = pd.isna(values).any()
+            categories = sorted(value for value in values if not pd.isna(value))
+            if has_nan:
+                categories.append(np.nan)
+
+            self.categories_[col] = pd.Index(categories, dtype=object)
+            self.offsets_[col] = offset
+
+            encoded = categories[1:] if self.drop_first else categories
+            feature_names.extend(f"{col}_{category}" for category in encoded)
+            offset += len(encoded)
+
+        self.feature_names_ = feature_names
+        self._lookup = {
+            col: {category: idx for idx, category in enumerate(categories) if not pd.isna(category)}
+            for col, categories in self.categories_.items()
+        }
+        self._nan_codes = {
+            col: len(categories) - 1 if categories.hasnans else -1
+            for col, categories in self.categories_.items()
+        }
+        return self
+
+    @property
+    def n_features(self) -> int:
+        return len(self.feature_names_)
+
+    def _codes(self, values: pd.Series, col: str) -> np.ndarray:
+        """
+        Возвращает номер категории из обучения для каждого значения (-1 — неизвестная).
+        """
+        categories = self.categories_[col]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            mapping = categories.get_indexer(values.cat.categories)
+            codes = values.cat.codes.to_numpy()
+            return np.where(codes >= 0, mapping[codes], self._nan_codes[col])
+        return categories.get_indexer(np.asarray(values, dtype=object))
+
+    def _one_hot_positions(self, X: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Возвращает строки и столбцы единиц One-Hot блока итоговой матрицы.
+        """
+        rows, cols = [], []
+        shift = 1 if self.drop_first else 0
+        row_idx = np.arange(len(X))
+
+        for col in self.categorical_cols:
+            codes = self._codes(X[col], col)
+            is_encoded = codes >= shift
+            rows.append(row_idx[is_encoded])
+            cols.append(self.offsets_[col] + codes[is_encoded] - shift)
+
+        if not rows:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+        return np.concatenate(rows), np.concatenate(cols)
+
+    def transform(self, X: pd.DataFrame, output: str = "dense"):
+        """
+        Кодирует признаки в матрицу для модели.
+
+        Параметры:
+        ----------
+        X : pd.DataFrame
+            Признаки с теми же колонками, что при обучении.
+        output : str, default="dense"
+            'dense' — np.ndarray float64, 'sparse' — scipy.sparse CSR.
+
+        Возвращает:
+        ----------
+        np.ndarray | scipy.sparse.csr_matrix
+            Матрица формы (len(X), n_features), колонки — feature_names_.
+        """
+        n_numeric = len(self.numeric_cols_)
+        one_hot_rows, one_hot_cols = self._one_hot_positions(X)
+
+        if output == "dense":
+            matrix = np.zeros((len(X), self.n_features))
+            for idx, col in enumerate(self.numeric_cols_):
+                matrix[:, idx] = X[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            matrix[one_hot_rows, one_hot_cols] = 1.0
+            return matrix
+
+        if output == "sparse":
+            numeric = np.column_stack([
+                X[col].to_numpy(dtype=np.float64, na_value=np.nan) for col in self.numeric_cols_
+            ]) if n_numeric else np.empty((len(X), 0))
+            numeric_rows, numeric_cols = np.nonzero(numeric)
+
+            return sparse.csr_matrix(
+                (
+                    np.concatenate([numeric[numeric_rows, numeric_cols], np.ones(len(one_hot_rows))]),
+                    (np.concatenate([numeric_rows, one_hot_rows]), np.concatenate([numeric_cols, one_hot_cols])),
+                ),
+                shape=(len(X), self.n_features),
+            )
+
+        raise ValueError(f"Неподдерживаемый формат вывода: {output}")
+
+    def transform_codes(self, X: pd.DataFrame) -> np.ndarray:
+        """
+        Возвращает компактные коды категорий для моделей, которым не нужен One-Hot.
+
+        Параметры:
+        ----------
+        X : pd.DataFrame
+            Признаки с категориальными колонками categorical_cols.
+
+        Возвращает:
+        ----------
+        np.ndarray
+            Матрица int8 формы (len(X), len(categorical_cols)); -1 — неизвестная категория.
+        """
+        max_categories = max((len(categories) for categories in self.categories_.values()), default=0)
+        dtype = np.int8 if max_categories <= np.iinfo(np.int8).max else np.int16
+
+        codes = np.empty((len(X), len(self.categorical_cols)), dtype=dtype)
+        for idx, col in enumerate(self.categorical_cols):
+            codes[:, idx] = self._codes(X[col], col)
+        return codes
+
+    def transform_one(self, record: Dict[str, object]) -> np.ndarray:
+        """
+        Кодирует одну запись (например, новый час) без создания DataFrame.
+
+        Параметры:
+        ----------
+        record : Dict[str, object]
+            Значения признаков по именам колонок.
+
+        Возвращает:
+        ----------
+        np.ndarray
+            Вектор float64 длины n_features.
+        """
+        vector = np.zeros(self.n_features)
+        for idx, col in enumerate(self.numeric_cols_):
+            vector[idx] = record[col]
+
+        shift = 1 if self.drop_first else 0
+        for col in self.categorical_cols:
+            value = record[col]
+            code = self._nan_codes[col] if pd.isna(value) else self._lookup[col].get(value, -1)
+            if code >= shift:
+                vector[self.offsets_[col] + code - shift] = 1.0
+        return vector
+
+    def transform_frame(self, X: pd.DataFrame) -> pd.DataFrame:
+        """
+        Кодирует признаки в DataFrame с именами колонок и индексом X.
+
+        Некатегориальные колонки передаются без изменений и сохраняют свои
+        типы (как в OneHotEncoder + pd.concat), float64 — только One-Hot блок.
+        """
+        n_numeric = len(self.numeric_cols_)
+        one_hot_rows, one_hot_cols = self._one_hot_positions(X)
+
+        one_hot = np.zeros((len(X), self.n_features - n_numeric))
+        one_hot[one_hot_rows, one_hot_cols - n_numeric] = 1.0
+
+        return pd.concat([
+            X[self.numeric_cols_],
+            pd.DataFrame(one_hot, columns=self.feature_names_[n_numeric:], index=X.index),
+        ], axis=1)
+
+    def save(self, path: Union[str, Path]) -> None:
+        """
+        Сохраняет обученный кодировщик на диск (joblib).
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "FeatureEncoder":
+        """
+        Загружает кодировщик, сохранённый методом save.
+        """
+        encoder = joblib.load(path)
+        if not isinstance(encoder, cls):
+            raise TypeError(f"{path} не содержит {cls.__name__}")
+        return encoder
+
+
 def apply_ohe(
     X_train: pd.DataFrame,
     X_test: pd.DataFrame,
@@ -155,33 +1010,6 @@ def apply_ohe(
     X_test_final : pd.DataFrame
         Тестовая выборка с закодированными признаками.
     """
+    encoder = FeatureEncoder(categorical_cols).fit(X_train)
 
-    encoder = OneHotEncoder(
-        drop="first",
-        sparse_output=False,
-        handle_unknown="ignore",
-    )
-
-    encoder.fit(X_train[categorical_cols])
-
-    train_ohe = pd.DataFrame(
-        encoder.transform(X_train[categorical_cols]),
-        columns=encoder.get_feature_names_out(categorical_cols),
-        index=X_train.index,
-    )
-
-    test_ohe = pd.DataFrame(
-        encoder.transform(X_test[categorical_cols]),
-        columns=encoder.get_feature_names_out(categorical_cols),
-        index=X_test.index,
-    )
-
-    X_train_final = pd.concat(
-        [X_train.drop(columns=categorical_cols), train_ohe], axis=1
-    )
-
-    X_test_final = pd.concat(
-        [X_test.drop(columns=categorical_cols), test_ohe], axis=1
-    )
-
-    return X_train_final, X_test_final
+    return encoder.transform_frame(X_train), encoder.transform_frame(X_test)
@@ -1,5 +1,6 @@
-from typing import Callable, List
+from typing import Callable, List, Tuple
 
+import numpy as np
 import pandas as pd
 
 from sklearn.metrics import r2_score, mean_absolute_error
@@ -87,13 +88,77 @@ def describe_categorical(df: pd.DataFrame, top_n: int = 30) -> None:
         print()
 
 
+def find_mask_runs(mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Находит серии подряд идущих True сразу во всех столбцах двумерной маски.
+
+    Маска дополняется строкой False сверху и снизу, границы серий ищутся
+    одним np.diff вдоль времени и np.flatnonzero по всей матрице.
+    Одномерная маска считается одним столбцом (см. find_nan_runs).
+
+    Параметры:
+    ----------
+    mask : np.ndarray
+        Булева маска формы (число строк, число столбцов) или (число строк,).
+
+    Возвращает:
+    ----------
+    Tuple[np.ndarray, np.ndarray, np.ndarray]
+        Номера столбцов, позиции начала серий и их длины
+        (упорядочены по столбцу, затем по началу серии).
+
+    Пример:
+    -------
+    >>> cols, starts, lengths = find_mask_runs(weather_data[["temperature", "wind_speed"]].isna().to_numpy())
+    """
+    mask = np.asarray(mask, dtype=bool)
+    if mask.ndim == 1:
+        mask = mask[:, np.newaxis]
+
+    n_rows, n_cols = mask.shape
+    padded = np.zeros((n_cols, n_rows + 2), dtype=np.int8)
+    padded[:, 1:-1] = mask.T
+
+    edges = np.diff(padded, axis=1)
+    start_flat = np.flatnonzero(edges == 1)
+    end_flat = np.flatnonzero(edges == -1)
+
+    width = n_rows + 1
+    cols, starts = np.divmod(start_flat, width)
+    return cols, starts, end_flat % width - starts
+
+
+def find_nan_runs(is_na: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Находит серии подряд идущих пропусков в одномерной маске.
+
+    Одностолбцовый случай find_mask_runs.
+
+    Параметры:
+    ----------
+    is_na : np.ndarray
+        Булева маска пропусков.
+
+    Возвращает:
+    ----------
+    Tuple[np.ndarray, np.ndarray]
+        Позиции начала серий и их длины.
+
+    Пример:
+    -------
+    >>> starts, lengths = find_nan_runs(weather_data["temperature"].isna().to_numpy())
+    """
+    _, starts, lengths = find_mask_runs(np.asarray(is_na, dtype=bool).ravel())
+    return starts, lengths
+
+
 def _check_consecutive_nans(data: pd.DataFrame, col: str):
     """
     Анализирует последовательные пропуски (NaN) в указанной колонке датафрейма.
 
     Метод:
     1. Определяет, какие значения в колонке являются NaN.
-    2. Нумерует последовательные блоки изменений (NaN -> не NaN и наоборот).
+    2. Находит границы блоков NaN (find_nan_runs).
     3. Вычисляет длину каждого блока NaN.
     4. Выводит:
        - количество блоков пропусков,
@@ -111,12 +176,8 @@ def _check_consecutive_nans(data: pd.DataFrame, col: str):
     --------------------
     _check_consecutive_nans(weather_data, 'temperature')
     """
-    is_na = data[col].isna()
-    # Нумеруем блоки, где значения изменяются (True -> False)
-    groups = (is_na != is_na.shift()).cumsum()
-    # Вычисляем длину каждого блока NaN
-    na_blocks = data[is_na].groupby(groups[is_na]).size()
-    if na_blocks.empty:
+    _, na_blocks = find_nan_runs(data[col].isna().to_numpy())
+    if not len(na_blocks):
         print(f"{col}: пропусков нет")
     else:
         print(
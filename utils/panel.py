@@ -0,0 +1,262 @@
+from typing import Dict, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from .modeling import HOUR_NS, _lag_matrix_features
+
+
+class DemandPanel:
+    """
+    Почасовой спрос по точкам проката в виде матрицы (точка × час).
+
+    Матрица хранится плотным массивом NumPy (int32) или разреженной
+    матрицей scipy.sparse CSR — для большого числа точек с редкими
+    поездками. Точки и часы доступны как индексы points и hours,
+    поэтому строка/столбец матрицы находится без поиска по датафрейму.
+
+    Панель строится одним проходом np.bincount по кодам (точка, час),
+    а лаговые признаки считаются сразу для всех точек
+    (_lag_matrix_features), без groupby и цикла по точкам.
+
+    Пример:
+    -------
+    >>> panel = DemandPanel.from_rides(rides_data, point_col="start_location")
+    >>> panel.shape
+    (350, 8784)
+    >>> train = panel.to_training_frame(lags=(1, 24, 168), windows=(24, 168))
+    """
+
+    def __init__(
+            self,
+            values: Union[np.ndarray, sparse.csr_matrix],
+            points: pd.Index,
+            hours: pd.DatetimeIndex,
+            point_col: str = "start_location",
+            timestamp_col: str = "hour_timestamp"
+    ):
+        if values.shape != (len(points), len(hours)):
+            raise ValueError(
+                f"Форма матрицы {values.shape} не совпадает с числом точек и часов "
+                f"({len(points)}, {len(hours)})"
+            )
+        self.values = values
+        self.points = pd.Index(points)
+        self.hours = pd.DatetimeIndex(hours)
+        self.point_col = point_col
+        self.timestamp_col = timestamp_col
+
+    @classmethod
+    def from_rides(
+            cls,
+            data: pd.DataFrame,
+            point_col: str = "start_location",
+            timestamp_col: str = "hour_timestamp",
+            points: Optional[Sequence] = None,
+            start: Optional[Union[str, pd.Timestamp]] = None,
+            end: Optional[Union[str, pd.Timestamp]] = None,
+            as_sparse: bool = False
+    ) -> "DemandPanel":
+        """
+        Строит панель спроса из датасета поездок.
+
+        Параметры:
+        ----------
+        data : pd.DataFrame
+            Датасет поездок.
+        point_col : str, default="start_location"
+            Колонка точки (улица, район).
+        timestamp_col : str, default="hour_timestamp"
+            Колонка времени поездки; округляется вниз до часа.
+            Поездки без временной метки не учитываются.
+        points : Sequence, optional
+            Фиксированный список точек (порядок строк матрицы).
+            По умолчанию — отсортированные точки из данных; поездки
+            по точкам не из списка не учитываются.
+        start, end : str | pd.Timestamp, optional
+            Первый и последний час панели. По умолчанию — границы данных.
+        as_sparse : bool, default=False
+            Хранить матрицу в формате scipy.sparse CSR.
+
+        Возвращает:
+        ----------
+        DemandPanel
+            Панель, в которой часы без поездок имеют спрос 0.
+        """
+        # Поездки без временной метки (NaT) в панель не попадают
+        has_timestamp = data[timestamp_col].notna().to_numpy()
+        timestamps = data[timestamp_col].to_numpy(dtype="datetime64[ns]").view(np.int64)
+        known = timestamps[has_timestamp]
+        first_hour = (pd.Timestamp(start).value if start is not None else known.min()) // HOUR_NS * HOUR_NS
+        last_hour = (pd.Timestamp(end).value if end is not None else known.max()) // HOUR_NS * HOUR_NS
+        n_hours = int((last_hour - first_hour) // HOUR_NS) + 1
+        hours = pd.DatetimeIndex(first_hour + np.arange(n_hours, dtype=np.int64) * HOUR_NS)
+
+        if points is None:
+            point_codes, points = pd.factorize(data[point_col], sort=True)
+        else:
+            points = pd.Index(points)
+            point_codes = points.get_indexer(data[point_col])
+        n_points = len(points)
+
+        hour_codes = (timestamps - first_hour) // HOUR_NS
+        valid = has_timestamp & (point_codes >= 0) & (hour_codes >= 0) & (hour_codes < n_hours)
+        point_codes, hour_codes = point_codes[valid], hour_codes[valid]
+
+        if as_sparse:
+            values = sparse.csr_matrix(
+                (np.ones(len(point_codes), dtype=np.int32), (point_codes, hour_codes)),
+                shape=(n_points, n_hours),
+            )
+            values.sum_duplicates()
+        else:
+            values = np.bincount(
+                point_codes * n_hours + hour_codes, minlength=n_points * n_hours
+            ).astype(np.int32).reshape(n_points, n_hours)
+
+        return cls(values, points, hours, point_col, timestamp_col)
+
+    @property
+    def shape(self):
+        return self.values.shape
+
+    @property
+    def is_sparse(self) -> bool:
+        return sparse.issparse(self.values)
+
+    @property
+    def density(self) -> float:
+        """
+        Доля ненулевых ячеек (точка, час).
+        """
+        nonzero = self.values.nnz if self.is_sparse else np.count_nonzero(self.values)
+        return nonzero / max(self.values.shape[0] * self.values.shape[1], 1)
+
+    def to_dense(self, rows: Optional[slice] = None) -> np.ndarray:
+        """
+        Возвращает матрицу спроса (или срез строк) в виде плотного массива.
+        """
+        values = self.values if rows is None else self.values[rows]
+        return values.toarray() if self.is_sparse else np.asarray(values)
+
+    def series(self, point) -> pd.Series:
+        """
+        Возвращает почасовой ряд спроса одной точки.
+
+        Параметры:
+        ----------
+        point : Any
+            Название точки из points.
+
+        Возвращает:
+        ----------
+        pd.Series
+            Спрос, индекс — часы панели.
+        """
+        row = self.points.get_loc(point)
+        values = self.to_dense(slice(row, row + 1))[0]
+        return pd.Series(values, index=self.hours, name=point)
+
+    def lag_features(
+            self,
+            lags: Sequence[int] = (1, 24),
+            windows: Sequence[int] = (24, 24 * 7),
+            stats: Sequence[str] = ("mean",),
+            ewm_spans: Sequence[int] = (),
+            min_periods: Optional[int] = None,
+            batch_size: Optional[int] = None
+    ) -> Dict[str, np.ndarray]:
+        """
+        Считает лаговые и скользящие признаки сразу для всех точек.
+
+        Параметры:
+        ----------
+        lags, windows, stats, ewm_spans, min_periods :
+            Как в add_lag_features.
+        batch_size : int, optional
+            Число точек в одной порции: ограничивает память при переводе
+            разреженной матрицы в плотную. По умолчанию — все точки сразу.
+
+        Возвращает:
+        ----------
+        Dict[str, np.ndarray]
+            Признаки формы (число точек, число часов).
+        """
+        n_points = self.values.shape[0]
+        batch_size = batch_size or max(n_points, 1)
+
+        batches = []
+        for first in range(0, n_points, batch_size):
+            matrix = self.to_dense(slice(first, first + batch_size)).astype(np.float64)
+            batches.append(_lag_matrix_features(matrix, lags, windows, stats, ewm_spans, min_periods))
+
+        if len(batches) == 1:
+            return batches[0]
+        return {name: np.vstack([batch[name] for batch in batches]) for name in batches[0]}
+
+    def to_frame(self, drop_zero: bool = False) -> pd.DataFrame:
+        """
+        Разворачивает панель в длинную таблицу (точка, час, спрос).
+
+        Параметры:
+        ----------
+        drop_zero : bool, default=False
+            Оставить только ячейки с поездками.
+
+        Возвращает:
+        ----------
+        pd.DataFrame
+            Колонки point_col (категория), timestamp_col и demand.
+        """
+        n_points, n_hours = self.values.shape
+
+        if drop_zero:
+            coo = self.values.tocoo() if self.is_sparse else sparse.coo_matrix(self.values)
+            order = np.lexsort((coo.col, coo.row))
+            point_codes, hour_codes, demand = coo.row[order], coo.col[order], coo.data[order]
+        else:
+            point_codes = np.repeat(np.arange(n_points), n_hours)
+            hour_codes = np.tile(np.arange(n_hours), n_points)
+            demand = self.to_dense().ravel()
+
+        return pd.DataFrame({
+            self.point_col: pd.Categorical.from_codes(point_codes, categories=self.points),
+            self.timestamp_col: self.hours[hour_codes],
+            "demand": demand.astype(np.int64),
+        })
+
+    def to_training_frame(
+            self,
+            lags: Sequence[int] = (1, 24),
+            windows: Sequence[int] = (24, 24 * 7),
+            stats: Sequence[str] = ("mean",),
+            ewm_spans: Sequence[int] = (),
+            min_periods: Optional[int] = None,
+            batch_size: Optional[int] = None,
+            dropna: bool = True
+    ) -> pd.DataFrame:
+        """
+        Возвращает длинную таблицу (точка, час) со спросом и лаговыми признаками.
+
+        Параметры:
+        ----------
+        lags, windows, stats, ewm_spans, min_periods, batch_size :
+            Как в lag_features.
+        dropna : bool, default=True
+            Удалить строки, для которых признаки не определены (начало ряда).
+
+        Возвращает:
+        ----------
+        pd.DataFrame
+            Датасет для обучения модели спроса по точкам.
+        """
+        frame = self.to_frame()
+        frame["hour_of_day"] = frame[self.timestamp_col].dt.hour
+        frame["day_of_week"] = frame[self.timestamp_col].dt.dayofweek
+
+        features = self.lag_features(lags, windows, stats, ewm_spans, min_periods, batch_size)
+        for name, values in features.items():
+            frame[name] = values.ravel()
+
+        return frame.dropna(ignore_index=True) if dropna else frame
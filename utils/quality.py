@@ -0,0 +1,859 @@
+import html
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+import pandas as pd
+
+from .ingestion import DEFAULT_CHUNKSIZE, _detect_sep
+from .overview import find_mask_runs
+from .paths import join_path
+from .storage import RAW_INPUTS
+
+GAP_COLUMNS = ["column", "start", "end", "start_row", "length"]
+
+DEFAULT_QUANTILES = (0.01, 0.25, 0.5, 0.75, 0.99)
+
+
+def _timestamps(data: pd.DataFrame, timestamp_col: Optional[str]) -> Optional[pd.DatetimeIndex]:
+    """
+    Возвращает временные метки строк: из колонки timestamp_col или из индекса.
+    """
+    if timestamp_col is not None:
+        return pd.DatetimeIndex(data[timestamp_col])
+    if isinstance(data.index, pd.DatetimeIndex):
+        return data.index
+    return None
+
+
+def profile_nan_gaps(
+        data: pd.DataFrame,
+        cols: Optional[List[str]] = None,
+        timestamp_col: Optional[str] = None,
+        min_length: int = 1
+) -> pd.DataFrame:
+    """
+    Описывает все серии подряд идущих пропусков по колонкам датафрейма.
+
+    В отличие от print_consecutive_nans, маска пропусков строится один раз
+    для всех колонок (find_mask_runs), а результат возвращается таблицей,
+    которую можно фильтровать, сохранять или проверять в check_gaps.
+    Строки должны быть упорядочены по времени.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датафрейм временного ряда.
+    cols : List[str], optional
+        Проверяемые колонки. По умолчанию — все, кроме timestamp_col.
+    timestamp_col : str, optional
+        Колонка времени. По умолчанию — индекс, если это DatetimeIndex;
+        иначе границы серий указываются только номерами строк.
+    min_length : int, default=1
+        Минимальная длина серии, попадающей в отчёт.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Колонки column, start, end (время первой и последней пропущенной
+        строки), start_row (позиция первой строки) и length (число строк).
+
+    Пример:
+    -------
+    >>> gaps = profile_nan_gaps(weather_data, ["temperature", "wind_speed"], timestamp_col="datetime")
+    >>> gaps.groupby("column")["length"].agg(["count", "max"])
+    """
+    if cols is None:
+        cols = [col for col in data.columns if col != timestamp_col]
+
+    col_idx, starts, lengths = find_mask_runs(data[cols].isna().to_numpy())
+    keep = lengths >= min_length
+    col_idx, starts, lengths = col_idx[keep], starts[keep], lengths[keep]
+
+    timestamps = _timestamps(data, timestamp_col)
+    if timestamps is not None:
+        start_time, end_time = timestamps[starts], timestamps[starts + lengths - 1]
+    else:
+        start_time = end_time = pd.DatetimeIndex(np.full(len(starts), np.datetime64("NaT", "ns")))
+
+    return pd.DataFrame({
+        "column": pd.Categorical.from_codes(col_idx, categories=pd.Index(cols)),
+        "start": start_time,
+        "end": end_time,
+        "start_row": starts,
+        "length": lengths,
+    }, columns=GAP_COLUMNS)
+
+
+def find_missing_timestamps(
+        data: pd.DataFrame,
+        timestamp_col: Optional[str] = "datetime",
+        freq: str = "h",
+        start: Optional[Union[str, pd.Timestamp]] = None,
+        end: Optional[Union[str, pd.Timestamp]] = None
+) -> pd.DataFrame:
+    """
+    Находит пропущенные отметки на регулярной временной сетке.
+
+    Отметки переводятся в номера шагов сетки (int64), после сортировки
+    уникальных значений пропуски ищутся по разностям соседних шагов,
+    без построения полной сетки через date_range и reindex.
+    Подходит для колонки datetime погоды и сетки hour_timestamp спроса.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датафрейм с временными метками.
+    timestamp_col : str, optional, default="datetime"
+        Колонка времени. None — использовать DatetimeIndex датафрейма.
+    freq : str, default="h"
+        Шаг сетки ('h', '30min', 'D' и т.д.). Отметки округляются вниз до шага.
+    start, end : str | pd.Timestamp, optional
+        Ожидаемые границы сетки. По умолчанию — первая и последняя отметки данных.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Серии пропущенных отметок: start, end (первая и последняя
+        пропущенные отметки) и length (число пропущенных шагов).
+
+    Пример:
+    -------
+    >>> find_missing_timestamps(hourly_data, "hour_timestamp")
+    """
+    timestamps = _timestamps(data, timestamp_col)
+    if timestamps is None:
+        raise ValueError("Не найдены временные метки: укажите timestamp_col или используйте DatetimeIndex")
+
+    step = pd.Timedelta(pd.tseries.frequencies.to_offset(freq)).value
+    steps = timestamps.asi8[~timestamps.isna()] // step
+
+    steps = np.unique(steps)
+    # Границы сетки добавляются как соседние с ней шаги, чтобы пропуски на краях тоже нашлись
+    if start is not None:
+        before = pd.Timestamp(start).value // step - 1
+        steps = np.concatenate([[before], steps[steps > before]])
+    if end is not None:
+        after = pd.Timestamp(end).value // step + 1
+        steps = np.concatenate([steps[steps < after], [after]])
+
+    jumps = np.diff(steps)
+    gap_idx = np.flatnonzero(jumps > 1)
+    first = steps[gap_idx] + 1
+    lengths = jumps[gap_idx] - 1
+
+    return pd.DataFrame({
+        "start": pd.DatetimeIndex(first * step),
+        "end": pd.DatetimeIndex((first + lengths - 1) * step),
+        "length": lengths,
+    })
+
+
+def check_gaps(
+        data: pd.DataFrame,
+        cols: Optional[List[str]] = None,
+        timestamp_col: Optional[str] = "datetime",
+        freq: Optional[str] = "h",
+        max_nan_run: Union[int, Dict[str, int]] = 0,
+        max_missing_timestamps: int = 0
+) -> Dict[str, pd.DataFrame]:
+    """
+    Проверка качества временного ряда для автоматических запусков.
+
+    Считает серии пропусков (profile_nan_gaps) и пропущенные отметки
+    сетки (find_missing_timestamps) и выбрасывает ValueError, если
+    допустимые пределы превышены.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Датафрейм временного ряда, упорядоченный по времени.
+    cols : List[str], optional
+        Проверяемые колонки. По умолчанию — все, кроме timestamp_col.
+    timestamp_col : str, optional, default="datetime"
+        Колонка времени. None — использовать DatetimeIndex датафрейма.
+    freq : str, optional, default="h"
+        Шаг сетки. None — не проверять пропущенные отметки.
+    max_nan_run : int | Dict[str, int], default=0
+        Максимально допустимая длина серии пропусков — общая или по колонкам
+        (колонки не из словаря не ограничиваются).
+    max_missing_timestamps : int, default=0
+        Максимально допустимое число пропущенных отметок сетки.
+
+    Возвращает:
+    ----------
+    Dict[str, pd.DataFrame]
+        Отчёт {"nan_gaps": ..., "missing_timestamps": ...}, если проверка пройдена.
+
+    Исключения:
+    ----------
+    ValueError
+        Если найдены серии пропусков длиннее допустимых или слишком много
+        пропущенных отметок.
+
+    Пример:
+    -------
+    >>> check_gaps(weather_data, timestamp_col="datetime", max_nan_run={"temperature": 3, "wind_speed": 6})
+    """
+    nan_gaps = profile_nan_gaps(data, cols, timestamp_col)
+    if freq is not None:
+        missing = find_missing_timestamps(data, timestamp_col, freq)
+    else:
+        missing = pd.DataFrame(columns=["start", "end", "length"])
+
+    if isinstance(max_nan_run, dict):
+        limits = nan_gaps["column"].astype(object).map(max_nan_run).to_numpy(dtype=np.float64, na_value=np.inf)
+    else:
+        limits = np.full(len(nan_gaps), max_nan_run, dtype=np.float64)
+    violations = nan_gaps[nan_gaps["length"].to_numpy() > limits]
+
+    problems = []
+    if len(violations):
+        worst = violations.groupby("column", observed=True)["length"].max()
+        problems.append(
+            "серии пропусков длиннее допустимых: "
+            + ", ".join(f"{col} (до {length} строк)" for col, length in worst.items())
+        )
+
+    n_missing = int(missing["length"].sum()) if len(missing) else 0
+    if n_missing > max_missing_timestamps:
+        problems.append(f"пропущено {n_missing} отметок сетки ({len(missing)} серий)")
+
+    if problems:
+        raise ValueError("Проверка пропусков не пройдена: " + "; ".join(problems))
+
+    return {"nan_gaps": nan_gaps, "missing_timestamps": missing}
+
+
+class _HyperLogLog:
+    """
+    Скетч HyperLogLog: оценка числа различных 64-битных хэшей в 2**precision байтах.
+    """
+
+    def __init__(self, precision: int = 14):
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, hashes: np.ndarray) -> None:
+        hashes = np.asarray(hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        # Старшие 32 бита оставшейся части хэша: позиция первой единицы точно считается через log2
+        rest = ((hashes << np.uint64(self.precision)) >> np.uint64(32)).astype(np.float64)
+        with np.errstate(divide="ignore"):
+            rank = np.where(rest > 0, 32 - np.floor(np.log2(rest)), 33).astype(np.uint8)
+        np.maximum.at(self.registers, index, rank)
+
+    def estimate(self) -> float:
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.sum(np.exp2(-self.registers.astype(np.float64)))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)
+        return float(estimate)
+
+
+class _SpaceSaving:
+    """
+    Скетч space-saving для самых частых значений: не более capacity счётчиков.
+
+    Частоты порции складываются со счётчиками; значения, которых не было
+    в заполненном скетче, получают нижнюю границу floor (максимум вытесненных
+    счётчиков). Оценка частоты не меньше истинной и превышает её не более чем на error.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.counts = pd.Series(dtype=np.int64)
+        self.errors = pd.Series(dtype=np.int64)
+        self.floor = 0
+
+    def update(self, counts: pd.Series) -> None:
+        is_fresh = ~counts.index.isin(self.counts.index)
+        merged = self.counts.add(counts, fill_value=0).astype(np.int64)
+        errors = self.errors.reindex(merged.index, fill_value=0)
+
+        fresh = counts.index[is_fresh]
+        merged[fresh] += self.floor
+        errors[fresh] = self.floor
+
+        if len(merged) > self.capacity:
+            merged = merged.sort_values(ascending=False, kind="stable")
+            self.floor = max(self.floor, int(merged.iloc[self.capacity]))
+            merged = merged.iloc[:self.capacity]
+            errors = errors[merged.index]
+
+        self.counts, self.errors = merged, errors
+
+    def top(self, n: int) -> pd.DataFrame:
+        counts = self.counts.sort_values(ascending=False, kind="stable").head(n)
+        return pd.DataFrame({"value": counts.index, "count": counts.to_numpy(), "error": self.errors[counts.index].to_numpy()})
+
+
+class _NumericSummary:
+    """
+    Потоковые count/mean/std/min/max (объединение моментов по Чану)
+    и равномерная выборка фиксированного размера для квантилей.
+
+    Выборка строится по случайным приоритетам: остаются sample_size значений
+    с наименьшим приоритетом, что эквивалентно reservoir sampling, но
+    обновляется одной операцией np.argpartition на порцию.
+    """
+
+    def __init__(self, sample_size: int, rng: np.random.Generator):
+        self.sample_size = sample_size
+        self.rng = rng
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+        self.sample = np.empty(0)
+        self.priorities = np.empty(0)
+
+    def update(self, values: np.ndarray) -> None:
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+
+        count, mean = len(values), float(values.mean())
+        m2 = float(np.square(values - mean).sum())
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta * delta * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+
+        self.sample = np.concatenate([self.sample, values])
+        self.priorities = np.concatenate([self.priorities, self.rng.random(count)])
+        if len(self.sample) > self.sample_size:
+            keep = np.argpartition(self.priorities, self.sample_size)[:self.sample_size]
+            self.sample, self.priorities = self.sample[keep], self.priorities[keep]
+
+    def result(self, quantiles: Sequence[float]) -> Dict[str, Any]:
+        if not self.count:
+            return {"mean": None, "std": None, "min": None, "max": None, "quantiles": {}}
+        return {
+            "mean": self.mean,
+            "std": float(np.sqrt(self.m2 / (self.count - 1))) if self.count > 1 else None,
+            "min": self.min,
+            "max": self.max,
+            "quantiles": dict(zip(map(str, quantiles), np.quantile(self.sample, quantiles).tolist())),
+            "quantiles_exact": self.count <= self.sample_size,
+        }
+
+
+class _DuplicateCounter:
+    """
+    Подсчёт повторяющихся хэшей: точный (отсортированный массив, как в
+    ingest_rides_csv) или приближённый (строк минус оценка HyperLogLog).
+    """
+
+    def __init__(self, method: str, precision: int):
+        self.method = method
+        self.seen = np.empty(0, dtype=np.uint64)
+        self.repeated = 0
+        self.sketch = _HyperLogLog(precision) if method == "hll" else None
+
+    def update(self, keys: np.ndarray) -> None:
+        if self.sketch is not None:
+            self.sketch.update(keys)
+            return
+        unique = np.unique(keys)
+        is_seen = np.zeros(len(unique), dtype=bool)
+        if len(self.seen):
+            positions = np.searchsorted(self.seen, unique).clip(max=len(self.seen) - 1)
+            is_seen = self.seen[positions] == unique
+        self.repeated += len(keys) - int((~is_seen).sum())
+        self.seen = np.union1d(self.seen, unique[~is_seen])
+
+    def duplicates(self, n_rows: int) -> int:
+        if self.sketch is not None:
+            return max(n_rows - int(round(self.sketch.estimate())), 0)
+        return self.repeated
+
+
+def _row_hashes(frame: pd.DataFrame, mask: np.ndarray) -> np.ndarray:
+    """
+    64-битные хэши строк, в которых пропуск хэшируется одинаково при любом типе колонки.
+
+    hash_pandas_object даёт разные хэши NaN в колонке float64 и в колонке
+    object, а тип одной и той же колонки CSV может меняться между порциями.
+    """
+    hashes = np.zeros(len(frame), dtype=np.uint64)
+    for idx, col in enumerate(frame.columns):
+        column_hashes = pd.util.hash_pandas_object(frame[col], index=False).to_numpy()
+        column_hashes[mask[:, idx]] = 0
+        hashes = hashes * np.uint64(1_000_003) ^ column_hashes
+    return hashes
+
+
+def _to_builtin(value: Any) -> Any:
+    """
+    Приводит значения отчёта к типам, которые сериализуются в JSON.
+    """
+    if isinstance(value, dict):
+        return {str(key): _to_builtin(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_builtin(item) for item in value]
+    if isinstance(value, (pd.Timestamp, pd.Timedelta)):
+        return value.isoformat()
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if value is None or isinstance(value, (bool, int, float, str)):
+        return value
+    return str(value)
+
+
+@dataclass
+class QualityReport:
+    """
+    Отчёт о качестве данных, собранный StreamingProfiler.
+
+    Атрибуты:
+    ----------
+    source : str
+        Источник данных (путь к файлу или описание).
+    n_rows : int
+        Число строк.
+    n_chunks : int
+        Число обработанных порций.
+    missing : Dict[str, Any]
+        Пропуски: всего ячеек, доли ячеек и строк, по колонкам.
+    duplicates : Dict[str, Any]
+        Полные дубликаты строк и дубликаты ключа (метод: exact или hll).
+    columns : Dict[str, Dict[str, Any]]
+        Сводка по каждой колонке: тип, пропуски, некорректные значения,
+        число различных значений, серии пропусков, числовая статистика
+        или самые частые значения.
+    """
+    source: str
+    n_rows: int
+    n_chunks: int
+    missing: Dict[str, Any]
+    duplicates: Dict[str, Any]
+    columns: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return _to_builtin(asdict(self))
+
+    def to_json(self, path: Optional[Union[str, Path]] = None, indent: int = 2) -> str:
+        """
+        Возвращает отчёт в формате JSON и, если указан path, сохраняет его в файл.
+        """
+        text = json.dumps(self.to_dict(), ensure_ascii=False, indent=indent)
+        if path is not None:
+            Path(path).write_text(text, encoding="utf-8")
+        return text
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Сводная таблица по колонкам (одна строка на колонку).
+        """
+        rows = {}
+        for col, info in self.columns.items():
+            row = {key: info.get(key) for key in ["kind", "missing", "invalid", "distinct", "nan_runs", "max_nan_run"]}
+            row["missing_ratio"] = info["missing"] / self.n_rows if self.n_rows else None
+            for key in ["mean", "std", "min", "max"]:
+                row[key] = info.get(key)
+            row.update({f"q{key}": value for key, value in info.get("quantiles", {}).items()})
+            rows[col] = row
+        return pd.DataFrame.from_dict(rows, orient="index")
+
+    def top_values(self, col: str) -> pd.DataFrame:
+        """
+        Самые частые значения категориальной колонки (value, count, error).
+        """
+        return pd.DataFrame(self.columns[col].get("top", []), columns=["value", "count", "error"])
+
+    def to_html(self, path: Optional[Union[str, Path]] = None) -> str:
+        """
+        Возвращает отчёт в виде HTML-страницы и, если указан path, сохраняет её в файл.
+        """
+        missing, duplicates = self.missing, self.duplicates
+        parts = [
+            f"<h1>Качество данных: {html.escape(self.source)}</h1>",
+            f"<p>Строк: {self.n_rows}, порций: {self.n_chunks}</p>",
+            "<h2>Пропуски</h2>",
+            f"<p>Всего пропусков: {missing['cells']} ({missing['cell_ratio']:.1%} ячеек), "
+            f"строк с пропусками: {missing['rows']} ({missing['row_ratio']:.1%})</p>",
+            "<h2>Дубликаты</h2>",
+            f"<p>Полных дубликатов строк: {duplicates['rows']} (метод: {duplicates['method']})</p>",
+        ]
+        if duplicates.get("key_cols"):
+            parts.append(f"<p>Дубликатов по ключу {html.escape(', '.join(duplicates['key_cols']))}: {duplicates['keys']}</p>")
+
+        parts += ["<h2>Колонки</h2>", self.summary().to_html(float_format=lambda value: f"{value:.4g}", na_rep="")]
+        for col, info in self.columns.items():
+            if info.get("top"):
+                parts += [f"<h3>{html.escape(str(col))}: самые частые значения</h3>", self.top_values(col).to_html(index=False)]
+
+        text = "<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>Data quality</title></head><body>\n"
+        text += "\n".join(parts) + "\n</body></html>\n"
+        if path is not None:
+            Path(path).write_text(text, encoding="utf-8")
+        return text
+
+
+class StreamingProfiler:
+    """
+    Однопроходный профиль качества данных по порциям.
+
+    Заменяет print_missed_info, print_duplicated_info, describe_categorical
+    и print_consecutive_nans, которые печатают результат и каждый раз
+    сканируют весь датафрейм. Каждая порция просматривается один раз,
+    между порциями хранится только состояние фиксированного размера
+    (кроме точного поиска дубликатов):
+    • счётчики пропусков по колонкам и открытые серии пропусков на границе порций
+    • дубликаты — отсортированный массив 64-битных хэшей строк, как в
+      ingest_rides_csv (8 байт на уникальную строку), или скетч HyperLogLog
+    • число различных значений колонок — HyperLogLog
+    • самые частые значения — скетч space-saving
+    • числовая статистика — моменты и равномерная выборка для квантилей
+
+    Тип колонки (numeric, datetime, categorical) определяется по первой
+    порции, в которой у неё есть значения (до этого колонка считается
+    пустой — empty); строковая колонка считается числовой, если к числу приводится
+    не менее numeric_threshold её значений. Значения, не приводимые к типу
+    колонки, считаются некорректными (invalid) и учитываются как пропуски.
+
+    Пример:
+    -------
+    >>> profiler = StreamingProfiler(key_cols=["id", "start_date"])
+    >>> for chunk in pd.read_csv(path, chunksize=500_000):
+    ...     profiler.update(chunk)
+    >>> report = profiler.report()
+    >>> report.summary()
+    """
+
+    def __init__(
+            self,
+            key_cols: Optional[List[str]] = None,
+            top_n: int = 30,
+            capacity: Optional[int] = None,
+            duplicates: str = "exact",
+            quantiles: Sequence[float] = DEFAULT_QUANTILES,
+            sample_size: int = 100_000,
+            hll_precision: int = 14,
+            numeric_threshold: float = 0.99,
+            source: str = "",
+            random_state: int = 0
+    ):
+        if duplicates not in ("exact", "hll"):
+            raise ValueError(f"Неизвестный метод поиска дубликатов: {duplicates}")
+
+        self.key_cols = list(key_cols) if key_cols else None
+        self.top_n = top_n
+        self.capacity = capacity or max(top_n * 20, 1000)
+        self.duplicates = duplicates
+        self.quantiles = tuple(quantiles)
+        self.sample_size = sample_size
+        self.hll_precision = hll_precision
+        self.numeric_threshold = numeric_threshold
+        self.source = source
+        self.rng = np.random.default_rng(random_state)
+
+        self.columns: Optional[List[str]] = None
+        self.kinds: Dict[str, Optional[str]] = {}
+        self.n_rows = 0
+        self.n_chunks = 0
+        self.rows_with_missing = 0
+
+        self._missing: Optional[np.ndarray] = None
+        self._invalid: Optional[np.ndarray] = None
+        self._open_runs: Optional[np.ndarray] = None
+        self._run_counts: Optional[np.ndarray] = None
+        self._run_max: Optional[np.ndarray] = None
+
+        self._distinct: Dict[str, _HyperLogLog] = {}
+        self._numeric: Dict[str, _NumericSummary] = {}
+        self._frequent: Dict[str, _SpaceSaving] = {}
+        self._datetime_range: Dict[str, List[int]] = {}
+
+        self._row_keys = _DuplicateCounter(duplicates, hll_precision)
+        self._key_keys = _DuplicateCounter(duplicates, hll_precision) if self.key_cols else None
+
+    def _init_columns(self, chunk: pd.DataFrame) -> None:
+        self.columns = list(chunk.columns)
+        n_cols = len(self.columns)
+        self._missing = np.zeros(n_cols, dtype=np.int64)
+        self._invalid = np.zeros(n_cols, dtype=np.int64)
+        self._open_runs = np.zeros(n_cols, dtype=np.int64)
+        self._run_counts = np.zeros(n_cols, dtype=np.int64)
+        self._run_max = np.zeros(n_cols, dtype=np.int64)
+
+        self.kinds = dict.fromkeys(self.columns)
+
+    def _infer_kinds(self, chunk: pd.DataFrame) -> None:
+        """
+        Определяет тип колонок, у которых ещё не было ни одного значения.
+
+        Колонка без значений (например, пустая в первой порции, которую
+        read_csv читает как float64) остаётся без типа, пока в какой-либо
+        порции не появятся значения.
+        """
+        for col in self.columns:
+            if self.kinds[col] is not None or not chunk[col].notna().any():
+                continue
+
+            dtype = chunk[col].dtype
+            if pd.api.types.is_bool_dtype(dtype):
+                kind = "categorical"
+            elif pd.api.types.is_numeric_dtype(dtype):
+                kind = "numeric"
+            elif pd.api.types.is_datetime64_any_dtype(dtype):
+                kind = "datetime"
+            elif self._mostly_numeric(chunk[col]):
+                kind = "numeric"
+            else:
+                kind = "categorical"
+            self.kinds[col] = kind
+            self._distinct[col] = _HyperLogLog(self.hll_precision)
+            if kind == "numeric":
+                self._numeric[col] = _NumericSummary(self.sample_size, self.rng)
+            elif kind == "categorical":
+                self._frequent[col] = _SpaceSaving(self.capacity)
+
+    def _mostly_numeric(self, values: pd.Series) -> bool:
+        """
+        Проверяет, что строковая колонка числовая с редкими мусорными значениями (как distance в выгрузке).
+        """
+        values = values.dropna()
+        if not len(values) or isinstance(values.dtype, pd.CategoricalDtype):
+            return False
+        parsed = pd.to_numeric(values, errors="coerce")
+        return parsed.notna().mean() >= self.numeric_threshold
+
+    def _normalize(self, chunk: pd.DataFrame) -> pd.DataFrame:
+        """
+        Приводит колонки порции к их типу (float64, datetime64 или исходный).
+        """
+        columns = {}
+        for idx, col in enumerate(self.columns):
+            values = chunk[col]
+            kind = self.kinds[col]
+            if kind == "numeric":
+                converted = pd.to_numeric(values, errors="coerce").astype(np.float64)
+            elif kind == "datetime":
+                converted = pd.to_datetime(values, errors="coerce")
+            else:
+                columns[col] = values
+                continue
+            self._invalid[idx] += int((converted.isna() & values.notna()).sum())
+            columns[col] = converted
+        return pd.DataFrame(columns, index=chunk.index)
+
+    def _update_runs(self, mask: np.ndarray) -> None:
+        """
+        Обновляет статистику серий пропусков с учётом серий, переходящих через границу порций.
+        """
+        cols, starts, lengths = find_mask_runs(mask)
+        at_end = starts + lengths == len(mask)
+
+        at_start = starts == 0
+        lengths = lengths + np.where(at_start, self._open_runs[cols], 0)
+
+        continued = np.zeros(len(self.columns), dtype=bool)
+        continued[cols[at_start]] = True
+        closed = (self._open_runs > 0) & ~continued
+        self._run_counts += closed
+        self._run_max = np.maximum(self._run_max, np.where(closed, self._open_runs, 0))
+
+        self._open_runs[:] = 0
+        self._open_runs[cols[at_end]] = lengths[at_end]
+        np.add.at(self._run_counts, cols[~at_end], 1)
+        np.maximum.at(self._run_max, cols[~at_end], lengths[~at_end])
+
+    def update(self, chunk: pd.DataFrame) -> "StreamingProfiler":
+        """
+        Добавляет в профиль очередную порцию строк.
+
+        Параметры:
+        ----------
+        chunk : pd.DataFrame
+            Порция данных с теми же колонками, что и первая порция.
+
+        Возвращает:
+        ----------
+        StreamingProfiler
+            Этот же профиль (для цепочек вызовов).
+        """
+        if not len(chunk):
+            return self
+        if self.columns is None:
+            self._init_columns(chunk)
+        self._infer_kinds(chunk)
+
+        frame = self._normalize(chunk)
+        mask = frame.isna().to_numpy()
+        self.n_rows += len(frame)
+        self.n_chunks += 1
+        self._missing += mask.sum(axis=0)
+        self.rows_with_missing += int(mask.any(axis=1).sum())
+        self._update_runs(mask)
+
+        for col in self.columns:
+            values = frame[col]
+            kind = self.kinds[col]
+            if kind is None:
+                continue
+            if kind == "numeric":
+                array = values.to_numpy()
+                self._numeric[col].update(array)
+                unique = pd.Series(pd.unique(array[~np.isnan(array)]))
+            elif kind == "datetime":
+                stamps = values.dropna()
+                if len(stamps):
+                    low, high = int(stamps.min().value), int(stamps.max().value)
+                    bounds = self._datetime_range.setdefault(col, [low, high])
+                    bounds[:] = [min(bounds[0], low), max(bounds[1], high)]
+                unique = pd.Series(pd.unique(stamps))
+            else:
+                counts = values.value_counts(sort=False)
+                counts = counts[counts > 0]
+                counts.index = counts.index.astype(object)
+                self._frequent[col].update(counts)
+                unique = pd.Series(counts.index, dtype=object)
+            self._distinct[col].update(pd.util.hash_pandas_object(unique, index=False).to_numpy())
+
+        self._row_keys.update(_row_hashes(frame, mask))
+        if self._key_keys is not None:
+            key_idx = [self.columns.index(col) for col in self.key_cols]
+            self._key_keys.update(_row_hashes(frame[self.key_cols], mask[:, key_idx]))
+        return self
+
+    def report(self) -> QualityReport:
+        """
+        Собирает отчёт по всем добавленным порциям.
+        """
+        columns = self.columns or []
+        n_cells = self.n_rows * len(columns)
+        missing_by_column = dict(zip(columns, self._missing.tolist())) if columns else {}
+        total_missing = int(sum(missing_by_column.values()))
+
+        run_counts = self._run_counts + (self._open_runs > 0) if columns else []
+        run_max = np.maximum(self._run_max, self._open_runs) if columns else []
+
+        column_info = {}
+        for idx, col in enumerate(columns):
+            kind = self.kinds[col]
+            info = {
+                "kind": kind or "empty",
+                "missing": int(self._missing[idx]),
+                "invalid": int(self._invalid[idx]),
+                "distinct": int(round(self._distinct[col].estimate())) if kind is not None else 0,
+                "nan_runs": int(run_counts[idx]),
+                "max_nan_run": int(run_max[idx]),
+            }
+            if kind == "numeric":
+                info.update(self._numeric[col].result(self.quantiles))
+            elif kind is None:
+                pass
+            elif kind == "datetime":
+                bounds = self._datetime_range.get(col)
+                info["min"] = pd.Timestamp(bounds[0]) if bounds else None
+                info["max"] = pd.Timestamp(bounds[1]) if bounds else None
+            else:
+                info["top"] = self._frequent[col].top(self.top_n).to_dict(orient="records")
+            column_info[col] = info
+
+        duplicates = {"method": self.duplicates, "rows": self._row_keys.duplicates(self.n_rows)}
+        if self._key_keys is not None:
+            duplicates["key_cols"] = self.key_cols
+            duplicates["keys"] = self._key_keys.duplicates(self.n_rows)
+
+        return QualityReport(
+            source=self.source,
+            n_rows=self.n_rows,
+            n_chunks=self.n_chunks,
+            missing={
+                "cells": total_missing,
+                "cell_ratio": total_missing / n_cells if n_cells else 0.0,
+                "rows": self.rows_with_missing,
+                "row_ratio": self.rows_with_missing / self.n_rows if self.n_rows else 0.0,
+                "by_column": missing_by_column,
+            },
+            duplicates=duplicates,
+            columns=column_info,
+        )
+
+
+def profile_csv(
+        src: Optional[Union[str, Path]] = None,
+        chunksize: int = DEFAULT_CHUNKSIZE,
+        parse_dates: Optional[List[str]] = None,
+        key_cols: Optional[List[str]] = None,
+        top_n: int = 30,
+        duplicates: str = "exact",
+        json_path: Optional[Union[str, Path]] = None,
+        html_path: Optional[Union[str, Path]] = None
+) -> QualityReport:
+    """
+    Строит отчёт о качестве CSV-файла, читая его порциями.
+
+    Память ограничена размером одной порции и состоянием StreamingProfiler,
+    поэтому можно профилировать файлы больше оперативной памяти.
+
+    Параметры:
+    ----------
+    src : str | Path, optional
+        Путь к CSV. По умолчанию — сырая выгрузка поездок data/rides.csv
+        (даты разбираются как в RAW_INPUTS).
+    chunksize : int, default=500_000
+        Количество строк в одной порции.
+    parse_dates : List[str], optional
+        Колонки с датами.
+    key_cols : List[str], optional
+        Ключ, по которому дополнительно считаются дубликаты (например, ['ID', 'Start Date']).
+    top_n : int, default=30
+        Количество самых частых значений категориальных колонок.
+    duplicates : str, default="exact"
+        'exact' — массив хэшей строк (8 байт на строку),
+        'hll' — приближённая оценка HyperLogLog с постоянной памятью
+        (погрешность около 1% от числа строк — подходит, только когда
+        дубликатов много).
+    json_path, html_path : str | Path, optional
+        Куда сохранить отчёт в формате JSON и HTML.
+
+    Возвращает:
+    ----------
+    QualityReport
+        Отчёт о пропусках, дубликатах и распределениях колонок.
+
+    Пример:
+    -------
+    >>> report = profile_csv(key_cols=["ID", "Start Date"], html_path="rides_quality.html")
+    >>> report.summary()
+    """
+    if src is None:
+        raw_input = RAW_INPUTS["rides"]
+        src = join_path(*raw_input["parts"])
+        parse_dates = parse_dates or raw_input["date_cols"]
+    src = Path(src)
+
+    reader = pd.read_csv(
+        src,
+        encoding="utf-8",
+        sep=_detect_sep(src),
+        parse_dates=parse_dates,
+        chunksize=chunksize,
+    )
+
+    profiler = StreamingProfiler(key_cols=key_cols, top_n=top_n, duplicates=duplicates, source=str(src))
+    for chunk in reader:
+        profiler.update(chunk)
+
+    report = profiler.report()
+    if json_path is not None:
+        report.to_json(json_path)
+    if html_path is not None:
+        report.to_html(html_path)
+    return report
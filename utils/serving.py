@@ -0,0 +1,314 @@
+"""
+Сервис оценки почасового спроса по HTTP.
+
+Запуск из корня проекта:
+    python -m utils.serving --bundle data/models/demand_model.joblib --port 8000
+"""
+import argparse
+import threading
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Union
+
+import joblib
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel
+
+from .modeling import HOUR_NS, FeatureEncoder, _lag_matrix_features
+from .paths import join_path
+
+MODEL_BUNDLE_PARTS = ("data", "models", "demand_model.joblib")
+
+
+class DemandScorer:
+    """
+    Модель спроса, кодировщик признаков и история спроса для онлайн-прогноза.
+
+    Последние закрытые часы спроса хранятся в кольцевом буфере фиксированной
+    длины max(lags, windows): observe записывает новый час за O(1), а лаговые
+    признаки следующего часа считаются тем же движком, что add_lag_features,
+    поэтому совпадают с признаками обучения. Признаки запроса кодируются
+    FeatureEncoder.transform_one без создания DataFrame.
+
+    Пример:
+    -------
+    >>> scorer = DemandScorer(model, encoder, history=data["demand"], last_hour=data["hour_timestamp"].max())
+    >>> scorer.save(pj("data", "models", "demand_model.joblib"))
+    >>> scorer.predict_one({"temperature": 18.5, "promo": "Нет", "day_of_week": "пятница", ...})
+    """
+
+    def __init__(
+            self,
+            model,
+            encoder: FeatureEncoder,
+            lags: Sequence[int] = (1, 24),
+            windows: Sequence[int] = (24, 24 * 7),
+            stats: Sequence[str] = ("mean",),
+            history: Optional[Sequence[float]] = None,
+            last_hour: Optional[Union[str, pd.Timestamp]] = None
+    ):
+        self.model = model
+        self.encoder = encoder
+        self.lags = tuple(lags)
+        self.windows = tuple(windows)
+        self.stats = tuple(stats)
+
+        self.capacity = max([*self.lags, *self.windows, 1])
+        self.buffer = np.full(self.capacity, np.nan)
+        self.size = 0
+        self.position = 0
+        self.last_hour: Optional[int] = None
+        self._lock = threading.Lock()
+        self._lag_cache: Optional[Dict[str, float]] = None
+
+        history = np.asarray(history if history is not None else [], dtype=np.float64)
+        for value in history[-self.capacity:]:
+            self._push(value)
+        if last_hour is not None:
+            self.last_hour = pd.Timestamp(last_hour).value // HOUR_NS * HOUR_NS
+
+    def _push(self, value: float) -> None:
+        """
+        Записывает спрос очередного часа в кольцевой буфер.
+        """
+        self.buffer[self.position] = value
+        self.position = (self.position + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
+        self._lag_cache = None
+
+    def history(self) -> np.ndarray:
+        """
+        Возвращает спрос последних закрытых часов в хронологическом порядке.
+        """
+        ordered = np.concatenate([self.buffer[self.position:], self.buffer[:self.position]])
+        return ordered[self.capacity - self.size:]
+
+    def observe(self, hour_timestamp: Union[str, pd.Timestamp], demand: float) -> None:
+        """
+        Добавляет фактический спрос закрытого часа.
+
+        Пропущенные между наблюдениями часы считаются часами без поездок (спрос 0).
+
+        Параметры:
+        ----------
+        hour_timestamp : str | pd.Timestamp
+            Час, за который известен спрос.
+        demand : float
+            Количество поездок за час.
+        """
+        hour = pd.Timestamp(hour_timestamp).value // HOUR_NS * HOUR_NS
+
+        with self._lock:
+            if self.last_hour is not None:
+                if hour <= self.last_hour:
+                    raise ValueError(f"Час {pd.Timestamp(hour)} уже учтён в истории")
+                missing = min((hour - self.last_hour) // HOUR_NS - 1, self.capacity)
+                for _ in range(missing):
+                    self._push(0.0)
+            self._push(float(demand))
+            self.last_hour = hour
+
+    def _lags_after(self, history: np.ndarray) -> Dict[str, float]:
+        """
+        Лаговые признаки часа, следующего за переданной историей спроса.
+        """
+        series = np.append(history, np.nan)[np.newaxis, :]
+        features = _lag_matrix_features(series, self.lags, self.windows, self.stats)
+        return {name: float(values[0, -1]) for name, values in features.items()}
+
+    def lag_features(self) -> Dict[str, float]:
+        """
+        Возвращает лаговые признаки следующего после истории часа.
+        """
+        with self._lock:
+            if self._lag_cache is None:
+                self._lag_cache = self._lags_after(self.history())
+            return self._lag_cache
+
+    def _vector(self, record: Dict[str, Any], lag_features: Dict[str, float]) -> np.ndarray:
+        """
+        Кодирует запрос; недостающие лаговые признаки берутся из истории.
+        """
+        return self.encoder.transform_one({**lag_features, **record})
+
+    def predict_one(self, record: Dict[str, Any]) -> float:
+        """
+        Прогнозирует спрос одного часа.
+
+        Параметры:
+        ----------
+        record : Dict[str, Any]
+            Факторы часа (погода, промо, день недели, час суток).
+            Лаговые признаки можно передать явно, иначе они берутся из истории.
+
+        Возвращает:
+        ----------
+        float
+            Прогноз количества поездок.
+        """
+        vector = self._vector(record, self.lag_features())
+        return float(self.model.predict(vector[np.newaxis, :])[0])
+
+    def predict_many(self, records: List[Dict[str, Any]], sequential: bool = False) -> List[float]:
+        """
+        Прогнозирует спрос для набора записей.
+
+        По умолчанию все записи относятся к одному и тому же следующему часу
+        (сценарии: разная погода, промо) и получают одни и те же лаговые
+        признаки из истории — как при вызове predict_one для каждой записи.
+        Такой набор оценивается одним вызовом модели.
+
+        Для прогноза нескольких часов подряд нужен sequential=True: записи —
+        последовательные часы начиная со следующего, прогноз каждого часа
+        добавляется к копии истории и участвует в лагах следующих часов
+        (рекурсивный прогноз). Результат совпадает с чередованием predict_one
+        и observe(час, прогноз); сама история сервиса не меняется.
+
+        Параметры:
+        ----------
+        records : List[Dict[str, Any]]
+            Факторы часов (как в predict_one).
+        sequential : bool, default=False
+            Записи — последовательные часы, а не сценарии одного часа.
+
+        Возвращает:
+        ----------
+        List[float]
+            Прогнозы в порядке записей.
+        """
+        if not records:
+            return []
+        if not sequential:
+            lag_features = self.lag_features()
+            matrix = np.vstack([self._vector(record, lag_features) for record in records])
+            return self.model.predict(matrix).astype(float).tolist()
+
+        with self._lock:
+            history = self.history()
+        predictions = []
+        for record in records:
+            vector = self._vector(record, self._lags_after(history))
+            prediction = float(self.model.predict(vector[np.newaxis, :])[0])
+            predictions.append(prediction)
+            history = np.append(history, prediction)[-self.capacity:]
+        return predictions
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_lag_cache"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def save(self, path: Optional[Union[str, Path]] = None) -> Path:
+        """
+        Сохраняет модель, кодировщик и историю спроса одним файлом (joblib).
+        """
+        path = Path(path) if path is not None else join_path(*MODEL_BUNDLE_PARTS)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        joblib.dump(self, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[Union[str, Path]] = None) -> "DemandScorer":
+        """
+        Загружает сохранённый методом save сервис оценки.
+        """
+        path = Path(path) if path is not None else join_path(*MODEL_BUNDLE_PARTS)
+        scorer = joblib.load(path)
+        if not isinstance(scorer, cls):
+            raise TypeError(f"{path} не содержит {cls.__name__}")
+        return scorer
+
+
+class BatchRequest(BaseModel):
+    records: List[Dict[str, Any]]
+    sequential: bool = False
+
+
+class ObserveRequest(BaseModel):
+    hour_timestamp: datetime
+    demand: float
+
+
+def create_app(scorer: Union[DemandScorer, str, Path, None] = None) -> FastAPI:
+    """
+    Создаёт HTTP-приложение FastAPI для оценки спроса.
+
+    Модель и кодировщик загружаются один раз при создании приложения.
+    Обработчики асинхронные: прогноз занимает микросекунды, поэтому
+    выполняется прямо в цикле событий без передачи в пул потоков.
+
+    Эндпоинты:
+    • GET  /health — состояние сервиса и последний учтённый час
+    • POST /predict — прогноз одного часа (тело — словарь факторов)
+    • POST /predict/batch — прогноз сценариев следующего часа ({"records": [...]})
+      или нескольких часов подряд ({"records": [...], "sequential": true})
+    • POST /observe — фактический спрос закрытого часа для лаговых признаков
+
+    Параметры:
+    ----------
+    scorer : DemandScorer | str | Path, optional
+        Готовый сервис оценки или путь к сохранённому файлу.
+        По умолчанию — data/models/demand_model.joblib.
+
+    Возвращает:
+    ----------
+    FastAPI
+        Приложение для запуска через uvicorn.
+    """
+    if not isinstance(scorer, DemandScorer):
+        scorer = DemandScorer.load(scorer)
+
+    app = FastAPI(title="Scooter demand scoring")
+    app.state.scorer = scorer
+
+    def _handle(func, *args):
+        try:
+            return func(*args)
+        except (KeyError, ValueError, TypeError) as error:
+            raise HTTPException(status_code=422, detail=str(error))
+
+    @app.get("/health")
+    async def health() -> Dict[str, Any]:
+        last_hour = scorer.last_hour
+        return {
+            "status": "ok",
+            "history_hours": scorer.size,
+            "last_hour": str(pd.Timestamp(last_hour)) if last_hour is not None else None,
+        }
+
+    @app.post("/predict")
+    async def predict(record: Dict[str, Any]) -> Dict[str, float]:
+        return {"demand": _handle(scorer.predict_one, record)}
+
+    @app.post("/predict/batch")
+    async def predict_batch(request: BatchRequest) -> Dict[str, List[float]]:
+        return {"demand": _handle(scorer.predict_many, request.records, request.sequential)}
+
+    @app.post("/observe")
+    async def observe(request: ObserveRequest) -> Dict[str, Any]:
+        _handle(scorer.observe, request.hour_timestamp, request.demand)
+        return {"status": "ok", "last_hour": str(request.hour_timestamp)}
+
+    return app
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--bundle", type=Path, default=None)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    # Класс DemandScorer сохранён как utils.serving.DemandScorer, а не __main__.DemandScorer
+    from utils.serving import create_app as create_service_app
+
+    uvicorn.run(create_service_app(args.bundle), host=args.host, port=args.port, log_level="warning")
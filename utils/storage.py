@@ -0,0 +1,465 @@
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from .cleaning import DAY_NAMES
+from .paths import join_path
+
+# Артефакты пайплайна: путь без расширения, колонки с датами и колонка сортировки
+ARTIFACTS: Dict[str, Dict] = {
+    "cleaned_rides": {
+        "parts": ("data", "cleaned", "cleaned_rides"),
+        "date_cols": ["start_date", "end_date", "day_timestamp", "hour_timestamp"],
+        "sort_by": "start_date",
+    },
+    "cleaned_weather": {
+        "parts": ("data", "cleaned", "cleaned_weather"),
+        "date_cols": ["datetime"],
+        "sort_by": "datetime",
+    },
+    "rides_weather": {
+        "parts": ("data", "rides_weather_data"),
+        "date_cols": ["datetime", "start_date", "end_date", "day_timestamp", "hour_timestamp"],
+        "sort_by": "start_date",
+    },
+}
+
+# Исходные выгрузки, которые остаются в CSV
+RAW_INPUTS: Dict[str, Dict] = {
+    "rides": {"parts": ("data", "rides.csv"), "date_cols": ["Start Date", "End Date"]},
+    "weather": {"parts": ("data", "weather.csv"), "date_cols": ["Datetime"]},
+}
+
+DEFAULT_ROW_GROUP_SIZE = 100_000
+
+# Корень датасета очищенных поездок, разбитого по дням
+RIDES_DATASET_PARTS = ("data", "cleaned", "rides_dataset")
+
+TimeBound = Optional[Union[str, pd.Timestamp]]
+
+
+def _date_filters(
+        date_col: str,
+        start: TimeBound,
+        end: TimeBound
+) -> Optional[List[Tuple[str, str, pd.Timestamp]]]:
+    """
+    Формирует фильтры pyarrow для интервала [start, end) по колонке date_col.
+    """
+    filters = []
+    if start is not None:
+        filters.append((date_col, ">=", pd.Timestamp(start)))
+    if end is not None:
+        filters.append((date_col, "<", pd.Timestamp(end)))
+    return filters or None
+
+
+def write_parquet(
+        data: pd.DataFrame,
+        path: Path,
+        sort_by: Optional[str] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> Path:
+    """
+    Сохраняет DataFrame в Parquet с сохранением типов.
+
+    Временные метки, категории (включая упорядоченные) и числовые типы
+    восстанавливаются при чтении без повторного разбора. Если задан sort_by,
+    строки сортируются по этой колонке: тогда статистики min/max в каждой
+    группе строк (row group) позволяют при чтении пропускать группы,
+    не попадающие в запрошенный интервал.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Сохраняемые данные.
+    path : Path
+        Путь к файлу .parquet.
+    sort_by : str, optional
+        Колонка для сортировки перед записью (обычно дата начала поездки).
+    row_group_size : int, default=100_000
+        Количество строк в одной группе строк Parquet.
+
+    Возвращает:
+    ----------
+    Path
+        Путь к записанному файлу.
+    """
+    if sort_by is not None and sort_by in data.columns:
+        data = data.sort_values(sort_by, kind="stable")
+
+    data.to_parquet(path, engine="pyarrow", index=False, row_group_size=row_group_size)
+    return path
+
+
+def read_table(
+        path: Path,
+        columns: Optional[List[str]] = None,
+        date_col: Optional[str] = None,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        parse_dates: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Читает таблицу из Parquet или, если его нет, из CSV с тем же именем.
+
+    Для Parquet выбираются только нужные колонки, а условие по date_col
+    передаётся в pyarrow и применяется на уровне групп строк.
+    Для CSV колонки и интервал применяются после чтения.
+
+    Параметры:
+    ----------
+    path : Path
+        Путь к файлу .parquet или .csv.
+    columns : List[str], optional
+        Колонки для чтения. По умолчанию — все.
+    date_col : str, optional
+        Колонка с датой для фильтрации по интервалу.
+    start : str | pd.Timestamp, optional
+        Начало интервала (включительно).
+    end : str | pd.Timestamp, optional
+        Конец интервала (не включительно).
+    parse_dates : List[str], optional
+        Колонки с датами для разбора при чтении CSV.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Прочитанные данные.
+    """
+    path = Path(path)
+    parquet_path = path.with_suffix(".parquet")
+    csv_path = path.with_suffix(".csv")
+
+    if parquet_path.exists():
+        filters = _date_filters(date_col, start, end) if date_col else None
+        return pd.read_parquet(parquet_path, engine="pyarrow", columns=columns, filters=filters)
+
+    if not csv_path.exists():
+        raise FileNotFoundError(f"Не найден ни {parquet_path}, ни {csv_path}")
+
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys(columns + ([date_col] if date_col else [])))
+    if parse_dates is not None and usecols is not None:
+        parse_dates = [col for col in parse_dates if col in usecols]
+
+    data = pd.read_csv(csv_path, encoding="utf-8", usecols=usecols, parse_dates=parse_dates)
+
+    if date_col is not None:
+        if start is not None:
+            data = data[data[date_col] >= pd.Timestamp(start)]
+        if end is not None:
+            data = data[data[date_col] < pd.Timestamp(end)]
+
+    return data[columns] if columns is not None else data
+
+
+def save_artifact(
+        data: pd.DataFrame,
+        name: str,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> Path:
+    """
+    Сохраняет артефакт пайплайна (очищенные поездки, погоду или объединённые данные) в Parquet.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Сохраняемые данные.
+    name : str
+        Имя артефакта из ARTIFACTS: 'cleaned_rides', 'cleaned_weather', 'rides_weather'.
+    row_group_size : int, default=100_000
+        Количество строк в одной группе строк Parquet.
+
+    Возвращает:
+    ----------
+    Path
+        Путь к записанному файлу.
+
+    Пример:
+    -------
+    >>> save_artifact(rides_data, "cleaned_rides")
+    """
+    artifact = ARTIFACTS[name]
+    path = join_path(*artifact["parts"]).with_suffix(".parquet")
+    return write_parquet(data, path, sort_by=artifact["sort_by"], row_group_size=row_group_size)
+
+
+def load_artifact(
+        name: str,
+        columns: Optional[List[str]] = None,
+        start: TimeBound = None,
+        end: TimeBound = None
+) -> pd.DataFrame:
+    """
+    Загружает артефакт пайплайна с проекцией колонок и фильтром по дате.
+
+    Если Parquet-версии артефакта ещё нет, читается CSV с тем же именем
+    (с разбором колонок дат), поэтому старые выгрузки продолжают работать.
+
+    Параметры:
+    ----------
+    name : str
+        Имя артефакта из ARTIFACTS: 'cleaned_rides', 'cleaned_weather', 'rides_weather'.
+    columns : List[str], optional
+        Колонки для чтения. По умолчанию — все.
+    start : str | pd.Timestamp, optional
+        Начало интервала по колонке сортировки артефакта (включительно).
+    end : str | pd.Timestamp, optional
+        Конец интервала (не включительно).
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Данные артефакта.
+
+    Пример:
+    -------
+    >>> rides_weather_data = load_artifact("rides_weather", start="2024-06-01", end="2024-07-01")
+    """
+    artifact = ARTIFACTS[name]
+    return read_table(
+        join_path(*artifact["parts"]),
+        columns=columns,
+        date_col=artifact["sort_by"],
+        start=start,
+        end=end,
+        parse_dates=artifact["date_cols"],
+    )
+
+
+def read_raw_csv(name: str) -> pd.DataFrame:
+    """
+    Читает исходную CSV-выгрузку (поездки или погоду).
+
+    Если файл не читается с разделителем по умолчанию, повторяет чтение с ";".
+
+    Параметры:
+    ----------
+    name : str
+        Имя исходного файла из RAW_INPUTS: 'rides' или 'weather'.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Исходные данные с разобранными колонками дат.
+    """
+    raw_input = RAW_INPUTS[name]
+    options = {
+        "filepath_or_buffer": join_path(*raw_input["parts"]),
+        "encoding": "utf-8",
+        "parse_dates": raw_input["date_cols"],
+    }
+
+    try:
+        return pd.read_csv(**options)
+    except pd.errors.ParserError:
+        return pd.read_csv(**options, sep=";")
+
+
+def _partition_dir(day: pd.Timestamp) -> Path:
+    """
+    Возвращает относительный путь партиции дня: year=YYYY/month=MM/day=DD.
+    """
+    return Path(f"year={day.year}", f"month={day.month:02d}", f"day={day.day:02d}")
+
+
+def _parse_partition_value(path: Path) -> str:
+    """
+    Извлекает значение партиции из имени директории вида key=value.
+    """
+    return path.name.split("=", 1)[1]
+
+
+def write_partitioned(
+        data: pd.DataFrame,
+        root: Path,
+        date_col: str = "start_date",
+        district_col: Optional[str] = None,
+        part_name: Optional[str] = None,
+        row_group_size: int = DEFAULT_ROW_GROUP_SIZE
+) -> List[Path]:
+    """
+    Сохраняет поездки как датасет Parquet, разбитый по дням (и, опционально, районам).
+
+    Структура: root/year=YYYY/month=MM/day=DD[/district=<район>]/<part_name>.parquet.
+    Повторные вызовы с другим part_name дописывают новые файлы в те же партиции,
+    поэтому функцию можно использовать для пошаговой записи порций.
+
+    Параметры:
+    ----------
+    data : pd.DataFrame
+        Сохраняемые поездки.
+    root : Path
+        Корневая директория датасета.
+    date_col : str, default="start_date"
+        Колонка с датой, по которой выполняется разбиение.
+    district_col : str, optional
+        Колонка района для дополнительного уровня партиций (например, 'start_district').
+    part_name : str, optional
+        Имя файла внутри партиции без расширения. По умолчанию — случайное.
+    row_group_size : int, default=100_000
+        Количество строк в одной группе строк Parquet.
+
+    Возвращает:
+    ----------
+    List[Path]
+        Пути к записанным файлам.
+
+    Пример:
+    -------
+    >>> write_partitioned(rides_data, pj(*RIDES_DATASET_PARTS), district_col="start_district")
+    """
+    root = Path(root)
+    part_name = part_name or f"part-{uuid.uuid4().hex}"
+
+    keys = [data[date_col].dt.floor("D").rename("day")]
+    if district_col is not None:
+        keys.append(data[district_col])
+
+    written = []
+    for key, part in data.groupby(keys, sort=True, observed=True):
+        day, district = (key[0], key[1]) if district_col is not None else (key[0], None)
+
+        part_dir = root / _partition_dir(day)
+        if district is not None:
+            part_dir = part_dir / f"district={district}"
+        part_dir.mkdir(parents=True, exist_ok=True)
+
+        written.append(
+            write_parquet(part, part_dir / f"{part_name}.parquet", sort_by=date_col, row_group_size=row_group_size)
+        )
+
+    return written
+
+
+def list_partitions(
+        root: Path,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        weekdays: Optional[Iterable[Union[int, str]]] = None,
+        districts: Optional[Iterable[str]] = None
+) -> List[Path]:
+    """
+    Отбирает файлы датасета только из партиций, подходящих под условия.
+
+    Условия проверяются по именам директорий, файлы неподходящих дней и районов не открываются.
+
+    Параметры:
+    ----------
+    root : Path
+        Корневая директория датасета.
+    start : str | pd.Timestamp, optional
+        Начало интервала (включительно).
+    end : str | pd.Timestamp, optional
+        Конец интервала (не включительно).
+    weekdays : Iterable[int | str], optional
+        Дни недели: номера (0 — понедельник) или названия из DAY_NAMES.
+    districts : Iterable[str], optional
+        Районы (для датасетов, разбитых по районам).
+
+    Возвращает:
+    ----------
+    List[Path]
+        Отсортированный список файлов Parquet выбранных партиций.
+    """
+    root = Path(root)
+    first_day = pd.Timestamp(start).floor("D") if start is not None else None
+    end = pd.Timestamp(end) if end is not None else None
+
+    weekday_set = None
+    if weekdays is not None:
+        weekday_set = {DAY_NAMES.index(day) if isinstance(day, str) else int(day) for day in weekdays}
+    district_set = set(districts) if districts is not None else None
+
+    files = []
+    for day_dir in sorted(root.glob("year=*/month=*/day=*")):
+        month_dir, year_dir = day_dir.parent, day_dir.parent.parent
+        day = pd.Timestamp(
+            year=int(_parse_partition_value(year_dir)),
+            month=int(_parse_partition_value(month_dir)),
+            day=int(_parse_partition_value(day_dir)),
+        )
+
+        if first_day is not None and day < first_day:
+            continue
+        if end is not None and day >= end:
+            continue
+        if weekday_set is not None and day.dayofweek not in weekday_set:
+            continue
+
+        district_dirs = sorted(day_dir.glob("district=*"))
+        if district_dirs:
+            if district_set is not None:
+                district_dirs = [
+                    path for path in district_dirs if _parse_partition_value(path) in district_set
+                ]
+            for district_dir in district_dirs:
+                files.extend(sorted(district_dir.glob("*.parquet")))
+        else:
+            files.extend(sorted(day_dir.glob("*.parquet")))
+
+    return files
+
+
+def load_partitioned(
+        root: Optional[Path] = None,
+        columns: Optional[List[str]] = None,
+        start: TimeBound = None,
+        end: TimeBound = None,
+        weekdays: Optional[Iterable[Union[int, str]]] = None,
+        districts: Optional[Iterable[str]] = None,
+        date_col: str = "start_date"
+) -> pd.DataFrame:
+    """
+    Загружает поездки из датасета, разбитого по дням, открывая только нужные партиции.
+
+    Сначала по именам директорий отбираются подходящие дни, дни недели и районы,
+    затем внутри граничных дней интервал [start, end) применяется к группам строк.
+
+    Параметры:
+    ----------
+    root : Path, optional
+        Корневая директория датасета. По умолчанию — data/cleaned/rides_dataset.
+    columns : List[str], optional
+        Колонки для чтения. По умолчанию — все.
+    start : str | pd.Timestamp, optional
+        Начало интервала (включительно).
+    end : str | pd.Timestamp, optional
+        Конец интервала (не включительно).
+    weekdays : Iterable[int | str], optional
+        Дни недели: номера (0 — понедельник) или названия ('понедельник').
+    districts : Iterable[str], optional
+        Районы (для датасетов, разбитых по районам).
+    date_col : str, default="start_date"
+        Колонка с датой, по которой разбит датасет.
+
+    Возвращает:
+    ----------
+    pd.DataFrame
+        Поездки из выбранных партиций.
+
+    Пример:
+    -------
+    >>> mondays = load_partitioned(weekdays=["понедельник"], start="2024-06-01", end="2024-07-01")
+    """
+    root = Path(root) if root is not None else join_path(*RIDES_DATASET_PARTS)
+    files = list_partitions(root, start, end, weekdays, districts)
+
+    if not files:
+        any_file = next(root.rglob("*.parquet"), None)
+        if any_file is None:
+            raise FileNotFoundError(f"В {root} нет файлов Parquet")
+        return pd.read_parquet(any_file, engine="pyarrow", columns=columns).iloc[0:0]
+
+    table = pq.read_table(
+        [str(path) for path in files],
+        columns=columns,
+        filters=_date_filters(date_col, start, end),
+        partitioning=None,
+    )
+    return table.to_pandas()
@@ -0,0 +1,277 @@
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Union
+
+import numpy as np
+import pandas as pd
+import yaml
+
+MINUTES_PER_DAY = 24 * 60
+
+# Текущая тарифная сетка сервиса — единственный источник: из неё строятся почасовые таблицы features
+DEFAULT_TARIFF_VERSIONS = [
+    {
+        "effective_from": "1970-01-01",
+        "start_price": 30,
+        "rules": [
+            {"days": "0-6", "start": "00:00", "end": "01:00", "price": 5},
+            {"days": "0-6", "start": "01:00", "end": "06:00", "price": 3},
+            {"days": "0-6", "start": "06:00", "end": "10:00", "price": 4},
+            {"days": "0-4", "start": "10:00", "end": "16:00", "price": 5},
+            {"days": "0-4", "start": "16:00", "end": "22:00", "price": 6},
+            {"days": "0-4", "start": "22:00", "end": "24:00", "price": 5},
+            {"days": "5-6", "start": "00:00", "end": "01:00", "price": 6},
+            {"days": "5-6", "start": "10:00", "end": "16:00", "price": 6},
+            {"days": "5-6", "start": "16:00", "end": "22:00", "price": 7},
+            {"days": "5-6", "start": "22:00", "end": "24:00", "price": 6},
+        ],
+        "promo_windows": [
+            {"days": "0", "start": "06:00", "end": "10:00"},
+        ],
+    }
+]
+
+
+def _parse_days(days: Union[str, int, Iterable[int]]) -> List[int]:
+    """
+    Разбирает описание дней недели: 3, "0-4", "0,5,6" или [0, 1, 2].
+    """
+    if isinstance(days, (int, np.integer)):
+        result = [int(days)]
+    elif isinstance(days, str):
+        result = []
+        for part in days.replace(" ", "").split(","):
+            if "-" in part:
+                first, last = part.split("-")
+                result.extend(range(int(first), int(last) + 1))
+            else:
+                result.append(int(part))
+    else:
+        result = [int(day) for day in days]
+
+    if any(day < 0 or day > 6 for day in result):
+        raise ValueError(f"Дни недели должны быть в диапазоне 0-6: {days}")
+    return result
+
+
+def _parse_minute(value: Union[str, int]) -> int:
+    """
+    Переводит время "HH:MM" (или номер часа) в минуту суток, допускается "24:00".
+    """
+    if isinstance(value, (int, np.integer)):
+        minute = int(value) * 60
+    else:
+        hours, minutes = str(value).split(":")
+        minute = int(hours) * 60 + int(minutes)
+
+    if minute < 0 or minute > MINUTES_PER_DAY:
+        raise ValueError(f"Некорректное время в тарифе: {value}")
+    return minute
+
+
+class TariffSchedule:
+    """
+    Декларативное тарифное расписание с несколькими версиями тарифа.
+
+    Каждая версия один раз компилируется в плотный массив цен за минуту
+    формы (7, 1440) — день недели × минута суток. Цена любой поездки
+    вычисляется одной выборкой из массива (версия, день, минута),
+    а версия для каждой поездки подбирается через np.searchsorted
+    по датам начала действия, без цикла по поездкам.
+
+    Формат описания версии (dict, JSON или YAML):
+    ---------------------------------------------
+    effective_from : str — дата начала действия версии
+    start_price : float, default=30 — плата за старт поездки
+    rules : list — тарифные правила {"days": "0-4", "start": "10:00", "end": "16:00", "price": 5};
+        интервал [start, end), при пересечении правил побеждает последнее
+    promo_windows : list, optional — окна {"days": "0", "start": "06:00", "end": "10:00"},
+        в которых поездка с промо не платит за старт
+
+    В CSV каждая строка — одно правило с колонками
+    effective_from, kind ("tariff" или "promo"), days, start, end, price, start_price.
+
+    Пример:
+    -------
+    >>> schedule = TariffSchedule.from_file(pj("configs", "tariffs.yaml"))
+    >>> rides_data["total_price"] = schedule.total_price(
+    ...     rides_data["start_date"], rides_data["day_of_week"],
+    ...     rides_data["duration_minutes"], rides_data["promo"]
+    ... )
+    """
+
+    def __init__(self, versions: List[Dict[str, Any]]):
+        if not versions:
+            raise ValueError("Тарифное расписание должно содержать хотя бы одну версию")
+
+        versions = sorted(versions, key=lambda version: pd.Timestamp(version["effective_from"]))
+
+        self.versions = versions
+        self.effective_from = pd.DatetimeIndex(
+            [pd.Timestamp(version["effective_from"]) for version in versions]
+        ).as_unit("ns")
+        if self.effective_from.has_duplicates:
+            raise ValueError("Даты начала действия версий тарифа не должны повторяться")
+
+        n_versions = len(versions)
+        self.prices = np.full((n_versions, 7, MINUTES_PER_DAY), np.nan)
+        self.promo_free_start = np.zeros((n_versions, 7, MINUTES_PER_DAY), dtype=bool)
+        self.start_prices = np.empty(n_versions)
+
+        for idx, version in enumerate(versions):
+            self.start_prices[idx] = version.get("start_price", 30)
+
+            for rule in version["rules"]:
+                days = _parse_days(rule["days"])
+                start, end = _parse_minute(rule["start"]), _parse_minute(rule["end"])
+                self.prices[idx, days, start:end] = rule["price"]
+
+            for window in version.get("promo_windows", []):
+                days = _parse_days(window["days"])
+                start, end = _parse_minute(window["start"]), _parse_minute(window["end"])
+                self.promo_free_start[idx, days, start:end] = True
+
+            if np.isnan(self.prices[idx]).any():
+                raise ValueError(
+                    f"Версия тарифа от {version['effective_from']} покрывает не все минуты недели"
+                )
+
+    @classmethod
+    def default(cls) -> "TariffSchedule":
+        """
+        Возвращает расписание с текущей тарифной сеткой сервиса.
+        """
+        return cls(DEFAULT_TARIFF_VERSIONS)
+
+    @classmethod
+    def from_file(cls, path: Union[str, Path]) -> "TariffSchedule":
+        """
+        Загружает расписание из файла YAML, JSON или CSV.
+
+        YAML и JSON содержат либо список версий, либо словарь с ключом "versions".
+
+        Параметры:
+        ----------
+        path : str | Path
+            Путь к файлу тарифов (.yaml, .yml, .json или .csv).
+
+        Возвращает:
+        ----------
+        TariffSchedule
+            Скомпилированное тарифное расписание.
+        """
+        path = Path(path)
+        suffix = path.suffix.lower()
+
+        if suffix == ".csv":
+            return cls._from_csv(path)
+
+        with open(path, encoding="utf-8") as file:
+            if suffix in (".yaml", ".yml"):
+                content = yaml.safe_load(file)
+            elif suffix == ".json":
+                content = json.load(file)
+            else:
+                raise ValueError(f"Неподдерживаемый формат файла тарифов: {suffix}")
+
+        if isinstance(content, dict):
+            content = content["versions"]
+        return cls(content)
+
+    @classmethod
+    def _from_csv(cls, path: Path) -> "TariffSchedule":
+        """
+        Собирает версии тарифа из плоской CSV-таблицы правил.
+        """
+        table = pd.read_csv(path, dtype={"days": str, "start": str, "end": str})
+        if "kind" not in table.columns:
+            table["kind"] = "tariff"
+
+        versions = []
+        for effective_from, rules in table.groupby("effective_from", sort=True):
+            tariff_rules = rules[rules["kind"] == "tariff"]
+            promo_rules = rules[rules["kind"] == "promo"]
+            start_price = rules["start_price"].dropna() if "start_price" in rules.columns else pd.Series(dtype=float)
+
+            versions.append({
+                "effective_from": effective_from,
+                "start_price": start_price.iloc[0] if not start_price.empty else 30,
+                "rules": tariff_rules[["days", "start", "end", "price"]].to_dict("records"),
+                "promo_windows": promo_rules[["days", "start", "end"]].to_dict("records"),
+            })
+
+        return cls(versions)
+
+    def _version_index(self, start_date: pd.Series) -> np.ndarray:
+        """
+        Для каждой поездки находит индекс действующей версии тарифа.
+        """
+        start_ns = pd.DatetimeIndex(start_date).as_unit("ns").asi8
+        version_idx = np.searchsorted(self.effective_from.asi8, start_ns, side="right") - 1
+
+        if (version_idx < 0).any():
+            raise ValueError(
+                f"Есть поездки раньше первой версии тарифа ({self.effective_from[0].date()})"
+            )
+        return version_idx
+
+    def price_per_minute(self, start_date: pd.Series, day_of_week: pd.Series) -> np.ndarray:
+        """
+        Возвращает цену за минуту для каждой поездки.
+
+        Параметры:
+        ----------
+        start_date : pd.Series
+            Дата и время начала поездок.
+        day_of_week : pd.Series
+            День недели поездок (0 — понедельник).
+
+        Возвращает:
+        ----------
+        np.ndarray
+            Цена за минуту по действующей версии тарифа.
+        """
+        start_date = pd.DatetimeIndex(start_date)
+        version_idx = self._version_index(start_date)
+        day = np.asarray(day_of_week, dtype=np.int64)
+        minute = start_date.hour * 60 + start_date.minute
+
+        return self.prices[version_idx, day, minute]
+
+    def total_price(
+            self,
+            start_date: pd.Series,
+            day_of_week: pd.Series,
+            duration_minutes: pd.Series,
+            promo: pd.Series
+    ) -> np.ndarray:
+        """
+        Вычисляет общую стоимость поездок по действующим версиям тарифа.
+
+        Параметры:
+        ----------
+        start_date : pd.Series
+            Дата и время начала поездок.
+        day_of_week : pd.Series
+            День недели поездок (0 — понедельник).
+        duration_minutes : pd.Series
+            Длительность поездок в минутах.
+        promo : pd.Series
+            Признак использования промо.
+
+        Возвращает:
+        ----------
+        np.ndarray
+            Стоимость = start_price + duration_minutes * price_per_minute;
+            в промо-окнах поездки с промо не платят за старт.
+        """
+        start_date = pd.DatetimeIndex(start_date)
+        version_idx = self._version_index(start_date)
+        day = np.asarray(day_of_week, dtype=np.int64)
+        minute = start_date.hour * 60 + start_date.minute
+
+        price_per_min = self.prices[version_idx, day, minute]
+        free_start = self.promo_free_start[version_idx, day, minute] & np.asarray(promo).astype(bool)
+        start_price = np.where(free_start, 0, self.start_prices[version_idx])
+
+        return start_price + np.asarray(duration_minutes, dtype=np.float64) * price_per_min
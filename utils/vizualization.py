@@ -111,6 +111,7 @@ def plot_categorial_pie(
     for idx, column in enumerate(columns):
         i, j = divmod(idx, ncols)
         counts = data[column].value_counts()
+        counts = counts[counts > 0]
         colors = sns.color_palette("pastel", n_colors=len(counts))
         axes[i, j].pie(
             counts.values, labels=counts.index, colors=colors, autopct="%1.1f%%"